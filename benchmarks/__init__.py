@@ -0,0 +1,3 @@
+"""
+Бенчмарки производительности конвертера PNG в JPG.
+"""
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк профилей кодировщика JPEG.
+
+Для каждого профиля из ENCODER_PROFILES измеряет время кодирования и
+суммарный размер JPG на одних и тех же изображениях. Изображения
+декодируются и подготавливаются один раз, поэтому измеряется только
+кодирование. По умолчанию используются синтетические изображения; с
+--input можно прогнать собственные файлы.
+
+Примеры:
+    python -m benchmarks.bench_encoders
+    python -m benchmarks.bench_encoders --input ~/Pictures --quality 85 --output encoders.json
+"""
+
+import argparse
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+
+import PIL
+
+from benchmarks.bench_pipeline import _noise_image
+from src.imaging import decode_image, encode_jpeg, flatten_alpha
+from src.options import ENCODER_PROFILES, ConversionOptions, SUPPORTED_EXTENSIONS
+from src.scanner import scan_images
+
+
+def sample_images(scale=1.0):
+    """Создает набор синтетических изображений разного размера и типа."""
+    def scaled(width, height):
+        return max(16, int(width * scale)), max(16, int(height * scale))
+
+    return [
+        ("photo_4k", _noise_image('RGB', scaled(3840, 2160), 1)),
+        ("photo_fullhd", _noise_image('RGB', scaled(1920, 1080), 2)),
+        ("transparent", flatten_alpha(_noise_image('RGBA', scaled(1920, 1080), 3), (255, 255, 255))),
+        ("thumbnail", _noise_image('RGB', scaled(320, 240), 4)),
+    ]
+
+
+def load_images(input_dir, limit):
+    """Декодирует и подготавливает до limit изображений из папки."""
+    images = []
+    options = ConversionOptions()
+    for path in scan_images(input_dir, SUPPORTED_EXTENSIONS):
+        with open(path, 'rb') as f:
+            img, _ = decode_image(io.BytesIO(f.read()), options)
+        images.append((path, flatten_alpha(img, options.background_color)))
+        if len(images) >= limit:
+            break
+    return images
+
+
+def bench_profile(images, options, repeat):
+    """
+    Кодирует все изображения repeat раз.
+
+    Returns:
+        словарь с медианным временем и суммарным размером
+    """
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        size = 0
+        started = time.perf_counter()
+        for _, img in images:
+            size += len(encode_jpeg(img, options, max(options.quality, options.encoder().min_quality)))
+        timings.append(time.perf_counter() - started)
+    seconds = statistics.median(timings)
+    pixels = sum(img.width * img.height for _, img in images)
+    return {
+        "seconds": round(seconds, 4),
+        "megapixels_per_sec": round(pixels / seconds / 1e6, 2) if seconds else None,
+        "bytes": size,
+    }
+
+
+def run_benchmarks(images, quality, repeat):
+    """Выполняет замеры для всех профилей и добавляет отношения к профилю standard."""
+    results = {}
+    for name in ENCODER_PROFILES:
+        options = ConversionOptions(quality=quality, encoder_profile=name)
+        results[name] = bench_profile(images, options, repeat)
+    baseline = results.get("standard")
+    if baseline:
+        for result in results.values():
+            result["time_vs_standard"] = round(result["seconds"] / baseline["seconds"], 3)
+            result["size_vs_standard"] = round(result["bytes"] / baseline["bytes"], 3)
+    return results
+
+
+def print_table(results, stream=sys.stderr):
+    """Выводит таблицу сравнения профилей."""
+    print(f"{'профиль':<10} {'время, с':>10} {'Мпикс/с':>9} {'размер, КБ':>11} {'время':>7} {'размер':>7}", file=stream)
+    for name, result in results.items():
+        print(f"{name:<10} {result['seconds']:>10.3f} {result['megapixels_per_sec'] or 0:>9.1f} "
+              f"{result['bytes'] / 1024:>11.0f} {result.get('time_vs_standard', 1):>7.2f} "
+              f"{result.get('size_vs_standard', 1):>7.2f}", file=stream)
+
+
+def main(argv=None):
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк профилей кодировщика JPEG")
+    parser.add_argument("--input", help="папка с собственными изображениями (по умолчанию синтетические)")
+    parser.add_argument("--limit", type=int, default=20, help="максимум изображений из --input")
+    parser.add_argument("--scale", type=float, default=1.0, help="масштаб размеров синтетических изображений")
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--repeat", type=int, default=3, help="число повторов для медианы")
+    parser.add_argument("--output", help="файл для сохранения результатов в JSON (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    images = load_images(args.input, args.limit) if args.input else sample_images(args.scale)
+    if not images:
+        print("Нет изображений для замера", file=sys.stderr)
+        return 2
+
+    results = run_benchmarks(images, args.quality, args.repeat)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "quality": args.quality,
+            "repeat": args.repeat,
+            "images": [name for name, _ in images],
+        },
+        "results": results,
+    }
+    print_table(results)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк конвейера преобразования изображений.
+
+Генерирует синтетические наборы изображений во временной папке, измеряет
+время каждого этапа (декодирование, изменение размера, наложение
+прозрачности, кодирование, запись) и сквозную скорость движка, затем
+сохраняет результаты в JSON для сравнения запусков.
+
+Примеры:
+    python -m benchmarks.bench_pipeline --output bench.json
+    python -m benchmarks.bench_pipeline --scale 0.25 --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import PIL
+from PIL import Image
+
+from src.engine import ConversionEngine
+from src.imaging import convert_image
+from src.instrumentation import STAGES
+from src.options import ConversionOptions
+
+
+def _noise_image(mode, size, seed):
+    """Создает изображение с шумом и градиентом, близкое по сжимаемости к реальным."""
+    noise = Image.effect_noise(size, 40 + seed % 20).convert('L')
+    gradient = Image.linear_gradient('L').resize(size)
+    base = Image.merge('RGB', (noise, gradient, Image.blend(noise, gradient, 0.5)))
+    if mode == 'RGB':
+        return base
+    if mode == 'RGBA_OPAQUE':
+        return base.convert('RGBA')
+    if mode == 'RGBA':
+        img = base.convert('RGBA')
+        img.putalpha(gradient)
+        return img
+    if mode == 'P':
+        img = base.quantize(colors=64)
+        img.info['transparency'] = 0
+        return img
+    raise ValueError(mode)
+
+
+def generate_corpora(root, scale=1.0):
+    """
+    Создает наборы тестовых изображений.
+
+    Returns:
+        словарь {имя набора: список путей}
+    """
+    def scaled(width, height):
+        return max(16, int(width * scale)), max(16, int(height * scale))
+
+    specs = {
+        "small_png": [("RGB", scaled(256, 256), "png")] * 200,
+        "huge_png": [("RGBA_OPAQUE", scaled(7680, 4320), "png")] * 3,
+        "palette_png": [("P", scaled(1024, 768), "png")] * 20,
+        "rgba_transparent": [("RGBA", scaled(1920, 1080), "png")] * 20,
+        "rgba_opaque": [("RGBA_OPAQUE", scaled(1920, 1080), "png")] * 20,
+        "gif": [("GIF", scaled(640, 480), "gif")] * 20,
+    }
+
+    corpora = {}
+    for name, items in specs.items():
+        directory = os.path.join(root, name)
+        os.makedirs(directory)
+        paths = []
+        for i, (mode, size, ext) in enumerate(items):
+            path = os.path.join(directory, f"{name}_{i:04d}.{ext}")
+            if mode == "GIF":
+                frames = [_noise_image('RGB', size, i + k).quantize(colors=128) for k in range(5)]
+                frames[0].save(path, save_all=True, append_images=frames[1:], duration=100, loop=0)
+            else:
+                _noise_image(mode, size, i).save(path)
+            paths.append(path)
+        corpora[name] = paths
+    return corpora
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Возвращает пиковый объем резидентной памяти в МБ."""
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux возвращает килобайты, macOS - байты
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def bench_stages(paths, options, output_dir):
+    """Последовательно прогоняет файлы через этапы конвейера и суммирует время этапов."""
+    timings = dict.fromkeys(STAGES, 0.0)
+    bytes_in = bytes_out = 0
+    started = time.perf_counter()
+    for path in paths:
+        stats = convert_image(path, os.path.join(output_dir, os.path.basename(path) + ".jpg"), options)
+        for stage, seconds in stats.stages.items():
+            timings[stage] += seconds
+        bytes_in += stats.bytes_in
+        bytes_out += stats.bytes_out
+    elapsed = time.perf_counter() - started
+    return _summary(len(paths), bytes_in, bytes_out, elapsed, timings)
+
+
+def bench_engine(paths, options, output_dir, workers):
+    """Измеряет сквозную скорость параллельного движка."""
+    jobs = [(path, os.path.join(output_dir, os.path.basename(path) + ".jpg")) for path in paths]
+    engine = ConversionEngine(workers)
+    failed = [r for r in engine.run(jobs, options) if not r.ok]
+    if failed:
+        raise RuntimeError(f"{failed[0].source_path}: {failed[0].error}")
+    summary = engine.summary
+    return _summary(len(paths), summary.bytes_in, summary.bytes_out, summary.elapsed)
+
+
+def _summary(files, bytes_in, bytes_out, elapsed, timings=None):
+    """Собирает итоговые показатели одного замера."""
+    result = {
+        "files": files,
+        "seconds": round(elapsed, 4),
+        "files_per_sec": round(files / elapsed, 2) if elapsed else None,
+        "mb_per_sec": round(bytes_in / elapsed / 1e6, 2) if elapsed else None,
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+    }
+    if timings is not None:
+        result["stages"] = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+    return result
+
+
+def run_benchmarks(scale, options, workers, corpora_filter=None):
+    """Генерирует наборы изображений и выполняет все замеры."""
+    workdir = tempfile.mkdtemp(prefix="png2jpg-bench-")
+    try:
+        corpora = generate_corpora(os.path.join(workdir, "src"), scale)
+        results = {}
+        for name, paths in corpora.items():
+            if corpora_filter and name not in corpora_filter:
+                continue
+            stage_dir = os.path.join(workdir, "out", name, "stages")
+            engine_dir = os.path.join(workdir, "out", name, "engine")
+            os.makedirs(stage_dir)
+            os.makedirs(engine_dir)
+            results[name] = {
+                "stages": bench_stages(paths, options, stage_dir),
+                "engine": bench_engine(paths, options, engine_dir, workers),
+            }
+            print(f"{name}: {results[name]['stages']['files_per_sec']} файлов/с последовательно, "
+                  f"{results[name]['engine']['files_per_sec']} файлов/с в пуле", file=sys.stderr)
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(current, baseline, tolerance):
+    """
+    Сравнивает скорость с предыдущим запуском.
+
+    Returns:
+        список описаний регрессий (падение files_per_sec больше tolerance)
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        for kind in ("stages", "engine"):
+            old = previous[kind]["files_per_sec"]
+            new = result[kind]["files_per_sec"]
+            if old and new and new < old * (1 - tolerance):
+                regressions.append(f"{name}/{kind}: {old} -> {new} файлов/с")
+    return regressions
+
+
+def main(argv=None):
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк конвейера преобразования в JPG")
+    parser.add_argument("--output", help="файл для сохранения результатов в JSON (по умолчанию stdout)")
+    parser.add_argument("--scale", type=float, default=1.0, help="масштаб размеров тестовых изображений")
+    parser.add_argument("--corpus", action="append", help="запустить только указанный набор (можно повторять)")
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--width", type=int, default=1366)
+    parser.add_argument("--height", type=int, default=768)
+    parser.add_argument("--workers", type=int, default=0, help="число процессов движка (0 - по числу процессоров)")
+    parser.add_argument("--compare", help="JSON предыдущего запуска для поиска регрессий")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="допустимое падение скорости (доля)")
+    args = parser.parse_args(argv)
+
+    options = ConversionOptions(quality=args.quality, target_width=args.width, target_height=args.height)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": args.scale,
+            "options": {"quality": args.quality, "width": args.width, "height": args.height},
+        },
+        "results": run_benchmarks(args.scale, options, args.workers, args.corpus),
+    }
+    report["meta"]["peak_rss_mb"] = peak_rss_mb()
+    report["meta"]["peak_rss_workers_mb"] = peak_rss_mb(resource.RUSAGE_CHILDREN)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"Регрессия: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк холодного запуска графического интерфейса.
+
+Каждое измерение выполняется в отдельном процессе интерпретатора:
+- время импорта src.converter и список тяжелых модулей, загруженных при импорте
+  (Pillow и ttkthemes не должны загружаться до показа окна);
+- время от запуска до первой отрисовки окна (нужен дисплей, иначе пропускается).
+
+Примеры:
+    python -m benchmarks.bench_startup --output startup.json
+    python -m benchmarks.bench_startup --compare startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+
+# Модули, которые не должны загружаться при импорте графического интерфейса
+HEAVY_MODULES = ("PIL", "ttkthemes", "numpy", "src.engine", "src.imaging")
+
+_IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import src.converter
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "loaded": [name for name in %r if name in sys.modules]}))
+"""
+
+_WINDOW_PROBE = """
+import json, time
+started = time.perf_counter()
+from src.converter import PNGtoJPGConverter
+app = PNGtoJPGConverter()
+app.root.update()
+shown = time.perf_counter() - started
+# Дожидаемся применения темы из фонового потока
+deadline = time.perf_counter() + 10
+while not app.startup_complete and time.perf_counter() < deadline:
+    app.root.update()
+    time.sleep(0.005)
+themed = time.perf_counter() - started
+app.root.destroy()
+print(json.dumps({"window_seconds": shown, "themed_seconds": themed}))
+"""
+
+
+def _run_probe(code, cwd):
+    """Выполняет код в новом интерпретаторе и возвращает разобранный JSON из stdout."""
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "ошибка запуска")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _has_display():
+    """Проверяет, можно ли открыть окно Tk."""
+    if sys.platform.startswith(("win", "darwin")):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def run_benchmarks(repeat, project_root):
+    """
+    Выполняет измерения repeat раз и возвращает медианы.
+
+    Returns:
+        словарь с результатами
+    """
+    imports = [_run_probe(_IMPORT_PROBE % (HEAVY_MODULES,), project_root) for _ in range(repeat)]
+    results = {
+        "import": {
+            "seconds": round(statistics.median(run["seconds"] for run in imports), 4),
+            "heavy_modules_loaded": sorted({name for run in imports for name in run["loaded"]}),
+        }
+    }
+    if _has_display():
+        windows = [_run_probe(_WINDOW_PROBE, project_root) for _ in range(repeat)]
+        results["window"] = {
+            "seconds": round(statistics.median(run["window_seconds"] for run in windows), 4),
+            "themed_seconds": round(statistics.median(run["themed_seconds"] for run in windows), 4),
+        }
+    else:
+        results["window"] = None
+    return results
+
+
+def compare(current, baseline, tolerance):
+    """
+    Сравнивает время запуска с предыдущим запуском.
+
+    Returns:
+        список описаний регрессий (рост времени больше tolerance)
+    """
+    regressions = []
+    for kind in ("import", "window"):
+        old = (baseline.get("results", {}).get(kind) or {}).get("seconds")
+        new = (current["results"].get(kind) or {}).get("seconds")
+        if old and new and new > old * (1 + tolerance):
+            regressions.append(f"{kind}: {old} -> {new} с")
+    return regressions
+
+
+def main(argv=None):
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк запуска графического интерфейса")
+    parser.add_argument("--output", help="файл для сохранения результатов в JSON (по умолчанию stdout)")
+    parser.add_argument("--repeat", type=int, default=5, help="число запусков для медианы")
+    parser.add_argument("--compare", help="JSON предыдущего запуска для поиска регрессий")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимый рост времени (доля)")
+    args = parser.parse_args(argv)
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": run_benchmarks(args.repeat, project_root),
+    }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    problems = []
+    loaded = report["results"]["import"]["heavy_modules_loaded"]
+    if loaded:
+        problems.append("при импорте интерфейса загружены: " + ", ".join(loaded))
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            problems.extend(compare(report, json.load(f), args.tolerance))
+    for line in problems:
+        print(f"Регрессия: {line}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,26 @@
-"""  """#!/usr/bin/env python3
+#!/usr/bin/env python3
 """
 Главная точка входа для приложения PNG to JPG Converter.
 
-Это графическое приложение позволяет пользователям преобразовывать
-PNG изображения в формат JPG с настраиваемыми параметрами качества.
+Без аргументов запускается графическое приложение, которое позволяет
+пользователям преобразовывать PNG изображения в формат JPG с настраиваемыми
+параметрами качества. С аргументами (например, `convert IN OUT`) работает
+консольный режим без tkinter.
 """
 
 import sys
-import os
-from src.converter import PNGtoJPGConverter
+
 
 def main():
     """Основная функция для запуска приложения конвертера PNG в JPG."""
+    if len(sys.argv) > 1:
+        # Консольный режим: графические модули не импортируются вовсе
+        from src.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
+    from src.converter import PNGtoJPGConverter
     app = PNGtoJPGConverter()
     app.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
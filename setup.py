@@ -21,22 +21,26 @@ setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/username/png-to-jpg-converter",
-    packages=find_packages(),
+    packages=find_packages(exclude=["tests", "tests.*"]),
+    py_modules=["main"],
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: End Users/Desktop",
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     install_requires=requirements,
+    extras_require={
+        # SSIM-based automatic quality (--target-ssim)
+        "auto-quality": ["numpy"],
+    },
     entry_points={
         "console_scripts": [
             "png-to-jpg=main:main",
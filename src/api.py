@@ -0,0 +1,222 @@
+"""
+Программный интерфейс конвертера без графического интерфейса.
+
+Модуль не импортирует tkinter и не обращается к выходным папкам: байты
+исходного изображения (из памяти, файла или файлового объекта)
+преобразуются в байты JPG. Параметры - тот же неизменяемый
+ConversionOptions, что используют графический интерфейс и командная
+строка.
+
+Пример:
+    from src.api import ConversionOptions, convert_image, convert_many
+
+    jpg = convert_image(png_bytes, ConversionOptions(quality=85, target_width=1280))
+    for result in convert_many(paths, ConversionOptions(quality=85), workers=4):
+        print(result.source, result.size_in, result.size_out, result.seconds)
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from .engine import ConversionEngine, _ignore_interrupt, resolve_worker_count
+from .imaging import ImageTooLargeError, read_source, render_outputs
+from .instrumentation import FileStats
+from .options import ConversionOptions, Rendition
+
+__all__ = ["ConversionOptions", "Rendition", "ImageResult", "convert_image", "convert_many"]
+
+
+# Базовое имя выходного JPG для исходников без пути (байты, файловые объекты)
+DEFAULT_OUTPUT_NAME = "image.jpg"
+
+
+@dataclass
+class ImageResult:
+    """Итог преобразования одного исходного изображения в памяти."""
+
+    # Позиция исходного изображения во входной последовательности convert_many
+    index: int
+    # Путь к исходному файлу (None для байтов и файловых объектов)
+    source: Optional[str] = None
+    # Пары (относительное имя, байты JPG) в порядке кодирования: несколько - для вариантов размера и кадров
+    outputs: Tuple[Tuple[str, bytes], ...] = ()
+    stats: Optional[FileStats] = None
+    error: Optional[str] = None
+    # Ошибка вызвана превышением предела max_image_pixels
+    too_large: bool = False
+
+    @property
+    def ok(self):
+        """Возвращает True, если изображение успешно преобразовано."""
+        return self.error is None
+
+    @property
+    def data(self):
+        """Байты первого (для одного выхода - единственного) JPG или None при ошибке."""
+        return self.outputs[0][1] if self.outputs else None
+
+    @property
+    def size_in(self):
+        """Размер исходного изображения в байтах."""
+        return self.stats.bytes_in if self.stats else 0
+
+    @property
+    def size_out(self):
+        """Суммарный размер всех JPG в байтах."""
+        return sum(len(data) for _, data in self.outputs)
+
+    @property
+    def seconds(self):
+        """Суммарное время этапов (чтение, декодирование, изменение размера, кодирование)."""
+        return self.stats.total_seconds if self.stats else 0.0
+
+
+def _load(source):
+    """
+    Приводит исходное изображение к байтам или пути, которые можно передать в рабочий процесс.
+
+    Returns:
+        пара (байты или путь, путь исходного файла или None)
+
+    Raises:
+        TypeError: если source не байты, не путь и не файловый объект
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source), None
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        return path, path
+    if hasattr(source, "read"):
+        data = source.read()
+        if not isinstance(data, bytes):
+            raise TypeError("Файловый объект должен быть открыт в двоичном режиме")
+        return data, None
+    raise TypeError(f"Ожидались байты, путь или файловый объект, получено: {type(source).__name__}")
+
+
+def _output_name(path):
+    """Базовое имя выходного JPG: имя исходного файла с расширением .jpg."""
+    if path is None:
+        return DEFAULT_OUTPUT_NAME
+    return os.path.splitext(os.path.basename(path))[0] + ".jpg"
+
+
+def _render(source, output_name, options):
+    """
+    Читает (если передан путь) и преобразует одно изображение в памяти.
+
+    Выполняется в вызывающем потоке или в рабочем процессе convert_many.
+
+    Returns:
+        пара (список пар (относительное имя, байты JPG), FileStats)
+    """
+    stats = FileStats()
+    if isinstance(source, str):
+        with stats.stage("read"):
+            source = read_source(source)
+    return render_outputs(source, output_name, options, stats)
+
+
+def _check_options(options):
+    """Возвращает параметры по умолчанию для None и проверяет тип."""
+    if options is None:
+        return ConversionOptions()
+    if not isinstance(options, ConversionOptions):
+        raise TypeError("options должен быть экземпляром ConversionOptions")
+    return options
+
+
+def convert_image(source, options=None):
+    """
+    Преобразует одно изображение в JPG в памяти.
+
+    Args:
+        source: байты изображения, путь к файлу или файловый объект,
+            открытый в двоичном режиме
+        options: экземпляр ConversionOptions (None - параметры по умолчанию)
+
+    Returns:
+        байты JPG
+
+    Raises:
+        ImageTooLargeError: если изображение больше options.max_image_pixels
+        ValueError: если параметры дают несколько JPG (варианты размера, кадры
+            анимации) - для них используется convert_many
+        OSError: если файл не удалось прочитать или распознать
+    """
+    options = _check_options(options)
+    source, path = _load(source)
+    outputs, _ = _render(source, _output_name(path), options)
+    if len(outputs) != 1:
+        raise ValueError(f"Параметры дают {len(outputs)} JPG; используйте convert_many")
+    return outputs[0][1]
+
+
+def _result(index, path, future):
+    """Собирает ImageResult из завершенного задания."""
+    try:
+        outputs, stats = future.result()
+    except Exception as e:
+        return ImageResult(index, path, error=str(e), too_large=isinstance(e, ImageTooLargeError))
+    return ImageResult(index, path, tuple(outputs), stats)
+
+
+def convert_many(sources, options=None, workers=None):
+    """
+    Преобразует изображения параллельно и возвращает результаты по мере готовности.
+
+    Исходные изображения берутся из итератора постепенно: в работе
+    одновременно не более workers * ConversionEngine.PENDING_PER_WORKER
+    изображений, поэтому память не зависит от длины последовательности.
+    Ошибка одного изображения не прерывает остальные.
+
+    Args:
+        sources: итерируемый набор байтов, путей и файловых объектов
+        options: экземпляр ConversionOptions (None - параметры по умолчанию)
+        workers: число рабочих процессов (None или 0 - по числу процессоров,
+            1 - в вызывающем потоке без пула процессов)
+
+    Yields:
+        ImageResult в порядке завершения (исходный порядок - поле index)
+    """
+    options = _check_options(options)
+    workers = resolve_worker_count(workers)
+    if workers == 1:
+        for index, source in enumerate(sources):
+            path = None
+            try:
+                source, path = _load(source)
+                outputs, stats = _render(source, _output_name(path), options)
+            except Exception as e:
+                yield ImageResult(index, path, error=str(e), too_large=isinstance(e, ImageTooLargeError))
+                continue
+            yield ImageResult(index, path, tuple(outputs), stats)
+        return
+
+    depth = workers * ConversionEngine.PENDING_PER_WORKER
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_ignore_interrupt) as executor:
+        try:
+            for index, source in enumerate(sources):
+                # Пока заданий в работе слишком много, отдаем готовые результаты
+                while len(pending) >= depth:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield _result(*pending.pop(future), future)
+                try:
+                    source, path = _load(source)
+                except (OSError, TypeError) as e:
+                    yield ImageResult(index, error=str(e))
+                    continue
+                pending[executor.submit(_render, source, _output_name(path), options)] = (index, path)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield _result(*pending.pop(future), future)
+        finally:
+            # Генератор закрыт досрочно: задания, не начатые пулом, не выполняются
+            for future in pending:
+                future.cancel()
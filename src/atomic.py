@@ -0,0 +1,47 @@
+"""
+Временные файлы для атомарной записи результатов.
+
+JPG, записи кеша и манифест пишутся во временный файл в той же папке и затем
+переименовываются через os.replace. Временный файл создается сразу с
+обычными правами: 0666 с учетом маски процесса (ее применяет ядро, как
+при обычном open) или с правами уже существующего файла назначения.
+Маска процесса не читается и не меняется, поэтому файлы, создаваемые в
+это время другими потоками, не получают лишних прав.
+"""
+
+import os
+import secrets
+import stat
+
+
+# Сколько раз пробовать новое имя, если временный файл с таким именем уже есть
+_NAME_ATTEMPTS = 100
+
+
+def create_temp_file(output_path):
+    """
+    Создает скрытый временный файл рядом с output_path.
+
+    Returns:
+        пара (дескриптор файла, открытого для записи, путь к временному файлу)
+    """
+    directory, file_name = os.path.split(output_path)
+    try:
+        mode = stat.S_IMODE(os.stat(output_path).st_mode)
+    except OSError:
+        mode = None
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    for _ in range(_NAME_ATTEMPTS):
+        temp_path = os.path.join(directory, f".{file_name}.{secrets.token_hex(4)}.tmp")
+        try:
+            fd = os.open(temp_path, flags, 0o666)
+        except FileExistsError:
+            continue
+        if mode is not None:
+            # Перезаписываемый файл сохраняет свои права
+            try:
+                os.chmod(temp_path, mode)
+            except OSError:
+                pass
+        return fd, temp_path
+    raise FileExistsError(f"Не удалось создать временный файл для {output_path}")
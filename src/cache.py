@@ -0,0 +1,242 @@
+"""
+Общий кеш результатов преобразования.
+
+Ключ записи - хеш содержимого исходного файла вместе с параметрами,
+влияющими на результат (качество, размеры, профиль кодировщика и т.д.),
+поэтому один и тот же исходный файл, преобразуемый в разные выходные
+папки или под разными именами, кодируется один раз. При попадании JPG
+копируются из кеша (на файловых системах с reflink - клонируются без
+копирования данных) вместо декодирования и кодирования.
+
+Кеш хранится в папке кеша пользователя и ограничен по размеру: при
+превышении удаляются записи, которые дольше всего не использовались.
+Каждая запись - отдельная папка, поэтому кеш можно безопасно удалить
+целиком в любой момент.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from .atomic import create_temp_file
+from .manifest import options_fingerprint
+from .settings import APP_NAME
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# Имя файла описания записи внутри ее папки
+ENTRY_META = "entry.json"
+# ioctl FICLONE (Linux): клонирование файла на Btrfs, XFS и других файловых системах с reflink
+_FICLONE = 0x40049409
+
+
+def user_cache_dir():
+    """
+    Возвращает папку кеша результатов пользователя.
+
+    Linux: $XDG_CACHE_HOME/png-to-jpg-converter/results (по умолчанию ~/.cache/...),
+    macOS: ~/Library/Caches/png-to-jpg-converter/results,
+    Windows: %LOCALAPPDATA%\\png-to-jpg-converter\\results.
+    """
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, APP_NAME, "results")
+
+
+def clone_file(source_path, output_path):
+    """
+    Атомарно создает output_path с содержимым source_path.
+
+    Сначала пробует reflink (копия без копирования данных), затем обычное
+    копирование. Как и write_output, пишет во временный файл в той же
+    папке и переименовывает его.
+    """
+    fd, temp_path = create_temp_file(output_path)
+    try:
+        with os.fdopen(fd, 'wb') as target, open(source_path, 'rb') as source:
+            try:
+                if fcntl is None:
+                    raise OSError("reflink недоступен")
+                fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+            except OSError:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ResultCache:
+    """
+    Кеш закодированных JPG с адресацией по содержимому и вытеснением LRU.
+
+    Методы вызываются из потоков чтения и записи движка.
+    """
+
+    def __init__(self, directory=None, max_bytes=1024 * 1024 * 1024):
+        """
+        Args:
+            directory: папка кеша (по умолчанию - в папке кеша пользователя)
+            max_bytes: предельный размер кеша в байтах
+        """
+        self.directory = directory or user_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Ключ -> [размер записи, время последнего использования]
+        self._entries = None
+        self._size = 0
+
+    @staticmethod
+    def key(data, options):
+        """Вычисляет ключ записи по байтам исходного файла и параметрам преобразования."""
+        digest = hashlib.blake2b(data, digest_size=20)
+        digest.update(json.dumps(options_fingerprint(options), sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _entry_dir(self, key):
+        """Папка записи (с промежуточной папкой из первых двух символов ключа)."""
+        return os.path.join(self.directory, key[:2], key)
+
+    def _load(self):
+        """Один раз обходит папку кеша и запоминает размер и время использования записей."""
+        if self._entries is not None:
+            return
+        self._entries = {}
+        self._size = 0
+        try:
+            shards = os.scandir(self.directory)
+        except FileNotFoundError:
+            return
+        with shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    try:
+                        meta = os.stat(os.path.join(entry.path, ENTRY_META))
+                        size = sum(item.stat().st_size for item in os.scandir(entry.path))
+                    except OSError:
+                        continue
+                    self._entries[entry.name] = [size, meta.st_mtime]
+                    self._size += size
+
+    def restore(self, key, output_path, options):
+        """
+        Создает выходные JPG задания из записи кеша.
+
+        Returns:
+            кортеж записанных путей или None, если записи нет
+        """
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, ENTRY_META), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            written = []
+            for number, slot in enumerate(meta["outputs"]):
+                path = options.slot_path(output_path, slot)
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                clone_file(os.path.join(entry_dir, f"{number}.jpg"), path)
+                written.append(path)
+        except (OSError, ValueError, KeyError, IndexError, TypeError):
+            # Записи нет, она повреждена или удалена другим процессом
+            with self._lock:
+                self.misses += 1
+            return None
+
+        now = time.time()
+        try:
+            # Время изменения описания - время последнего использования (LRU между запусками)
+            os.utime(os.path.join(entry_dir, ENTRY_META), (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            if self._entries is not None and key in self._entries:
+                self._entries[key][1] = now
+        return tuple(written)
+
+    def store(self, key, outputs, output_path, options):
+        """
+        Сохраняет закодированные JPG задания и при необходимости вытесняет старые записи.
+
+        Args:
+            outputs: список пар (путь, байты JPG), как у render_outputs
+        """
+        slots = [options.output_slot(output_path, path) for path, _ in outputs]
+        size = sum(len(data) for _, data in outputs)
+        if size > self.max_bytes:
+            return
+
+        entry_dir = self._entry_dir(key)
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix=f".{key}.", dir=os.path.dirname(entry_dir))
+        try:
+            for number, (_, data) in enumerate(outputs):
+                with open(os.path.join(temp_dir, f"{number}.jpg"), 'wb') as f:
+                    f.write(data)
+            with open(os.path.join(temp_dir, ENTRY_META), 'w', encoding='utf-8') as f:
+                json.dump({"outputs": slots}, f)
+            size += os.path.getsize(os.path.join(temp_dir, ENTRY_META))
+            try:
+                os.rename(temp_dir, entry_dir)
+            except OSError:
+                # Ту же запись уже сохранил другой поток или процесс
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                return
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        with self._lock:
+            self._load()
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._size -= previous[0]
+            self._entries[key] = [size, time.time()]
+            self._size += size
+            self._evict()
+
+    def _evict(self):
+        """Удаляет записи, которые дольше всего не использовались, пока кеш больше max_bytes (под блокировкой)."""
+        if self._size <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            del self._entries[key]
+            self._size -= size
+            if self._size <= self.max_bytes:
+                break
+
+    @property
+    def size(self):
+        """Текущий размер кеша в байтах."""
+        with self._lock:
+            self._load()
+            return self._size
+
+    def clear(self):
+        """Удаляет все записи кеша."""
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._entries = {}
+            self._size = 0
@@ -0,0 +1,404 @@
+"""
+Консольный (безголовый) интерфейс конвертера.
+
+Модуль не импортирует tkinter и ttkthemes, поэтому подходит для запуска
+на серверах без дисплея и в заданиях cron.
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+
+from .cache import ResultCache
+from .dedup import DEDUPE_MODES
+from .engine import ConversionEngine
+from .instrumentation import JsonLinesObserver, SummaryTableObserver
+from .journal import CheckpointJournal
+from .manifest import ConversionManifest
+from .naming import DEFAULT_NAMING_PATTERN, OutputPlanner
+from .options import (DEFAULT_ENCODER_PROFILE, DEFAULT_MAX_IMAGE_PIXELS, ENCODER_PROFILES, FRAME_MODES,
+                      RENDITION_LAYOUTS, ConversionOptions, Rendition, parse_color, parse_reducing_gap)
+from .scanner import iter_jobs
+from .settings import SettingsStore
+from .watcher import watch_folder
+
+
+def _quality(value):
+    """Проверяет значение качества JPG для argparse."""
+    try:
+        quality = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"недопустимое значение качества: {value}")
+    if not 1 <= quality <= 100:
+        raise argparse.ArgumentTypeError("качество должно быть между 1 и 100")
+    return quality
+
+
+def _dimension(value):
+    """Проверяет значение ширины или высоты для argparse."""
+    try:
+        size = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"недопустимый размер: {value}")
+    if size < 0:
+        raise argparse.ArgumentTypeError("размер не может быть отрицательным")
+    return size
+
+
+def _positive(value):
+    """Проверяет положительное целое число для argparse."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"недопустимое число: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError("значение должно быть не меньше 1")
+    return number
+
+
+def _ssim(value):
+    """Проверяет порог SSIM для argparse."""
+    try:
+        target = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"недопустимый порог: {value}")
+    if not 0 <= target < 1:
+        raise argparse.ArgumentTypeError("порог SSIM должен быть от 0 до 1 (например, 0.95)")
+    return target
+
+
+def _reducing_gap(value):
+    """Проверяет запас быстрого уменьшения для argparse."""
+    try:
+        return parse_reducing_gap(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _color(value):
+    """Проверяет цвет фона для argparse."""
+    try:
+        return parse_color(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _rendition(value):
+    """Разбирает описание варианта размера для argparse."""
+    try:
+        return Rendition.parse(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _add_conversion_arguments(parser):
+    """Добавляет параметры преобразования, общие для команд convert и watch."""
+    parser.add_argument("--quality", type=_quality, default=95, help="качество JPG (1-100, по умолчанию 95)")
+    parser.add_argument("--max-size-kb", type=_dimension, default=0,
+                        help="максимальный размер JPG в КБ: качество подбирается двоичным поиском "
+                             "не выше --quality (0 - без ограничения)")
+    parser.add_argument("--profile", dest="encoder_profile", choices=tuple(ENCODER_PROFILES),
+                        default=DEFAULT_ENCODER_PROFILE,
+                        help="профиль кодировщика JPEG: fast - быстрее, без оптимизации таблиц Хаффмана; "
+                             "web - прогрессивный JPEG; archival - 4:4:4 и качество не ниже 95 "
+                             "(по умолчанию standard)")
+    parser.add_argument("--target-ssim", type=_ssim, default=0.0,
+                        help="автоматическое качество: наименьшее качество не выше --quality, при котором "
+                             "SSIM с исходным изображением не ниже порога, например 0.95 (нужен NumPy; "
+                             "0 - одно качество для всех)")
+    parser.add_argument("--width", type=_dimension, default=0, help="целевая ширина (0 - без изменения)")
+    parser.add_argument("--height", type=_dimension, default=0, help="целевая высота (0 - без изменения)")
+    parser.add_argument("--no-keep-aspect", dest="preserve_aspect_ratio", action="store_false",
+                        help="не сохранять соотношение сторон при изменении размера")
+    parser.add_argument("--rendition", dest="renditions", action="append", type=_rendition, default=[],
+                        metavar="NAME:WxH[:QUALITY]",
+                        help="создать вариант размера (можно повторять), например full:1920x1080 "
+                             "или thumb:320x0:70; заменяет --width и --height")
+    parser.add_argument("--rendition-layout", choices=RENDITION_LAYOUTS, default="subfolder",
+                        help="размещение вариантов: подпапка с именем варианта или суффикс в имени файла")
+    parser.add_argument("--background", type=_color, default=(255, 255, 255),
+                        help="цвет фона для прозрачных областей, например #000000 (по умолчанию белый)")
+    parser.add_argument("--reducing-gap", type=_reducing_gap, default=3.0,
+                        help="запас быстрого уменьшения перед LANCZOS: 0 - точный LANCZOS, иначе не меньше "
+                             "1.0; значения ближе к 1.0 быстрее (по умолчанию 3.0)")
+    parser.add_argument("--frames", dest="frame_mode", choices=FRAME_MODES, default="first",
+                        help="кадры анимированных GIF, WebP и APNG: только первый, каждый отдельным "
+                             "JPG (ИМЯ_0001.jpg, ...) или все на одном листе (по умолчанию first)")
+    parser.add_argument("--frame-step", type=_positive, default=1,
+                        help="брать каждый N-й кадр анимации (по умолчанию 1 - все кадры)")
+    parser.add_argument("--sheet-columns", type=_dimension, default=0,
+                        help="число столбцов листа кадров (0 - примерно квадратный лист)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="число рабочих процессов (0 - по числу процессоров)")
+    parser.add_argument("--read-threads", type=int, default=0,
+                        help="число потоков упреждающего чтения (0 - по умолчанию)")
+    parser.add_argument("--write-threads", type=int, default=0,
+                        help="число потоков записи (0 - по умолчанию)")
+    parser.add_argument("--pipeline-depth", type=int, default=0,
+                        help="максимум файлов одновременно в конвейере, ограничивает память "
+                             "(0 - четыре на процесс)")
+    parser.add_argument("--name-pattern", default=DEFAULT_NAMING_PATTERN,
+                        help="шаблон имени JPG; поля {filename} {ext} {width} {height} {quality} "
+                             "{date} {hash8} (по умолчанию \"{filename}.jpg\")")
+    parser.add_argument("--date-subfolder", action="store_true",
+                        help="складывать результаты в подпапку OUT/ГГГГ-ММ-ДД")
+    parser.add_argument("--memory-budget-mb", type=int, default=0,
+                        help="память на одновременно декодируемые изображения в МБ; изображения больше "
+                             "бюджета обрабатываются по одному (0 - половина ОЗУ, -1 - без ограничения)")
+    parser.add_argument("--max-image-pixels", type=_dimension, default=DEFAULT_MAX_IMAGE_PIXELS,
+                        help="не открывать изображения с большим числом пикселей (защита от "
+                             "\"бомб декомпрессии\"; по умолчанию как в Pillow; 0 или большее значение "
+                             "не снимают предел Pillow Image.MAX_IMAGE_PIXELS)")
+    parser.add_argument("--cache-mb", type=_dimension, default=0,
+                        help="кеш результатов в МБ, общий для запусков и выходных папок: файл, уже "
+                             "преобразованный с теми же параметрами, копируется из кеша (0 - без кеша)")
+    parser.add_argument("--cache-dir", help="папка кеша результатов (по умолчанию папка кеша пользователя)")
+    parser.add_argument("--dedupe", choices=DEDUPE_MODES,
+                        help="преобразовывать побайтно одинаковые исходные файлы один раз, а JPG остальных "
+                             "создавать жесткими ссылками (link) или копиями (copy)")
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="обрабатывать вложенные папки, повторяя их структуру в OUT")
+    parser.add_argument("--hash", dest="content_hash", action="store_true",
+                        help="сверять хеш содержимого файлов с измененным временем модификации")
+    parser.add_argument("-q", "--quiet", action="store_true", help="не выводить сообщения о каждом файле")
+
+
+def build_parser():
+    """Создает парсер аргументов командной строки."""
+    parser = argparse.ArgumentParser(
+        prog="png-to-jpg",
+        description="Конвертер изображений в JPG. Без аргументов запускает графический интерфейс."
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    convert_parser = subparsers.add_parser("convert", help="преобразовать все изображения из папки")
+    convert_parser.add_argument("input_dir", metavar="IN", help="входная папка с изображениями")
+    convert_parser.add_argument("output_dir", metavar="OUT", help="выходная директория для JPG")
+    _add_conversion_arguments(convert_parser)
+    convert_parser.add_argument("--skip-existing", action="store_true",
+                                help="не перезаписывать уже существующие JPG")
+    convert_parser.add_argument("--force", action="store_true",
+                                help="преобразовать все файлы, не проверяя манифест ранее выполненных преобразований")
+    convert_parser.add_argument("--no-resume", dest="resume", action="store_false",
+                                help="не продолжать прерванный пакет, а начать заново (журнал удаляется)")
+    convert_parser.add_argument("--stats", action="store_true",
+                                help="вывести в конце таблицу времени этапов и счетчиков")
+    convert_parser.add_argument("--stats-jsonl", metavar="PATH",
+                                help="дописывать статистику по каждому файлу в журнал JSON Lines")
+
+    watch_parser = subparsers.add_parser(
+        "watch", help="наблюдать за папкой и преобразовывать новые и измененные изображения")
+    watch_parser.add_argument("input_dir", metavar="IN", nargs="?",
+                              help="наблюдаемая папка (по умолчанию last_input_directory из настроек)")
+    watch_parser.add_argument("output_dir", metavar="OUT", nargs="?",
+                              help="выходная директория (по умолчанию default_output_directory из настроек)")
+    _add_conversion_arguments(watch_parser)
+    watch_parser.add_argument("--poll", action="store_true",
+                              help="опрашивать папку вместо inotify (например, для сетевых папок)")
+    watch_parser.add_argument("--debounce", type=float, default=0.3,
+                              help="сколько секунд файл не должен меняться перед преобразованием (по умолчанию 0.3)")
+    return parser
+
+
+def _options_from_args(args):
+    """Создает ConversionOptions из разобранных аргументов."""
+    return ConversionOptions(
+        quality=args.quality,
+        target_width=args.width,
+        target_height=args.height,
+        preserve_aspect_ratio=args.preserve_aspect_ratio,
+        reducing_gap=args.reducing_gap,
+        background_color=args.background,
+        max_size_kb=args.max_size_kb,
+        renditions=tuple(args.renditions),
+        rendition_layout=args.rendition_layout,
+        max_image_pixels=args.max_image_pixels,
+        frame_mode=args.frame_mode,
+        frame_step=args.frame_step,
+        sheet_columns=args.sheet_columns,
+        encoder_profile=args.encoder_profile,
+        target_ssim=args.target_ssim
+    )
+
+
+def _create_engine(args):
+    """Создает движок с параметрами конвейера из аргументов."""
+    cache = ResultCache(args.cache_dir, args.cache_mb * 1024 * 1024) if args.cache_mb else None
+    return ConversionEngine(args.workers, args.read_threads, args.write_threads, args.pipeline_depth,
+                            args.memory_budget_mb, cache)
+
+
+def _report_failure(result):
+    """Сообщает о файле, который не удалось преобразовать."""
+    if result.too_large:
+        print(f"Пропущен {result.source_path}: {result.error}; "
+              f"предел задается параметром --max-image-pixels", file=sys.stderr)
+    else:
+        print(f"Не удалось преобразовать {result.source_path}: {result.error}", file=sys.stderr)
+
+
+def _report_collisions(planner):
+    """Сообщает о файлах, переименованных из-за совпадения имен."""
+    for source_path, wanted_path, output_path in planner.collisions:
+        print(f"Совпадение имен: {source_path} сохранен как {output_path} "
+              f"вместо {wanted_path}", file=sys.stderr)
+
+
+def _load_manifest(output_dir, content_hash):
+    """Загружает манифест и сообщает, если поврежденный манифест будет пересоздан."""
+    manifest = ConversionManifest.load(output_dir, content_hash)
+    if manifest.load_error:
+        print(f"Манифест {manifest.path} поврежден и будет пересоздан: {manifest.load_error}", file=sys.stderr)
+    return manifest
+
+
+def _report_scan_errors(scan_errors):
+    """Сообщает о папках, которые не удалось прочитать при обходе."""
+    for directory, error in scan_errors:
+        print(f"Не удалось прочитать папку {directory}: {error}", file=sys.stderr)
+
+
+def run_convert(args):
+    """Выполняет команду convert. Возвращает код завершения процесса."""
+    if not os.path.isdir(args.input_dir):
+        print(f"Входная папка не найдена: {args.input_dir}", file=sys.stderr)
+        return 2
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    options = _options_from_args(args)
+    try:
+        planner = OutputPlanner(args.output_dir, options, args.name_pattern, args.date_subfolder)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    scan_errors = []
+    jobs = iter_jobs(args.input_dir, args.output_dir, recursive=args.recursive, planner=planner,
+                     errors=scan_errors)
+
+    manifest = None
+    if not args.force:
+        manifest = _load_manifest(args.output_dir, args.content_hash)
+
+    # Журнал прерванного пакета: готовые файлы пропускаются, остальные продолжаются
+    journal = CheckpointJournal.load(args.output_dir, options)
+    if journal.load_error:
+        print(f"Журнал {journal.path} поврежден и будет пересоздан: {journal.load_error}", file=sys.stderr)
+    if not args.resume or args.force:
+        journal.discard()
+    elif len(journal) and not args.quiet:
+        print(f"Продолжение прерванного пакета: {len(journal)} файлов уже преобразовано")
+
+    observers = []
+    if args.stats:
+        observers.append(SummaryTableObserver())
+    if args.stats_jsonl:
+        observers.append(JsonLinesObserver(args.stats_jsonl))
+
+    engine = _create_engine(args)
+    success_count = 0
+    skipped_count = 0
+    try:
+        for result in engine.run(jobs, options, manifest, observers, overwrite=not args.skip_existing,
+                                 dedupe=args.dedupe, journal=journal):
+            if result.skipped:
+                skipped_count += 1
+            elif result.ok:
+                success_count += 1
+                if not args.quiet:
+                    print(f"Преобразовано: {result.source_path} -> {result.output_path}")
+                if result.cache_error:
+                    print(f"{result.source_path}: {result.cache_error}", file=sys.stderr)
+            else:
+                _report_failure(result)
+    except KeyboardInterrupt:
+        # Готовые файлы уже записаны в журнал
+        _report_scan_errors(scan_errors)
+        _report_collisions(planner)
+        print(f"Преобразование прервано после {success_count} файлов. "
+              f"Повторный запуск той же команды продолжит пакет.", file=sys.stderr)
+        return 130
+    _report_scan_errors(scan_errors)
+    _report_collisions(planner)
+
+    total = engine.discovered
+    if not total:
+        print(f"В папке {args.input_dir} нет поддерживаемых изображений.", file=sys.stderr)
+        return 0
+
+    summary = f"Преобразование завершено. {success_count}/{total} файлов успешно преобразовано."
+    if skipped_count:
+        summary += f" Пропущено (без изменений или уже существуют): {skipped_count}."
+    if engine.summary.duplicates:
+        summary += (f" Одинаковых файлов: {engine.summary.duplicates} в {engine.summary.duplicate_groups} "
+                    f"группах, преобразованы один раз.")
+    if engine.summary.cache_hits:
+        summary += f" Взято из кеша без повторного кодирования: {engine.summary.cache_hits}."
+    print(summary)
+    return 0 if success_count + skipped_count == total else 1
+
+
+def run_watch(args, stop_event=None):
+    """
+    Выполняет команду watch: преобразует новые файлы, пока процесс не остановлен (Ctrl+C).
+
+    Returns:
+        код завершения процесса
+    """
+    # Папки по умолчанию - из настроек графического интерфейса
+    settings = SettingsStore()
+    for error in settings.load_errors:
+        print(error, file=sys.stderr)
+    input_dir = args.input_dir or settings.get("last_input_directory")
+    output_dir = args.output_dir or settings.get("default_output_directory")
+    if not input_dir or not os.path.isdir(input_dir):
+        print(f"Входная папка не найдена: {input_dir}", file=sys.stderr)
+        return 2
+    if not output_dir:
+        print("Не указана выходная директория", file=sys.stderr)
+        return 2
+    os.makedirs(output_dir, exist_ok=True)
+
+    options = _options_from_args(args)
+    try:
+        planner = OutputPlanner(output_dir, options, args.name_pattern, args.date_subfolder)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    manifest = _load_manifest(output_dir, args.content_hash)
+
+    def on_result(result):
+        if result.ok and not result.skipped:
+            if not args.quiet:
+                print(f"Преобразовано: {result.source_path} -> {result.output_path}", flush=True)
+        elif not result.ok:
+            _report_failure(result)
+
+    if not args.quiet:
+        print(f"Наблюдение за {input_dir} (Ctrl+C - остановить)", flush=True)
+    try:
+        watch_folder(input_dir, output_dir, _create_engine(args), options, planner, manifest,
+                     recursive=args.recursive, polling=args.poll, debounce=args.debounce,
+                     stop_event=stop_event, on_result=on_result, dedupe=args.dedupe)
+    except KeyboardInterrupt:
+        pass
+    _report_collisions(planner)
+    return 0
+
+
+def main(argv=None):
+    """Точка входа консольного интерфейса."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # NumPy проверяется без импорта: он загружается только в рабочих процессах
+    if getattr(args, "target_ssim", 0) and importlib.util.find_spec("numpy") is None:
+        print("Для --target-ssim нужен NumPy: pip install numpy", file=sys.stderr)
+        return 2
+    if args.command == "convert":
+        return run_convert(args)
+    if args.command == "watch":
+        return run_watch(args)
+
+    parser.print_help()
+    return 2
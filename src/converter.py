@@ -5,16 +5,33 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-import json
-from PIL import Image
+import importlib
+import importlib.util
+import queue
 import threading
 import sys
-try:
-    from ttkthemes import ThemedStyle
-    HAS_TTKTHEMES = True
-except ImportError:
-    HAS_TTKTHEMES = False
-    ThemedStyle = None
+
+# Модули с Pillow (движок, обработка изображений) и ttkthemes не импортируются
+# при запуске: окно появляется сразу, а они загружаются в фоне после его показа
+from .cache import ResultCache
+from .dedup import DEDUPE_MODES
+from .instrumentation import JsonLinesObserver
+from .journal import CheckpointJournal
+from .manifest import ConversionManifest
+from .options import (DEFAULT_ENCODER_PROFILE, DEFAULT_MAX_IMAGE_PIXELS, ENCODER_PROFILES, FRAME_MODES,
+                      SUPPORTED_EXTENSIONS, ConversionOptions, Rendition, parse_color, parse_reducing_gap)
+from .naming import DEFAULT_NAMING_PATTERN, NamingPattern, OutputPlanner
+from .scanner import iter_jobs
+from .settings import SettingsStore
+
+
+def _themed_style_class():
+    """Возвращает класс ThemedStyle из ttkthemes или None, если пакет не установлен."""
+    try:
+        from ttkthemes import ThemedStyle
+    except ImportError:
+        return None
+    return ThemedStyle
 
 
 class PNGtoJPGConverter:
@@ -22,16 +39,29 @@ class PNGtoJPGConverter:
     Графическое приложение для преобразования изображений в формат JPG.
     """
     
+    # Период обновления прогресса в главном цикле (мс), около 20 кадров в секунду
+    PROGRESS_INTERVAL_MS = 50
+    # Сколько ошибок перечислять в итоговом отчете
+    MAX_REPORTED_ERRORS = 20
+    
     def __init__(self):
         """Инициализирует приложение конвертера."""
         self.root = tk.Tk()
         self.root.title("PNG to JPG Converter")
-        self.root.geometry("700x500")
+        self.root.geometry("700x580")
         
-        # Определение системной темы
-        self.system_theme = self._detect_system_theme()
-        # Используем светлую тему по умолчанию, если не удалось определить
-        self.current_theme = self.system_theme if self.system_theme in ["light", "dark"] else "light"
+        # Системная тема определяется в фоне после показа окна (см. _start_background_startup);
+        # до этого используется светлая
+        self.system_theme = "light"
+        self.current_theme = "light"
+        self.startup_events = queue.Queue()
+        # Становится True, когда фоновые шаги запуска завершены и тема применена
+        self.startup_complete = False
+        # Движок текущего преобразования (для паузы и отмены) и запрошенные действия
+        self.engine = None
+        self.conversion_running = False
+        self.cancel_requested = False
+        self.close_requested = False
         
         # Загрузка настроек из файла
         self.load_settings()
@@ -41,8 +71,45 @@ class PNGtoJPGConverter:
         # После настройки UI установим значения из настроек
         self.update_ui_with_settings()
         
-        # Применяем текущую тему
-        self._apply_theme()
+        # Окно показывается со стандартным оформлением; тема применяется, когда ttkthemes загружен
+        self.root.after_idle(self._start_background_startup)
+    
+    def _start_background_startup(self):
+        """Запускает отложенную работу после появления окна."""
+        thread = threading.Thread(target=self._background_startup, daemon=True)
+        thread.start()
+        self.root.after(self.PROGRESS_INTERVAL_MS, self._poll_startup)
+    
+    def _background_startup(self):
+        """
+        Выполняет медленные шаги запуска в фоновом потоке.
+
+        Поток не обращается к Tk: определение системной темы (запуск gsettings
+        или defaults) и импорт ttkthemes и Pillow передаются главному циклу
+        через очередь startup_events.
+        """
+        system_theme = self._detect_system_theme() if self.theme_preference == "system" else None
+        _themed_style_class()
+        self.startup_events.put(("theme", system_theme))
+        try:
+            # Загружаем Pillow и движок заранее, чтобы первое преобразование не ждало импорта
+            importlib.import_module(".engine", __package__)
+        except ImportError:
+            pass
+    
+    def _poll_startup(self):
+        """Применяет результаты фонового запуска в главном цикле Tk."""
+        try:
+            kind, payload = self.startup_events.get_nowait()
+        except queue.Empty:
+            self.root.after(self.PROGRESS_INTERVAL_MS, self._poll_startup)
+            return
+        if kind == "theme":
+            if payload in ("light", "dark"):
+                self.system_theme = payload
+            self.current_theme = self.system_theme if self.theme_preference == "system" else self.theme_preference
+            self._apply_theme()
+            self.startup_complete = True
     
     def _detect_system_theme(self):
         """
@@ -112,7 +179,8 @@ class PNGtoJPGConverter:
     
     def _apply_dark_theme(self):
         """Применяет темную тему к интерфейсу приложения."""
-        if HAS_TTKTHEMES and ThemedStyle:
+        ThemedStyle = _themed_style_class()
+        if ThemedStyle:
             # Используем ThemedStyle для более продвинутой темной темы
             style = ThemedStyle(self.root)
             # Пытаемся использовать тему, которая поддерживает темный режим
@@ -137,7 +205,7 @@ class PNGtoJPGConverter:
         self.root.configure(bg=bg_color)
         
         # Настройка стилей для различных элементов
-        if HAS_TTKTHEMES and ThemedStyle and isinstance(style, ThemedStyle):
+        if ThemedStyle and isinstance(style, ThemedStyle):
             # Для ThemedStyle используем специфические темы
             pass
         else:
@@ -157,7 +225,8 @@ class PNGtoJPGConverter:
     
     def _apply_light_theme(self):
         """Применяет светлую тему к интерфейсу приложения."""
-        if HAS_TTKTHEMES and ThemedStyle:
+        ThemedStyle = _themed_style_class()
+        if ThemedStyle:
             # Используем ThemedStyle для более продвинутой светлой темы
             style = ThemedStyle(self.root)
             # Пытаемся использовать светлую тему из ttkthemes
@@ -234,6 +303,11 @@ class PNGtoJPGConverter:
         input_browse_button = ttk.Button(input_frame, text="Обзор", command=self.browse_input)
         input_browse_button.grid(row=0, column=2)
         
+        self.recursive_var = tk.BooleanVar(value=self.recursive_scan)
+        recursive_check = ttk.Checkbutton(input_frame, text="Включая вложенные папки", variable=self.recursive_var)
+        recursive_check.grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        recursive_check.config(command=self.on_recursive_changed)
+        
         # Раздел выходной директории
         output_frame = ttk.LabelFrame(main_frame, text="Настройки вывода", padding="10")
         output_frame.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -255,6 +329,37 @@ class PNGtoJPGConverter:
         quality_spinbox.bind('<FocusOut>', self.on_quality_changed)
         quality_spinbox.bind('<KeyRelease>', self.on_quality_key_release)
         
+        # Ограничение размера файла
+        ttk.Label(output_frame, text="Макс. размер, КБ (0 - без ограничения):").grid(row=3, column=0, sticky=tk.W, pady=(10, 0))
+        
+        self.max_size_var = tk.StringVar(value=str(self.max_size_kb))
+        max_size_spinbox = ttk.Spinbox(output_frame, from_=0, to=100000, increment=10, textvariable=self.max_size_var, width=10)
+        max_size_spinbox.grid(row=3, column=1, sticky=tk.W, padx=(5, 0), pady=(10, 0))
+        
+        # Профиль кодировщика: скорость кодирования против размера файла
+        ttk.Label(output_frame, text="Профиль кодировщика:").grid(row=4, column=0, sticky=tk.W, pady=(10, 0))
+        
+        self.encoder_profile_var = tk.StringVar(value=self.encoder_profile)
+        encoder_profile_combo = ttk.Combobox(
+            output_frame,
+            textvariable=self.encoder_profile_var,
+            values=list(ENCODER_PROFILES),
+            state="readonly",
+            width=12
+        )
+        encoder_profile_combo.grid(row=4, column=1, sticky=tk.W, padx=(5, 0), pady=(10, 0))
+        encoder_profile_combo.bind("<<ComboboxSelected>>", self.on_encoder_profile_changed)
+        
+        # Автоматическое качество: наименьшее качество с SSIM не ниже порога
+        self.auto_quality_var = tk.BooleanVar(value=self.auto_quality)
+        auto_quality_check = ttk.Checkbutton(
+            output_frame,
+            text=f"Автоматическое качество (SSIM не ниже {self.auto_quality_target}, качество выше - предел)",
+            variable=self.auto_quality_var,
+            command=self.on_auto_quality_changed
+        )
+        auto_quality_check.grid(row=5, column=0, columnspan=3, sticky=tk.W, pady=(10, 0))
+        
         # Настройки разрешения
         resolution_frame = ttk.LabelFrame(output_frame, text="Настройки разрешения", padding="5")
         resolution_frame.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(10, 0))
@@ -302,9 +407,27 @@ class PNGtoJPGConverter:
         aspect_ratio_check.grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
         aspect_ratio_check.config(command=self.on_aspect_ratio_changed)
         
-        # Кнопка преобразования
-        self.convert_button = ttk.Button(main_frame, text="Преобразовать в JPG", command=self.start_conversion)
-        self.convert_button.grid(row=3, column=0, columnspan=3, pady=(20, 0))
+        # Набор вариантов размера задается в настройках и заменяет поля ширины и высоты
+        if self.renditions:
+            names = ", ".join(
+                f"{item.get('name')} {item.get('width', 0)}x{item.get('height', 0)}" for item in self.renditions
+            )
+            ttk.Label(resolution_frame, text=f"Набор размеров из настроек: {names}",
+                      wraplength=600).grid(row=3, column=0, columnspan=4, sticky=tk.W, pady=(5, 0))
+        
+        # Кнопки преобразования, паузы и отмены
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=3, column=0, columnspan=3, pady=(20, 0))
+        
+        self.convert_button = ttk.Button(button_frame, text="Преобразовать в JPG", command=self.start_conversion)
+        self.convert_button.grid(row=0, column=0)
+        
+        self.pause_button = ttk.Button(button_frame, text="Пауза", command=self.toggle_pause, state='disabled')
+        self.pause_button.grid(row=0, column=1, padx=(10, 0))
+        
+        self.cancel_button = ttk.Button(button_frame, text="Отмена", command=self.cancel_conversion,
+                                        state='disabled')
+        self.cancel_button.grid(row=0, column=2, padx=(10, 0))
         
         # Индикатор прогресса
         self.progress = ttk.Progressbar(main_frame, mode='determinate')
@@ -358,26 +481,27 @@ class PNGtoJPGConverter:
             self.output_entry.delete(0, tk.END)
             self.output_entry.insert(0, directory)
     
-    def convert_files(self):
-        """Выполняет фактическое преобразование в отдельном потоке."""
+    def _read_conversion_options(self):
+        """
+        Проверяет введенные параметры и возвращает ConversionOptions.
+
+        Вызывается в главном потоке; при ошибке показывает сообщение и возвращает None.
+        """
         if not self.input_dir or not os.path.isdir(self.input_dir):
             messagebox.showwarning("Нет входной папки", "Пожалуйста, выберите входную папку с изображениями.")
-            return
+            return None
         
         if not self.output_dir or not os.path.isdir(self.output_dir):
             messagebox.showwarning("Нет выходной директории", "Пожалуйста, выберите выходную директорию.")
-            return
+            return None
         
         try:
             self.quality = int(self.quality_var.get())
             if not 1 <= self.quality <= 100:
                 raise ValueError("Качество должно быть между 1 и 100")
-            
-            # Сохраняем настройки качества
-            self.save_settings()
         except ValueError:
             messagebox.showerror("Неверное качество", "Пожалуйста, введите допустимое значение качества (1-100).")
-            return
+            return None
         
         try:
             self.target_width = int(self.width_var.get())
@@ -387,110 +511,357 @@ class PNGtoJPGConverter:
             # Проверка, что по крайней мере одна размерность указана, если требуется изменение разрешения
             if (self.target_width > 0 or self.target_height > 0) and (self.target_width == 0 and self.target_height == 0):
                 raise ValueError("Ширина и высота не могут быть нулевыми при желании изменения размера")
-            
-            # Сохраняем настройки разрешения
-            self.save_settings()
         except ValueError as e:
             if "Ширина и высота не могут быть нулевыми" in str(e):
                 messagebox.showerror("Неверное разрешение", str(e))
             else:
                 messagebox.showerror("Неверное разрешение", "Пожалуйста, введите допустимые значения ширины и высоты.")
-            return
+            return None
         
-        # Получаем список всех поддерживаемых файлов изображений из входной папки
-        supported_extensions = ['.png', '.webp', '.bmp', '.gif']
-        image_files = [f for f in os.listdir(self.input_dir)
-                      if f.lower().endswith(tuple(supported_extensions))]
+        try:
+            self.max_size_kb = int(self.max_size_var.get())
+            if self.max_size_kb < 0:
+                raise ValueError("Размер не может быть отрицательным")
+        except ValueError:
+            messagebox.showerror("Неверный размер файла", "Пожалуйста, введите максимальный размер в КБ (0 - без ограничения).")
+            return None
         
-        if not image_files:
-            messagebox.showwarning("Нет файлов изображений",
-                                 f"В выбранной папке нет файлов с поддерживаемыми форматами ({', '.join(supported_extensions)}).")
-            return
+        self.recursive_scan = self.recursive_var.get()
+        self.auto_quality = self.auto_quality_var.get()
+        
+        target_ssim = 0.0
+        if self.auto_quality:
+            if not isinstance(self.auto_quality_target, (int, float)) or not 0 < self.auto_quality_target < 1:
+                messagebox.showerror("Неверный порог качества",
+                                     f"Недопустимое значение auto_quality_target в настройках: "
+                                     f"{self.auto_quality_target} (ожидается число от 0 до 1, например 0.95).")
+                return None
+            # NumPy проверяется без импорта: он загружается только в рабочих процессах
+            if importlib.util.find_spec("numpy") is None:
+                messagebox.showerror("Нужен NumPy",
+                                     "Для автоматического подбора качества установите NumPy: pip install numpy")
+                return None
+            target_ssim = float(self.auto_quality_target)
+        
+        try:
+            renditions = tuple(Rendition.from_dict(item) for item in self.renditions)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            messagebox.showerror("Неверный набор размеров", f"Недопустимое значение renditions в настройках: {e}")
+            return None
+        
+        try:
+            background_color = parse_color(self.background_color)
+        except (TypeError, ValueError):
+            messagebox.showerror("Неверный цвет фона",
+                                 f"Недопустимое значение background_color в настройках: {self.background_color}")
+            return None
+        
+        try:
+            reducing_gap = parse_reducing_gap(self.downscale_reducing_gap)
+        except ValueError as e:
+            messagebox.showerror("Неверный запас уменьшения",
+                                 f"Недопустимое значение downscale_reducing_gap в настройках: {e}")
+            return None
+        
+        if self.encoder_profile not in ENCODER_PROFILES:
+            messagebox.showerror("Неверный профиль кодировщика",
+                                 f"Недопустимое значение encoder_profile в настройках: {self.encoder_profile}. "
+                                 f"Допустимые значения: {', '.join(ENCODER_PROFILES)}.")
+            return None
+        
+        if self.frame_mode not in FRAME_MODES \
+                or not isinstance(self.frame_step, int) or self.frame_step < 1 \
+                or not isinstance(self.sheet_columns, int) or self.sheet_columns < 0:
+            messagebox.showerror("Неверные параметры кадров",
+                                 "Недопустимые значения frame_mode, frame_step или sheet_columns в настройках: "
+                                 f"frame_mode - одно из {', '.join(FRAME_MODES)}, frame_step - не меньше 1, "
+                                 "sheet_columns - не меньше 0.")
+            return None
+        
+        try:
+            self.naming_pattern = NamingPattern(self.default_naming_pattern)
+        except (AttributeError, TypeError, ValueError) as e:
+            messagebox.showerror("Неверный шаблон имени",
+                                 f"Недопустимое значение default_naming_pattern в настройках: {e}")
+            return None
+        
+        # Сохраняем настройки качества и разрешения
+        self.save_settings()
+        
+        return ConversionOptions(
+            quality=self.quality,
+            target_width=self.target_width,
+            target_height=self.target_height,
+            preserve_aspect_ratio=self.preserve_aspect_ratio,
+            reducing_gap=reducing_gap,
+            background_color=background_color,
+            max_size_kb=self.max_size_kb,
+            renditions=renditions,
+            rendition_layout=self.rendition_layout,
+            max_image_pixels=self.max_image_pixels,
+            frame_mode=self.frame_mode,
+            frame_step=self.frame_step,
+            sheet_columns=self.sheet_columns,
+            encoder_profile=self.encoder_profile,
+            target_ssim=target_ssim
+        )
+    
+    def convert_files(self, options):
+        """
+        Выполняет фактическое преобразование в отдельном потоке.
 
-        self.convert_button.config(state='disabled')
-        self.progress['value'] = 0
-        step = 100 / len(image_files) if image_files else 1
+        Поток не обращается к виджетам Tk: прогресс, ошибки и итог передаются
+        через очередь self.events, которую разбирает главный цикл (_poll_events).
+        """
+        from .engine import ConversionEngine
         
         success_count = 0
-        for i, file_name in enumerate(image_files):
-            try:
-                # Полный путь к входному файлу
-                file_path = os.path.join(self.input_dir, file_name)
-                
-                # Открытие и преобразование изображения
-                with Image.open(file_path) as img:
-                    # Для GIF изображений берем только первый кадр
-                    if img.format == 'GIF':
-                        img.seek(0)  # Переходим к первому кадру
-                    
-                    # Преобразование RGBA в RGB при необходимости (JPG не поддерживает прозрачность)
-                    if img.mode in ('RGBA', 'LA', 'P'):
-                        # Создание белого фона
-                        background = Image.new('RGB', img.size, (255, 255, 255))
-                        if img.mode == 'P':
-                            img = img.convert('RGBA')
-                        if img.mode in ('RGBA', 'LA'):
-                            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                        img = background
-                    
-                    # Изменение размера изображения, если указаны настройки разрешения
-                    if self.target_width > 0 or self.target_height > 0:
-                        original_width, original_height = img.size
-                        
-                        if self.preserve_aspect_ratio:
-                            # Расчет новых размеров с сохранением соотношения сторон
-                            if self.target_width > 0 and self.target_height > 0:
-                                # Использование размера, который приводит к меньшему изображению, чтобы уместить в оба ограничения
-                                ratio_1 = self.target_width / original_width
-                                ratio_2 = self.target_height / original_height
-                                final_ratio = min(ratio_1, ratio_2)
-                                
-                                new_width = int(original_width * final_ratio)
-                                new_height = int(original_height * final_ratio)
-                            elif self.target_width > 0:
-                                # Указана только ширина
-                                ratio = self.target_width / original_width
-                                new_width = self.target_width
-                                new_height = int(original_height * ratio)
-                            else:
-                                # Указана только высота
-                                ratio = self.target_height / original_height
-                                new_width = int(original_width * ratio)
-                                new_height = self.target_height
-                        else:
-                            # Использование точных размеров без сохранения соотношения сторон
-                            new_width = self.target_width if self.target_width > 0 else original_width
-                            new_height = self.target_height if self.target_height > 0 else original_height
-                        
-                        # Изменение размера изображения
-                        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    
-                    # Генерация имени выходного файла
-                    base_name = os.path.splitext(file_name)[0]
-                    output_path = os.path.join(self.output_dir, f"{base_name}.jpg")
-                    
-                    # Сохранение в формате JPG
-                    img.save(output_path, "JPEG", quality=self.quality, optimize=True)
-                
-                success_count += 1
-                self.status_var.set(f"Преобразовано: {file_name}")
-                
-            except Exception as e:
-                messagebox.showerror("Ошибка преобразования", f"Не удалось преобразовать {file_name}: {str(e)}")
+        skipped_count = 0
+        cached_count = 0
+        duplicate_count = duplicate_groups = 0
+        total = 0
+        cancelled = False
+        cache_errors = 0
+        planner = OutputPlanner(self.output_dir, options, self.naming_pattern, self.create_subfolder_with_date)
+        try:
+            # Файлы находятся по мере обхода входной папки, преобразование начинается сразу;
+            # имена выдает планировщик, разрешая совпадения до записи
+            scan_errors = []
+            jobs = iter_jobs(self.input_dir, self.output_dir, SUPPORTED_EXTENSIONS, self.recursive_scan, planner,
+                             scan_errors)
             
-            # Обновление прогресса
-            self.progress['value'] = (i + 1) * step
-            self.root.update_idletasks()
-        
-        self.convert_button.config(state='normal')
-        self.status_var.set(f"Преобразование завершено. {success_count}/{len(image_files)} файлов успешно преобразовано.")
-        messagebox.showinfo("Преобразование завершено", f"Преобразование завершено. {success_count}/{len(image_files)} файлов успешно преобразовано.")
+            manifest = None
+            if self.incremental_conversion:
+                manifest = ConversionManifest.load(self.output_dir, self.manifest_content_hash)
+            
+            # Журнал готовых файлов: прерванный пакет продолжается с места остановки
+            os.makedirs(self.output_dir, exist_ok=True)
+            journal = CheckpointJournal.load(self.output_dir, options)
+            if not self.resume_interrupted_batches:
+                journal.discard()
+            
+            observers = []
+            if self.stats_log_path:
+                observers.append(JsonLinesObserver(self.stats_log_path))
+            
+            # Файлы обрабатываются параллельно в пуле процессов, результаты приходят по мере готовности
+            engine = ConversionEngine(self.max_threads, self.io_read_threads,
+                                      self.io_write_threads, self.pipeline_depth, self.memory_budget_mb,
+                                      self._result_cache())
+            self.engine = engine
+            dedupe = self.dedupe_mode if self.dedupe_mode in DEDUPE_MODES else None
+            results = engine.run(jobs, options, manifest, observers, overwrite=self.overwrite_existing_files,
+                                 dedupe=dedupe, journal=journal)
+            if self.cancel_requested:
+                # Отмена нажата, пока движок создавался: запуск завершится, не начав файлов
+                engine.cancel()
+            for i, result in enumerate(results):
+                file_name = os.path.basename(result.source_path)
+                if result.skipped:
+                    skipped_count += 1
+                    if result.skip_reason == "exists":
+                        status = f"Уже существует: {file_name}"
+                    elif result.skip_reason == "resumed":
+                        status = f"Преобразован до прерывания: {file_name}"
+                    else:
+                        status = f"Без изменений: {file_name}"
+                elif result.ok:
+                    success_count += 1
+                    if result.duplicate_of:
+                        duplicate_count += 1
+                        status = f"Совпадает с {os.path.basename(result.duplicate_of)}: {file_name}"
+                    elif result.cached:
+                        cached_count += 1
+                        status = f"Из кеша: {file_name}"
+                    else:
+                        status = f"Преобразовано: {file_name}"
+                elif result.too_large:
+                    status = f"Слишком большое изображение: {file_name}"
+                    self.events.put(("too_large", (result.source_path, result.error)))
+                else:
+                    status = f"Ошибка: {file_name}"
+                    self.events.put(("error", (result.source_path, result.error)))
+                
+                # Пока обход не завершен, оценка прогресса строится по найденным файлам
+                self.events.put(("progress", (engine.progress_fraction(i + 1), status)))
+            for directory, error in scan_errors:
+                self.events.put(("error", (directory, f"Не удалось прочитать папку: {error}")))
+            total = engine.discovered
+            duplicate_groups = engine.summary.duplicate_groups
+            cancelled = engine.summary.cancelled
+            cache_errors = engine.summary.cache_errors
+        except Exception as e:
+            self.events.put(("error", (self.input_dir, str(e))))
+        finally:
+            self.engine = None
+            self.events.put(("done", (success_count, skipped_count, total, len(planner.collisions), cached_count,
+                                      (duplicate_count, duplicate_groups), cancelled, cache_errors)))
+    
+    def _result_cache(self):
+        """
+        Возвращает кеш результатов (None, если он отключен).
+
+        Кеш создается один раз и используется всеми преобразованиями окна,
+        чтобы папка кеша обходилась только при первом сохранении.
+        """
+        if not self.result_cache_mb or self.result_cache_mb <= 0:
+            return None
+        if self.result_cache is None:
+            self.result_cache = ResultCache(self.result_cache_dir or None, int(self.result_cache_mb * 1024 * 1024))
+        return self.result_cache
     
     def start_conversion(self):
         """Запуск процесса преобразования в отдельном потоке."""
-        conversion_thread = threading.Thread(target=self.convert_files)
+        options = self._read_conversion_options()
+        if options is None:
+            return
+        
+        self.convert_button.config(state='disabled')
+        self.pause_button.config(state='normal', text="Пауза")
+        self.cancel_button.config(state='normal')
+        self.cancel_requested = False
+        self.conversion_running = True
+        self.progress['value'] = 0
+        self.status_var.set("Поиск изображений...")
+        self.events = queue.Queue()
+        self.conversion_errors = []
+        self.oversized_files = []
+        
+        conversion_thread = threading.Thread(target=self.convert_files, args=(options,))
         conversion_thread.daemon = True
         conversion_thread.start()
+        self.root.after(self.PROGRESS_INTERVAL_MS, self._poll_events)
+    
+    def toggle_pause(self):
+        """Приостанавливает или продолжает преобразование."""
+        engine = self.engine
+        if engine is None:
+            return
+        if engine.paused:
+            engine.resume()
+            self.pause_button.config(text="Пауза")
+            self.status_var.set("Продолжение...")
+        else:
+            # Файлы, которые уже кодируются, будут дописаны
+            engine.pause()
+            self.pause_button.config(text="Продолжить")
+            self.status_var.set("Пауза (файлы в работе дописываются)")
+    
+    def cancel_conversion(self):
+        """
+        Отменяет преобразование.
+
+        Новые файлы перестают поступать в обработку сразу; файлы, которые уже
+        кодируются, дописываются. Готовые файлы остаются в журнале, и
+        следующий запуск продолжит пакет.
+        """
+        self.cancel_requested = True
+        self.pause_button.config(state='disabled')
+        self.cancel_button.config(state='disabled')
+        self.status_var.set("Отмена...")
+        engine = self.engine
+        if engine is not None:
+            engine.cancel()
+    
+    def _poll_events(self):
+        """
+        Разбирает события потока преобразования в главном цикле Tk.
+
+        Все накопившиеся за кадр события объединяются: отображается только
+        последнее состояние прогресса, ошибки собираются для итогового отчета.
+        """
+        latest_progress = None
+        finished = None
+        try:
+            while True:
+                kind, payload = self.events.get_nowait()
+                if kind == "progress":
+                    latest_progress = payload
+                elif kind == "error":
+                    self.conversion_errors.append(payload)
+                elif kind == "too_large":
+                    self.oversized_files.append(payload)
+                elif kind == "done":
+                    finished = payload
+        except queue.Empty:
+            pass
+        
+        if latest_progress is not None and not self.cancel_requested:
+            fraction, status = latest_progress
+            self.progress['value'] = fraction * 100
+            if self.engine is None or not self.engine.paused:
+                self.status_var.set(status)
+        
+        if finished is not None:
+            self._finish_conversion(*finished)
+        else:
+            self.root.after(self.PROGRESS_INTERVAL_MS, self._poll_events)
+    
+    def _finish_conversion(self, success_count, skipped_count, total, renamed_count=0, cached_count=0,
+                           duplicates=(0, 0), cancelled=False, cache_errors=0):
+        """Показывает итог преобразования и единый отчет об ошибках."""
+        self.conversion_running = False
+        self.convert_button.config(state='normal')
+        self.pause_button.config(state='disabled', text="Пауза")
+        self.cancel_button.config(state='disabled')
+        if self.close_requested:
+            # Окно закрывается: готовые файлы уже в журнале
+            self.on_close()
+            return
+        if cancelled:
+            summary = (f"Преобразование отменено. Преобразовано файлов: {success_count}. "
+                       f"Следующий запуск продолжит с места остановки.")
+            self.status_var.set(summary)
+            messagebox.showinfo("Преобразование отменено", summary)
+            return
+        
+        if not total and not self.conversion_errors:
+            self.status_var.set("Готов")
+            messagebox.showwarning("Нет файлов изображений",
+                                 f"В выбранной папке нет файлов с поддерживаемыми форматами ({', '.join(SUPPORTED_EXTENSIONS)}).")
+            return
+        
+        self.progress['value'] = 100
+        summary = f"Преобразование завершено. {success_count}/{total} файлов успешно преобразовано."
+        if skipped_count:
+            summary += f" Пропущено (без изменений или уже существуют): {skipped_count}."
+        duplicate_count, duplicate_groups = duplicates
+        if duplicate_count:
+            summary += (f" Одинаковых файлов: {duplicate_count} в {duplicate_groups} группах, "
+                        f"каждая группа преобразована один раз.")
+        if cached_count:
+            summary += f" Взято из кеша без повторного кодирования: {cached_count}."
+        if cache_errors:
+            summary += f" Не удалось сохранить в кеше: {cache_errors}."
+        if renamed_count:
+            summary += f" Переименовано из-за совпадения имен: {renamed_count}."
+        if self.oversized_files:
+            summary += f" Пропущено слишком больших изображений: {len(self.oversized_files)}."
+        self.status_var.set(summary)
+        
+        if not self.conversion_errors and self.oversized_files:
+            # Превышение предела пикселей - не сбой: показываем предупреждение с подсказкой
+            names = [os.path.basename(path) for path, _ in self.oversized_files[:self.MAX_REPORTED_ERRORS]]
+            messagebox.showwarning(
+                "Слишком большие изображения",
+                f"{summary}\n\n" + "\n".join(names) +
+                f"\n\nПредел - {self.max_image_pixels} пикселей (параметр max_image_pixels в настройках)."
+            )
+            return
+        
+        if not self.conversion_errors:
+            messagebox.showinfo("Преобразование завершено", summary)
+            return
+        
+        lines = [f"{os.path.basename(path)}: {error}"
+                 for path, error in self.conversion_errors[:self.MAX_REPORTED_ERRORS]]
+        hidden = len(self.conversion_errors) - len(lines)
+        if hidden > 0:
+            lines.append(f"... и еще {hidden}")
+        messagebox.showerror(
+            "Ошибки преобразования",
+            f"{summary}\n\nНе удалось преобразовать ({len(self.conversion_errors)}):\n" + "\n".join(lines)
+        )
     
     def on_preset_selected(self, event=None):
         """Обработчик события выбора пресета разрешения."""
@@ -521,9 +892,7 @@ class PNGtoJPGConverter:
         self.save_settings()
     
     def load_settings(self):
-        """Загружает настройки из файла config/settings.json"""
-        config_path = "config/settings.json"
-        
+        """Загружает настройки из хранилища настроек пользователя (см. src.settings)"""
         # Инициализируем значения по умолчанию
         self.input_dir = ""
         self.output_dir = "./converted_images"
@@ -532,54 +901,122 @@ class PNGtoJPGConverter:
         self.target_height = 0
         self.preserve_aspect_ratio = True
         self.resolution_preset = "Без изменения"
+        # Число рабочих процессов (0 - по количеству процессоров)
+        self.max_threads = 0
+        # Потоки упреждающего чтения и записи, максимум файлов в конвейере (0 - по умолчанию)
+        self.io_read_threads = 0
+        self.io_write_threads = 0
+        self.pipeline_depth = 0
+        # Инкрементальное преобразование: пропуск файлов, для которых JPG уже актуален
+        self.incremental_conversion = True
+        self.manifest_content_hash = False
+        # Продолжение прерванного пакета по журналу в выходной директории
+        self.resume_interrupted_batches = True
+        # Запас для быстрого уменьшения больших изображений (0 - точный LANCZOS)
+        self.downscale_reducing_gap = 3.0
+        # Обход вложенных папок с повторением их структуры в выходной директории
+        self.recursive_scan = False
+        # Цвет фона для прозрачных областей
+        self.background_color = "#ffffff"
+        # Журнал статистики этапов в формате JSON Lines (пустая строка - не вести)
+        self.stats_log_path = ""
+        # Ограничение размера JPG в килобайтах (0 - без ограничения)
+        self.max_size_kb = 0
+        # Перезапись существующих JPG (при False они пропускаются)
+        self.overwrite_existing_files = True
+        # Набор вариантов размера (список словарей name/width/height/quality) и их размещение
+        self.renditions = []
+        self.rendition_layout = "subfolder"
+        # Бюджет памяти на одновременно декодируемые изображения в МБ
+        # (0 - половина физической памяти, -1 - без ограничения)
+        self.memory_budget_mb = 0
+        # Предел числа пикселей исходного изображения (0 - без ограничения)
+        self.max_image_pixels = DEFAULT_MAX_IMAGE_PIXELS
+        # Кеш результатов: размер в МБ (0 - отключен) и папка (пустая строка - папка кеша пользователя)
+        self.result_cache_mb = 0
+        self.result_cache_dir = ""
+        self.result_cache = None
+        # Одинаковые исходные файлы: link (жесткие ссылки), copy (копии) или off (преобразовывать каждый)
+        self.dedupe_mode = "off"
+        # Автоматическое качество и порог SSIM (качество из поля - верхняя граница)
+        self.auto_quality = False
+        self.auto_quality_target = 0.95
+        # Профиль кодировщика JPEG (standard, fast, web или archival)
+        self.encoder_profile = DEFAULT_ENCODER_PROFILE
+        # Кадры анимированных изображений: first, all (каждый кадр отдельным JPG)
+        # или sheet (лист кадров); шаг выборки кадров и число столбцов листа
+        self.frame_mode = "first"
+        self.frame_step = 1
+        self.sheet_columns = 0
+        # Шаблон имени выходных файлов и подпапка с датой пакета
+        self.default_naming_pattern = DEFAULT_NAMING_PATTERN
+        self.create_subfolder_with_date = False
         # Загружаем настройки темы по умолчанию
         self.theme_preference = "system" # По умолчанию следуем системной теме
         
-        try:
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                    
-                # Загружаем сохраненные настройки
-                self.output_dir = settings.get("default_output_directory", self.output_dir)
-                self.quality = settings.get("default_quality", self.quality)
-                
-                # Загружаем пользовательские настройки (если они были сохранены ранее)
-                self.input_dir = settings.get("last_input_directory", self.input_dir)
-                self.target_width = settings.get("last_target_width", self.target_width)
-                self.target_height = settings.get("last_target_height", self.target_height)
-                self.preserve_aspect_ratio = settings.get("last_preserve_aspect_ratio", self.preserve_aspect_ratio)
-                self.resolution_preset = settings.get("last_resolution_preset", self.resolution_preset)
-                
-                # Загружаем настройки темы
-                self.theme_preference = settings.get("theme_preference", "system")
-                
-                # Определяем текущую тему на основе настроек
-                if self.theme_preference == "system":
-                    self.current_theme = self.system_theme
-                else:
-                    self.current_theme = self.theme_preference
-                
-        except (json.JSONDecodeError, FileNotFoundError, KeyError) as e:
-            print(f"Ошибка при загрузке настроек: {e}")
-            # Используем значения по умолчанию, если произошла ошибка
-    
-    def save_settings(self):
-        """Сохраняет настройки в файл config/settings.json"""
-        config_path = "config/settings.json"
+        # Настройки читаются с диска один раз; дальше изменения накапливаются в памяти
+        self.settings_store = SettingsStore()
+        settings = self.settings_store.as_dict()
         
-        # Загружаем существующие настройки
-        settings = {}
-        try:
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            # Если файл не существует или поврежден, начинаем с пустого словаря
-            settings = {}
+        # Загружаем сохраненные настройки
+        self.output_dir = settings.get("default_output_directory", self.output_dir)
+        self.quality = settings.get("default_quality", self.quality)
+        
+        # Загружаем пользовательские настройки (если они были сохранены ранее)
+        self.input_dir = settings.get("last_input_directory", self.input_dir)
+        self.target_width = settings.get("last_target_width", self.target_width)
+        self.target_height = settings.get("last_target_height", self.target_height)
+        self.preserve_aspect_ratio = settings.get("last_preserve_aspect_ratio", self.preserve_aspect_ratio)
+        self.resolution_preset = settings.get("last_resolution_preset", self.resolution_preset)
+        self.max_threads = settings.get("max_threads", self.max_threads)
+        self.io_read_threads = settings.get("io_read_threads", self.io_read_threads)
+        self.io_write_threads = settings.get("io_write_threads", self.io_write_threads)
+        self.pipeline_depth = settings.get("pipeline_depth", self.pipeline_depth)
+        self.incremental_conversion = settings.get("incremental_conversion", self.incremental_conversion)
+        self.manifest_content_hash = settings.get("manifest_content_hash", self.manifest_content_hash)
+        self.resume_interrupted_batches = settings.get("resume_interrupted_batches",
+                                                       self.resume_interrupted_batches)
+        self.downscale_reducing_gap = settings.get("downscale_reducing_gap", self.downscale_reducing_gap)
+        self.recursive_scan = settings.get("recursive_scan", self.recursive_scan)
+        self.background_color = settings.get("background_color", self.background_color)
+        self.stats_log_path = settings.get("stats_log_path", self.stats_log_path)
+        self.max_size_kb = settings.get("max_size_kb", self.max_size_kb)
+        self.renditions = settings.get("renditions", self.renditions)
+        self.overwrite_existing_files = settings.get("overwrite_existing_files", self.overwrite_existing_files)
+        self.rendition_layout = settings.get("rendition_layout", self.rendition_layout)
+        self.memory_budget_mb = settings.get("memory_budget_mb", self.memory_budget_mb)
+        self.max_image_pixels = settings.get("max_image_pixels", self.max_image_pixels)
+        self.encoder_profile = settings.get("encoder_profile", self.encoder_profile)
+        self.auto_quality = settings.get("auto_quality", self.auto_quality)
+        self.auto_quality_target = settings.get("auto_quality_target", self.auto_quality_target)
+        self.result_cache_mb = settings.get("result_cache_mb", self.result_cache_mb)
+        self.result_cache_dir = settings.get("result_cache_dir", self.result_cache_dir)
+        self.dedupe_mode = settings.get("dedupe_mode", self.dedupe_mode)
+        self.frame_mode = settings.get("frame_mode", self.frame_mode)
+        self.frame_step = settings.get("frame_step", self.frame_step)
+        self.sheet_columns = settings.get("sheet_columns", self.sheet_columns)
+        self.default_naming_pattern = settings.get("default_naming_pattern", self.default_naming_pattern)
+        self.create_subfolder_with_date = settings.get("create_subfolder_with_date",
+                                                       self.create_subfolder_with_date)
         
+        # Загружаем настройки темы
+        self.theme_preference = settings.get("theme_preference", "system")
+        
+        # Определяем текущую тему на основе настроек
+        if self.theme_preference == "system":
+            self.current_theme = self.system_theme
+        else:
+            self.current_theme = self.theme_preference
+    
+    def save_settings(self):
+        """
+        Передает текущие значения в хранилище настроек.
+
+        Файл записывается один раз после серии изменений (с задержкой
+        SettingsStore.DEBOUNCE_SECONDS) и только если значения изменились.
+        """
         # Обновляем настройки с текущими значениями
-        settings.update({
+        self.settings_store.update({
             "default_output_directory": self.output_dir,
             "default_quality": self.quality,
             "last_input_directory": self.input_dir,
@@ -587,18 +1024,12 @@ class PNGtoJPGConverter:
             "last_target_height": self.target_height,
             "last_preserve_aspect_ratio": self.preserve_aspect_ratio,
             "last_resolution_preset": self.resolution_preset,
-            "theme_preference": self.theme_preference
+            "theme_preference": self.theme_preference,
+            "recursive_scan": self.recursive_scan,
+            "max_size_kb": self.max_size_kb,
+            "encoder_profile": self.encoder_profile,
+            "auto_quality": self.auto_quality
         })
-        
-        # Создаем директорию, если она не существует
-        os.makedirs(os.path.dirname(config_path), exist_ok=True)
-        
-        # Сохраняем настройки
-        try:
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Ошибка при сохранении настроек: {e}")
     
     # Удаляем дублирующийся метод update_ui_with_settings
     
@@ -626,9 +1057,21 @@ class PNGtoJPGConverter:
         if hasattr(self, 'aspect_ratio_var'):
             self.aspect_ratio_var.set(self.preserve_aspect_ratio)
         
+        if hasattr(self, 'recursive_var'):
+            self.recursive_var.set(self.recursive_scan)
+        
+        if hasattr(self, 'max_size_var'):
+            self.max_size_var.set(str(self.max_size_kb))
+        
         if hasattr(self, 'resolution_preset_var'):
             self.resolution_preset_var.set(self.resolution_preset)
         
+        if hasattr(self, 'encoder_profile_var'):
+            self.encoder_profile_var.set(self.encoder_profile)
+        
+        if hasattr(self, 'auto_quality_var'):
+            self.auto_quality_var.set(self.auto_quality)
+        
         # Обновляем настройки темы в интерфейсе
         if hasattr(self, 'theme_var'):
             self.theme_var.set(self.theme_preference)
@@ -643,6 +1086,11 @@ class PNGtoJPGConverter:
         except ValueError:
             pass  # Игнорируем недопустимые значения
     
+    def on_encoder_profile_changed(self, event=None):
+        """Обработчик выбора профиля кодировщика"""
+        self.encoder_profile = self.encoder_profile_var.get()
+        self.save_settings()
+    
     def on_quality_key_release(self, event=None):
         """Обработчик отпускания клавиши в поле качества"""
         # Используем after для отложенного вызова, чтобы значение успело обновиться
@@ -669,6 +1117,16 @@ class PNGtoJPGConverter:
         self.preserve_aspect_ratio = self.aspect_ratio_var.get()
         self.save_settings()
     
+    def on_auto_quality_changed(self):
+        """Обработчик переключения автоматического качества"""
+        self.auto_quality = self.auto_quality_var.get()
+        self.save_settings()
+    
+    def on_recursive_changed(self):
+        """Обработчик изменения флага обхода вложенных папок"""
+        self.recursive_scan = self.recursive_var.get()
+        self.save_settings()
+    
     def on_theme_changed(self, event=None):
         """Обработчик изменения темы"""
         self.theme_preference = self.theme_var.get()
@@ -685,9 +1143,28 @@ class PNGtoJPGConverter:
         # Сохраняем настройки
         self.save_settings()
     
+    def on_close(self):
+        """
+        Закрывает окно, записав несохраненные настройки.
+
+        Во время преобразования окно закрывается после отмены, когда файлы в
+        работе дописаны, а манифест и журнал сохранены.
+        """
+        if self.conversion_running:
+            self.close_requested = True
+            self.cancel_conversion()
+            self.status_var.set("Завершение файлов в работе перед закрытием...")
+            return
+        self.settings_store.close()
+        self.root.destroy()
+    
     def run(self):
         """Запуск приложения."""
-        self.root.mainloop()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        try:
+            self.root.mainloop()
+        finally:
+            self.settings_store.close()
 
 
 if __name__ == "__main__":
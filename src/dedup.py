@@ -0,0 +1,117 @@
+"""
+Поиск одинаковых исходных файлов в пакете.
+
+Экспорты и копии часто дают побайтно одинаковые изображения под разными
+именами. Перед преобразованием файлы группируются сначала по размеру
+(только stat), затем внутри групп одного размера - по хешу начала и конца
+файла и, наконец, по хешу всего содержимого. Из каждой группы
+преобразуется один файл, а JPG остальных создаются жесткими ссылками
+или копиями под их собственными именами.
+"""
+
+import hashlib
+import os
+from collections import defaultdict
+
+from .cache import clone_file
+
+
+# Способы создания JPG для одинаковых файлов: жесткая ссылка (с копированием,
+# если ссылка невозможна, например на другом диске) или всегда копия
+DEDUPE_MODES = ("link", "copy")
+# Сколько байт в начале и в конце файла хешируется на втором шаге
+SAMPLE_SIZE = 64 * 1024
+
+
+def _sample_digest(path, size):
+    """Хеш начала и конца файла: отсеивает разные файлы одного размера без полного чтения."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        digest.update(f.read(SAMPLE_SIZE))
+        if size > 2 * SAMPLE_SIZE:
+            f.seek(-SAMPLE_SIZE, os.SEEK_END)
+            digest.update(f.read(SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+def _full_digest(path, chunk_size=1024 * 1024):
+    """Хеш всего содержимого файла."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _split(groups, key):
+    """Разбивает каждую группу по значению key(path); оставляет группы из двух и более файлов."""
+    result = []
+    for paths in groups:
+        buckets = defaultdict(list)
+        for path in paths:
+            try:
+                buckets[key(path)].append(path)
+            except OSError:
+                # Нечитаемый файл преобразуется отдельно и сообщит об ошибке сам
+                continue
+        result.extend(bucket for bucket in buckets.values() if len(bucket) > 1)
+    return result
+
+
+def find_duplicates(paths):
+    """
+    Находит группы побайтно одинаковых файлов.
+
+    Args:
+        paths: пути к исходным файлам
+
+    Returns:
+        словарь {путь представителя группы: [пути остальных файлов группы]};
+        представитель - первый файл группы в порядке paths
+    """
+    paths = list(paths)
+    sizes = {}
+    for path in paths:
+        try:
+            sizes[path] = os.stat(path).st_size
+        except OSError:
+            continue
+    groups = _split([list(sizes)], sizes.__getitem__)
+    groups = _split(groups, lambda path: _sample_digest(path, sizes[path]))
+    groups = _split(groups, _full_digest)
+
+    order = {path: index for index, path in enumerate(paths)}
+    duplicates = {}
+    for group in groups:
+        group.sort(key=order.__getitem__)
+        duplicates[group[0]] = group[1:]
+    return duplicates
+
+
+def link_or_copy(source_path, output_path, mode="link"):
+    """
+    Создает output_path с содержимым готового JPG source_path.
+
+    В режиме "link" создается жесткая ссылка (атомарно: через временное
+    имя и os.replace); если файловая система ее не поддерживает или папки
+    на разных дисках, файл копируется.
+
+    Returns:
+        True, если создана жесткая ссылка
+    """
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if mode == "link":
+        temp_path = os.path.join(directory, f".{os.path.basename(output_path)}.{os.getpid()}.link")
+        try:
+            os.link(source_path, temp_path)
+            os.replace(temp_path, output_path)
+            return True
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    clone_file(source_path, output_path)
+    return False
@@ -0,0 +1,610 @@
+"""
+Параллельный движок конвертации: конвейер чтения, обработки и записи.
+
+Декодирование, изменение размера (LANCZOS) и кодирование JPG с optimize=True
+нагружают процессор и удерживают GIL, поэтому выполняются в пуле процессов.
+Чтение исходных файлов и запись результатов выполняются отдельными пулами
+потоков, так что диск (или сетевая папка) и процессор работают одновременно.
+Число заданий в конвейере ограничено, поэтому память не зависит от размера
+пакета. Перед декодированием память на файл оценивается по заголовку, и
+файлы допускаются в обработку только в пределах бюджета памяти. Если
+задан кеш результатов (ResultCache), файлы, уже преобразованные с теми же
+параметрами, копируются из кеша без декодирования.
+
+Преобразование можно приостановить (pause/resume) и отменить (cancel) из
+другого потока: новые файлы перестают поступать в обработку сразу, а
+файлы, которые уже кодируются в рабочих процессах, дописываются, поэтому
+отмена срабатывает в пределах одного файла на процесс.
+"""
+
+import os
+import queue
+import signal
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from .imaging import (ImageTooLargeError, check_pixel_limit, estimate_decode_memory, read_image_header,
+                      read_source, render_outputs, write_outputs)
+from .dedup import find_duplicates, link_or_copy
+from .instrumentation import FileStats, RunSummary
+from .memory import MemoryBudget, total_memory
+
+
+@dataclass
+class ConversionResult:
+    """Итог преобразования одного файла."""
+
+    source_path: str
+    output_path: str
+    error: Optional[str] = None
+    skipped: bool = False
+    # Причина пропуска: "up_to_date" (актуален по манифесту), "exists" (JPG уже есть)
+    # или "resumed" (преобразован в прерванном пакете, см. CheckpointJournal)
+    skip_reason: Optional[str] = None
+    stats: Optional[FileStats] = None
+    # Ошибка вызвана превышением предела max_image_pixels
+    too_large: bool = False
+    # Фактически записанные JPG (для анимаций - все кадры)
+    written: Tuple[str, ...] = ()
+    # JPG взяты из кеша результатов, а не закодированы заново
+    cached: bool = False
+    # Исходный файл совпадает с duplicate_of: JPG созданы ссылками или копиями его результата
+    duplicate_of: Optional[str] = None
+    # Задание прервано отменой (такие результаты run не возвращает)
+    cancelled: bool = False
+    # JPG записаны, но не сохранены в кеше результатов (причина)
+    cache_error: Optional[str] = None
+
+    @property
+    def ok(self):
+        """Возвращает True, если файл успешно преобразован."""
+        return self.error is None
+
+
+class ConversionCancelled(RuntimeError):
+    """Задание не выполнено, потому что преобразование отменено."""
+
+
+def resolve_worker_count(max_threads=None):
+    """
+    Определяет число рабочих процессов.
+
+    Используется значение max_threads из настроек, если оно положительное,
+    иначе - количество процессоров в системе.
+    """
+    try:
+        count = int(max_threads or 0)
+    except (TypeError, ValueError):
+        count = 0
+    if count > 0:
+        return count
+    return os.cpu_count() or 1
+
+
+def _ignore_interrupt():
+    """
+    Инициализатор рабочего процесса: Ctrl+C обрабатывает только основной процесс.
+
+    Сигнал SIGINT от терминала получает вся группа процессов. Основной
+    процесс останавливает конвейер сам, а рабочие процессы дописывают
+    текущий файл, как при отмене.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _read_job(source_path, options):
+    """
+    Этап чтения (поток ввода-вывода): загружает исходный файл в память.
+
+    По заголовку проверяется предел числа пикселей и оценивается память,
+    нужная на декодирование.
+
+    Returns:
+        тройка (байты файла, FileStats, оценка памяти в байтах)
+    """
+    stats = FileStats()
+    with stats.stage("read"):
+        data = read_source(source_path)
+    try:
+        size, mode = read_image_header(data)
+    except ImageTooLargeError:
+        raise
+    except Exception:
+        # Ошибку формата сообщит этап декодирования
+        return data, stats, len(data)
+    check_pixel_limit(size, options.max_image_pixels)
+    stats.memory_estimate = len(data) + estimate_decode_memory(size, mode, options)
+    return data, stats, stats.memory_estimate
+
+
+def _render_job(data, output_path, options, stats):
+    """Этап обработки (рабочий процесс): декодирует и кодирует JPG в памяти."""
+    return render_outputs(data, output_path, options, stats)
+
+
+def _write_job(outputs, stats, cache, key, output_path, options):
+    """
+    Этап записи (поток ввода-вывода): записывает JPG и сохраняет их в кеше результатов.
+
+    Returns:
+        пара (FileStats, причина ошибки кеша или None)
+    """
+    write_outputs(outputs, stats)
+    if cache is not None:
+        try:
+            cache.store(key, outputs, output_path, options)
+        except (OSError, ValueError) as e:
+            # Кеш - только ускорение: ошибка кеша не срывает преобразование, а сообщается в результате
+            return stats, f"Не удалось сохранить результат в кеше: {e}"
+    return stats, None
+
+
+class ConversionEngine:
+    """
+    Распределяет преобразование файлов по конвейеру чтение -> обработка -> запись.
+
+    Задания принимаются из любого итератора (в том числе из незавершенного
+    обхода папки); одновременно в конвейере находится не более
+    pipeline_depth заданий вместе с их исходными и закодированными байтами.
+    """
+
+    # Сколько заданий на один процесс держать в конвейере по умолчанию
+    PENDING_PER_WORKER = 4
+    # Число потоков чтения и записи по умолчанию
+    READ_THREADS = 4
+    WRITE_THREADS = 2
+    # Доля физической памяти, используемая по умолчанию под декодированные изображения
+    MEMORY_BUDGET_FRACTION = 0.5
+
+    def __init__(self, max_workers=None, read_threads=None, write_threads=None, pipeline_depth=None,
+                 memory_budget_mb=None, cache=None):
+        """
+        Args:
+            max_workers: желаемое число процессов (None или 0 - по числу процессоров)
+            read_threads: число потоков упреждающего чтения
+            write_threads: число потоков записи
+            pipeline_depth: максимум заданий в конвейере (None или 0 - max_workers * 4)
+            memory_budget_mb: бюджет памяти на одновременно декодируемые изображения
+                в МБ (None или 0 - половина физической памяти, отрицательное - без ограничения)
+            cache: ResultCache, общий для запусков (None - без кеша)
+        """
+        self.max_workers = resolve_worker_count(max_workers)
+        self.read_threads = read_threads or self.READ_THREADS
+        self.write_threads = write_threads or self.WRITE_THREADS
+        self.pipeline_depth = pipeline_depth or self.max_workers * self.PENDING_PER_WORKER
+        self.memory_budget = self._resolve_memory_budget(memory_budget_mb)
+        self.cache = cache
+        # Сколько заданий получено из итератора и завершен ли он
+        self.discovered = 0
+        self.scan_complete = False
+        # Сводка последнего запуска (RunSummary)
+        self.summary = None
+        # Запуск отменен методом cancel; пауза - сброшенное событие _running
+        self.cancelled = False
+        self._running = threading.Event()
+        self._running.set()
+        # Конвейер текущего запуска (для отмены заданий в очереди)
+        self._active = None
+        # Постоянный конвейер между запусками (см. start)
+        self._pipeline = None
+
+    @classmethod
+    def _resolve_memory_budget(cls, memory_budget_mb):
+        """Переводит бюджет памяти из настроек в байты (None - без ограничения)."""
+        if memory_budget_mb and memory_budget_mb > 0:
+            return int(memory_budget_mb * 1024 * 1024)
+        if memory_budget_mb and memory_budget_mb < 0:
+            return None
+        total = total_memory()
+        return int(total * cls.MEMORY_BUDGET_FRACTION) if total else None
+
+    def start(self):
+        """
+        Заранее запускает пулы и оставляет их работать между вызовами run.
+
+        Используется в режиме наблюдения за папкой: рабочие процессы уже
+        запущены, и каждый новый файл сразу поступает в обработку.
+        Пулы останавливаются методом shutdown.
+        """
+        if self._pipeline is None:
+            self._pipeline = _Pipeline(self)
+            self._pipeline.warm_up()
+        return self
+
+    def shutdown(self):
+        """Останавливает пулы, запущенные методом start."""
+        if self._pipeline is not None:
+            self._pipeline.close()
+            self._pipeline = None
+
+    def pause(self):
+        """Приостанавливает поступление новых файлов в обработку (из любого потока)."""
+        self._running.clear()
+
+    def resume(self):
+        """Продолжает приостановленное преобразование."""
+        self._running.set()
+
+    @property
+    def paused(self):
+        """Приостановлено ли преобразование."""
+        return not self._running.is_set()
+
+    def cancel(self):
+        """
+        Отменяет текущий запуск (из любого потока); вызванный до начала
+        запуска - следующий запуск.
+
+        Задания в очередях снимаются сразу; файлы, которые уже кодируются
+        или записываются, завершаются, и их результаты возвращаются из run.
+        """
+        self.cancelled = True
+        self._running.set()
+        pipeline = self._active
+        if pipeline is not None:
+            pipeline.cancel_queued()
+
+    def _wait_running(self):
+        """Ждет снятия паузы. Returns: False, если запуск отменен."""
+        self._running.wait()
+        return not self.cancelled
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def progress_fraction(self, completed):
+        """
+        Оценивает долю выполненной работы.
+
+        Пока обход папки не завершен, общее количество неизвестно, и оценка
+        строится по числу уже найденных файлов.
+        """
+        if not self.discovered:
+            return 1.0 if self.scan_complete else 0.0
+        return min(completed / self.discovered, 1.0)
+
+    def run(self, jobs, options, manifest=None, observers=(), overwrite=True, dedupe=None, journal=None):
+        """
+        Преобразует файлы и возвращает результаты по мере готовности.
+
+        Args:
+            jobs: итерируемый набор пар (путь к исходному файлу, путь к JPG)
+            options: экземпляр ConversionOptions
+            manifest: ConversionManifest для пропуска неизмененных файлов (необязательно)
+            observers: наблюдатели ConversionObserver, получающие каждый результат
+                и итоговую сводку
+            overwrite: перезаписывать ли существующие JPG; при False задания,
+                все выходные файлы которых уже есть, пропускаются без чтения исходника
+            dedupe: "link" или "copy" - преобразовывать одинаковые исходные файлы один
+                раз, создавая JPG остальных жесткими ссылками или копиями (см. dedup);
+                требует полного списка заданий до начала преобразования. None - без поиска
+            journal: CheckpointJournal прерванного пакета - файлы из него пропускаются,
+                готовые файлы дописываются в него; после полного завершения журнал удаляется
+
+        Yields:
+            ConversionResult для каждого задания в порядке завершения;
+            пропущенные задания возвращаются с skipped=True. После отмены
+            (cancel) невыполненные задания не возвращаются, а summary.cancelled = True
+        """
+        self.discovered = 0
+        self.scan_complete = False
+        self.summary = RunSummary()
+        results = self._run(jobs, options, manifest, overwrite, dedupe, journal)
+        try:
+            for result in results:
+                self.summary.add(result)
+                for observer in observers:
+                    observer.on_file(result)
+                yield result
+        finally:
+            # Закрываем внутренний генератор явно, чтобы пулы были остановлены до сводки
+            results.close()
+            self.summary.cancelled = self.cancelled
+            # Отмена относится к одному запуску
+            self.cancelled = False
+            self.summary.finish()
+            for observer in observers:
+                observer.on_finish(self.summary)
+
+    def _pending(self, jobs, options, manifest, overwrite, journal=None):
+        """
+        Отсеивает задания, которые не нужно выполнять.
+
+        Yields:
+            ConversionResult для пропущенных заданий и пары (исходный файл, JPG) для остальных
+        """
+        for source_path, output_path in jobs:
+            if self.cancelled:
+                return
+            self.discovered += 1
+            if journal is not None and journal.is_complete(source_path, output_path):
+                yield ConversionResult(source_path, output_path, skipped=True, skip_reason="resumed")
+                continue
+            if manifest is not None and manifest.is_up_to_date(source_path, output_path, options):
+                yield ConversionResult(source_path, output_path, skipped=True, skip_reason="up_to_date")
+                continue
+            # Проверка существования - только stat, без чтения и декодирования
+            if not overwrite and options.outputs_exist(output_path):
+                yield ConversionResult(source_path, output_path, skipped=True, skip_reason="exists")
+                continue
+            yield source_path, output_path
+
+    def _run(self, jobs, options, manifest, overwrite, dedupe=None, journal=None):
+        """Пропускает задания через конвейер с ограничением числа заданий в работе."""
+        persistent = self._pipeline is not None
+        pipeline = self._pipeline if persistent else _Pipeline(self)
+        self._active = pipeline
+        pending = self._pending(jobs, options, manifest, overwrite, journal)
+        # Представитель группы одинаковых файлов -> задания остальных файлов группы
+        duplicates = {}
+        try:
+            if dedupe:
+                # Группы можно найти только по полному списку заданий
+                accepted = []
+                for item in pending:
+                    if isinstance(item, ConversionResult):
+                        yield item
+                    else:
+                        accepted.append(item)
+                outputs = dict(accepted)
+                groups = find_duplicates(source_path for source_path, _ in accepted)
+                self.summary.duplicate_groups = len(groups)
+                skip = set()
+                for representative, others in groups.items():
+                    duplicates[representative] = [(path, outputs[path]) for path in others]
+                    skip.update(others)
+                pending = [job for job in accepted if job[0] not in skip]
+
+            for item in pending:
+                if isinstance(item, ConversionResult):
+                    yield item
+                    continue
+                # Пока конвейер заполнен, отдаем готовые результаты
+                while pipeline.in_flight >= self.pipeline_depth:
+                    yield from self._finish(pipeline.next_result(), options, manifest, duplicates, dedupe, journal)
+                if not self._wait_running():
+                    break
+                pipeline.submit(item[0], item[1], options)
+            else:
+                self.scan_complete = not self.cancelled
+
+            while pipeline.in_flight:
+                yield from self._finish(pipeline.next_result(), options, manifest, duplicates, dedupe, journal)
+            if journal is not None and not self.cancelled:
+                # Пакет завершен полностью: продолжать нечего
+                journal.discard()
+        finally:
+            self._active = None
+            if persistent:
+                # Пулы остаются работать: дожидаемся заданий этого запуска,
+                # чтобы их результаты не попали в следующий
+                while pipeline.in_flight:
+                    pipeline.next_result()
+            else:
+                pipeline.close()
+            if manifest is not None:
+                manifest.save()
+            if journal is not None:
+                journal.close()
+
+    @staticmethod
+    def _finish(result, options, manifest, duplicates=None, dedupe=None, journal=None):
+        """
+        Запоминает успешный результат в манифесте и журнале и создает JPG одинаковых с ним файлов.
+
+        Yields:
+            result и результаты файлов, совпадающих с его исходным файлом;
+            для задания, прерванного отменой, - ничего
+        """
+        if result.cancelled:
+            return
+        results = [result]
+        for source_path, output_path in (duplicates or {}).get(result.source_path, ()):
+            if not result.ok:
+                results.append(ConversionResult(source_path, output_path, error=result.error,
+                                                too_large=result.too_large, duplicate_of=result.source_path))
+                continue
+            try:
+                written = []
+                for path in result.written:
+                    target = options.slot_path(output_path, options.output_slot(result.output_path, path))
+                    link_or_copy(path, target, dedupe)
+                    written.append(target)
+            except (OSError, ValueError) as e:
+                results.append(ConversionResult(source_path, output_path, error=str(e),
+                                                duplicate_of=result.source_path))
+                continue
+            results.append(ConversionResult(source_path, output_path, written=tuple(written),
+                                            duplicate_of=result.source_path))
+
+        for item in results:
+            if item.ok and manifest is not None:
+                manifest.record(item.source_path, item.output_path, options, item.written)
+            if item.ok and journal is not None:
+                journal.record(item.source_path, item.output_path, item.written)
+            yield item
+
+
+class _Pipeline:
+    """
+    Связывает пулы чтения, обработки и записи через обратные вызовы.
+
+    Каждое задание проходит три этапа; готовые результаты попадают в очередь,
+    которую читает поток, вызвавший ConversionEngine.run.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.in_flight = 0
+        self.closing = False
+        self.done = queue.Queue()
+        self.budget = MemoryBudget(engine.memory_budget)
+        # Задания, ожидающие в очередях пулов (снимаются при отмене)
+        self._queued = set()
+        self._queued_lock = threading.Lock()
+        self._readers = None
+        self._workers = None
+        self._writers = None
+
+    def _start(self):
+        """
+        Создает пулы при первом задании.
+
+        Все рабочие процессы запускаются здесь, в вызывающем потоке, до
+        появления потоков чтения. Иначе процесс создается (fork) из
+        обработчика в потоке чтения, пока другой поток чтения держит
+        блокировку импорта, загружая модуль формата Pillow; дочерний процесс
+        наследует занятую блокировку и зависает на первом же импорте
+        (например, модуля WebP). Модули форматов загружаются заранее, чтобы
+        процессы получили их готовыми.
+        """
+        Image.init()
+        self._workers = ProcessPoolExecutor(max_workers=self.engine.max_workers,
+                                            initializer=_ignore_interrupt)
+        for future in [self._workers.submit(os.getpid) for _ in range(self.engine.max_workers)]:
+            future.result()
+        self._readers = ThreadPoolExecutor(self.engine.read_threads, thread_name_prefix="png2jpg-read")
+        self._writers = ThreadPoolExecutor(self.engine.write_threads, thread_name_prefix="png2jpg-write")
+
+    def warm_up(self):
+        """Запускает пулы и все рабочие процессы, не дожидаясь первого задания."""
+        if self._readers is None:
+            self._start()
+
+    def submit(self, source_path, output_path, options):
+        """Ставит задание на этап чтения."""
+        if self._readers is None:
+            self._start()
+        self.in_flight += 1
+        future = self._track(self._readers.submit(_read_job, source_path, options))
+        future.add_done_callback(lambda f: self._guard(source_path, output_path, self._on_read, f, options))
+
+    def _track(self, future):
+        """Запоминает задание в очереди пула до его завершения."""
+        with self._queued_lock:
+            self._queued.add(future)
+        future.add_done_callback(self._untrack)
+        return future
+
+    def _untrack(self, future):
+        with self._queued_lock:
+            self._queued.discard(future)
+
+    def cancel_queued(self):
+        """
+        Снимает задания, еще не начатые пулами (вызывается из любого потока).
+
+        Уже выполняющиеся задания не прерываются; обработчики их этапов
+        проверяют отмену и не передают файл на следующий этап.
+        """
+        self.budget.wake()
+        with self._queued_lock:
+            queued = list(self._queued)
+        for future in queued:
+            future.cancel()
+
+    def _check_cancelled(self):
+        """Прерывает задание, если преобразование остановлено или отменено."""
+        if self.engine.cancelled:
+            raise ConversionCancelled("Преобразование отменено")
+        if self.closing:
+            raise RuntimeError("Преобразование остановлено")
+
+    def next_result(self):
+        """Дожидается следующего завершенного задания."""
+        result = self.done.get()
+        self.in_flight -= 1
+        return result
+
+    def _guard(self, source_path, output_path, callback, future, *args):
+        """
+        Вызывает обработчик этапа; любая ошибка завершает задание с ошибкой.
+
+        Перехватывается и BaseException (например, KeyboardInterrupt из
+        рабочего процесса): исключение, вышедшее из обратного вызова,
+        останавливает служебный поток пула, и задание никогда не попадает
+        в очередь done.
+        """
+        try:
+            callback(source_path, output_path, future, *args)
+        except (ConversionCancelled, CancelledError):
+            self.done.put(ConversionResult(source_path, output_path, error="Преобразование отменено",
+                                           cancelled=True))
+        except BaseException as e:
+            self.done.put(ConversionResult(source_path, output_path, error=str(e) or type(e).__name__,
+                                           too_large=isinstance(e, ImageTooLargeError)))
+
+    def _on_read(self, source_path, output_path, future, options):
+        """
+        Исходные байты прочитаны: дожидаемся места в бюджете памяти и передаем их в пул процессов.
+
+        Поток чтения ждет здесь, пока предыдущие файлы не освободят память;
+        изображение больше бюджета ждет, пока не завершатся все остальные.
+        """
+        data, stats, estimate = future.result()
+        # Пауза удерживает прочитанный файл до передачи в пул процессов
+        self.engine._wait_running()
+        self._check_cancelled()
+        cache = self.engine.cache
+        key = None
+        if cache is not None:
+            key = cache.key(data, options)
+            with stats.stage("write"):
+                written = cache.restore(key, output_path, options)
+            if written is not None:
+                stats.bytes_in = len(data)
+                stats.bytes_out = sum(os.path.getsize(path) for path in written)
+                self.done.put(ConversionResult(source_path, output_path, stats=stats, written=written, cached=True))
+                return
+        try:
+            reserved = self.budget.acquire(estimate, lambda: self.closing or self.engine.cancelled)
+        except RuntimeError:
+            # Ожидание памяти прервано: отмена не является ошибкой файла
+            self._check_cancelled()
+            raise
+        try:
+            self._check_cancelled()
+            next_future = self._track(self._workers.submit(_render_job, data, output_path, options, stats))
+        except Exception:
+            self.budget.release(reserved)
+            raise
+        next_future.add_done_callback(
+            lambda f: self._guard(source_path, output_path, self._on_rendered, f, options, key, reserved))
+
+    def _on_rendered(self, source_path, output_path, future, options, key=None, reserved=0):
+        """
+        JPG закодированы: освобождаем бюджет памяти и передаем их потокам записи.
+
+        Отмена здесь не проверяется: закодированный файл записывается и
+        возвращается из run (и попадает в журнал), как обещает cancel.
+        """
+        self.budget.release(reserved)
+        outputs, stats = future.result()
+        if self.closing:
+            raise RuntimeError("Преобразование остановлено")
+        written = tuple(path for path, _ in outputs)
+        next_future = self._writers.submit(_write_job, outputs, stats, self.engine.cache, key, output_path, options)
+        next_future.add_done_callback(
+            lambda f: self._guard(source_path, output_path, self._on_written, f, written))
+
+    def _on_written(self, source_path, output_path, future, written=()):
+        """Файлы записаны: задание завершено."""
+        stats, cache_error = future.result()
+        self.done.put(ConversionResult(source_path, output_path, stats=stats, written=written,
+                                       cache_error=cache_error))
+
+    def close(self):
+        """Останавливает пулы, дождавшись заданий, которые уже выполняются."""
+        self.closing = True
+        # Потоки чтения, ожидающие бюджета памяти, прекращают ожидание
+        self.budget.wake()
+        for executor in (self._readers, self._workers, self._writers):
+            if executor is not None:
+                executor.shutdown(wait=True)
@@ -0,0 +1,613 @@
+"""
+Функции обработки изображений, не зависящие от графического интерфейса.
+
+Все функции модуля выполняются в рабочих процессах движка конвертации,
+поэтому здесь нельзя обращаться к tkinter.
+"""
+
+import collections
+import io
+import math
+import os
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from .atomic import create_temp_file
+from .instrumentation import FileStats
+# Список расширений определен в options (без зависимости от Pillow) и доступен здесь, как раньше
+from .options import SUPPORTED_EXTENSIONS
+from .options import frame_path
+
+# Во сколько раз предыдущий вариант должен быть больше следующего,
+# чтобы следующий можно было получить из него, а не из исходного изображения
+RENDITION_DERIVE_RATIO = 2
+
+# Сколько кадров анимации обрабатывать параллельно в одном рабочем процессе
+FRAME_THREADS = min(4, os.cpu_count() or 1)
+
+# Фильтры warnings общие для процесса: open_image меняет их по одному потоку
+_WARNINGS_LOCK = threading.Lock()
+
+
+class ImageTooLargeError(ValueError):
+    """Изображение превышает допустимое число пикселей."""
+
+    def __init__(self, size, limit):
+        # Аргументы хранятся в args, чтобы исключение передавалось из рабочего процесса
+        super().__init__(size, limit)
+        # None - размер неизвестен: файл отклонил Pillow (см. open_image)
+        self.size = tuple(size) if size is not None else None
+        self.limit = limit
+
+    def __str__(self):
+        if self.size is None:
+            return (f"Изображение слишком большое: больше {self.limit / 1e6:.0f} Мпикс "
+                    f"(предел Pillow Image.MAX_IMAGE_PIXELS)")
+        width, height = self.size
+        return (f"Изображение слишком большое: {width}x{height} "
+                f"({width * height / 1e6:.0f} Мпикс при пределе {self.limit / 1e6:.0f} Мпикс)")
+
+
+def check_pixel_limit(size, limit):
+    """
+    Проверяет размер изображения по заголовку до декодирования пикселей.
+
+    Raises:
+        ImageTooLargeError: если limit задан и число пикселей его превышает
+    """
+    if limit and size[0] * size[1] > limit:
+        raise ImageTooLargeError(size, limit)
+
+
+def open_image(source):
+    """
+    Открывает изображение (читается только заголовок).
+
+    Предел из ConversionOptions.max_image_pixels проверяет check_pixel_limit
+    по размеру открытого изображения. Предупреждение Pillow о "бомбе
+    декомпрессии" (DecompressionBombWarning) подавляется только на время
+    этого вызова. Image.MAX_IMAGE_PIXELS - настройка всего процесса и не
+    меняется, поэтому изображение больше жесткого предела Pillow
+    (2 * Image.MAX_IMAGE_PIXELS) отклоняется при любом max_image_pixels.
+
+    Raises:
+        ImageTooLargeError: если Pillow отказался открыть изображение из-за его размера
+    """
+    with _WARNINGS_LOCK, warnings.catch_warnings():
+        warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+        try:
+            return Image.open(source)
+        except Image.DecompressionBombError as e:
+            raise ImageTooLargeError(None, 2 * Image.MAX_IMAGE_PIXELS) from e
+
+
+def calculate_target_size(original_size, target_width, target_height, preserve_aspect_ratio):
+    """
+    Вычисляет итоговый размер изображения по заданным ограничениям.
+
+    Нулевое значение ширины или высоты означает, что измерение не задано.
+    """
+    original_width, original_height = original_size
+
+    if preserve_aspect_ratio:
+        if target_width > 0 and target_height > 0:
+            # Используем меньший коэффициент, чтобы уместить изображение в оба ограничения
+            final_ratio = min(target_width / original_width, target_height / original_height)
+            return int(original_width * final_ratio), int(original_height * final_ratio)
+        if target_width > 0:
+            # Указана только ширина
+            ratio = target_width / original_width
+            return target_width, int(original_height * ratio)
+        # Указана только высота
+        ratio = target_height / original_height
+        return int(original_width * ratio), target_height
+
+    # Точные размеры без сохранения соотношения сторон
+    new_width = target_width if target_width > 0 else original_width
+    new_height = target_height if target_height > 0 else original_height
+    return new_width, new_height
+
+
+def expand_palette(img):
+    """
+    Переводит палитровое изображение в RGB, а при наличии прозрачности - в RGBA.
+    """
+    if img.mode == 'P':
+        return img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+    if img.mode == 'PA':
+        return img.convert('RGBA')
+    return img
+
+
+def flatten_alpha(img, background=(255, 255, 255)):
+    """
+    Накладывает изображение с прозрачностью на сплошной фон (JPG не поддерживает альфа-канал).
+
+    Если альфа-канал полностью непрозрачен, наложение не выполняется:
+    канал просто отбрасывается. Иначе выполняется одна операция paste
+    с маской из единственного скопированного канала.
+
+    Args:
+        img: исходное изображение
+        background: цвет фона (R, G, B)
+    """
+    img = expand_palette(img)
+    if img.mode not in ('RGBA', 'LA'):
+        return img
+
+    # getextrema по всем каналам не создает копий; последний канал - альфа
+    alpha_min, _ = img.getextrema()[-1]
+    if alpha_min == 255:
+        return img.convert('RGB')
+
+    flattened = Image.new('RGB', img.size, tuple(background))
+    if img.mode == 'LA':
+        flattened.paste(img.convert('RGB'), mask=img.getchannel('A'))
+    else:
+        flattened.paste(img, mask=img.getchannel('A'))
+    return flattened
+
+
+def prepare_downscale(img, new_size, reducing_gap):
+    """
+    Включает сокращенное декодирование для форматов, которые его поддерживают.
+
+    Для JPEG метод draft() декодирует изображение сразу в масштабе 1/2, 1/4
+    или 1/8, но не меньше new_size * reducing_gap. Для остальных форматов
+    вызов ничего не делает. Должна вызываться до загрузки пикселей.
+    """
+    if not reducing_gap:
+        return
+    width, height = img.size
+    requested = (int(new_size[0] * reducing_gap), int(new_size[1] * reducing_gap))
+    if requested[0] < width and requested[1] < height:
+        img.draft(img.mode, requested)
+
+
+def resize_image(img, new_size, reducing_gap=None):
+    """
+    Изменяет размер изображения фильтром LANCZOS.
+
+    При заданном reducing_gap большие уменьшения выполняются в два шага:
+    быстрое сокращение Image.reduce() в целое число раз, затем LANCZOS.
+    """
+    if img.size == tuple(new_size):
+        return img
+    # Палитровые изображения Pillow масштабирует только методом NEAREST
+    img = expand_palette(img)
+    return img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=reducing_gap or None)
+
+
+def decode_image(source, options):
+    """
+    Открывает и декодирует исходное изображение.
+
+    Целевые размеры всех вариантов вычисляются по заголовку до декодирования
+    пикселей, чтобы JPEG можно было сразу декодировать в уменьшенном масштабе
+    (с запасом для самого крупного варианта).
+
+    Args:
+        source: путь к файлу или файловый объект
+        options: экземпляр ConversionOptions
+
+    Returns:
+        пара (декодированное изображение, список целевых размеров вариантов;
+        None на месте варианта без изменения размера)
+    """
+    with open_image(source) as img:
+        check_pixel_limit(img.size, options.max_image_pixels)
+
+        # Для GIF изображений берем только первый кадр
+        if img.format == 'GIF':
+            img.seek(0)
+
+        sizes = [
+            calculate_target_size(img.size, rendition.width, rendition.height, options.preserve_aspect_ratio)
+            if rendition.wants_resize() else None
+            for rendition in options.output_targets()
+        ]
+        if all(size is not None for size in sizes):
+            largest = max(sizes, key=lambda size: size[0] * size[1])
+            prepare_downscale(img, largest, options.reducing_gap)
+        img.load()
+    return img, sizes
+
+
+def encode_jpeg(img, options, quality=None):
+    """Кодирует изображение в JPG и возвращает байты."""
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=quality or options.quality, **options.encoder().save_params())
+    return buffer.getvalue()
+
+
+def encode_jpeg_to_size(img, options, max_bytes, quality=None):
+    """
+    Подбирает наибольшее качество, при котором JPG укладывается в max_bytes.
+
+    Пробные кодирования выполняются в памяти над уже подготовленным
+    изображением; на диск записывается только результат. Если даже
+    минимальное качество не укладывается в ограничение, возвращается
+    самый маленький вариант.
+
+    Returns:
+        кортеж (байты JPG, выбранное качество, число кодирований)
+    """
+    quality = quality or options.quality
+    attempts = 1
+    data = encode_jpeg(img, options, quality)
+    if len(data) <= max_bytes:
+        return data, quality, attempts
+
+    best_data, best_quality = None, None
+    smallest_data, smallest_quality = data, quality
+    low, high = 1, quality - 1
+    while low <= high:
+        middle = (low + high) // 2
+        candidate = encode_jpeg(img, options, middle)
+        attempts += 1
+        if len(candidate) <= max_bytes:
+            best_data, best_quality = candidate, middle
+            low = middle + 1
+        else:
+            if len(candidate) < len(smallest_data):
+                smallest_data, smallest_quality = candidate, middle
+            high = middle - 1
+
+    if best_data is None:
+        return smallest_data, smallest_quality, attempts
+    return best_data, best_quality, attempts
+
+
+def write_output(data, output_path):
+    """
+    Атомарно записывает готовый JPG на диск.
+
+    Данные пишутся во временный скрытый файл в той же папке и затем
+    переименовываются через os.replace, поэтому другие процессы (rsync,
+    выгрузка в CDN) никогда не видят частично записанный JPG.
+    """
+    fd, temp_path = create_temp_file(output_path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def render_variants(img, sizes, options, stats):
+    """
+    Получает из одного декодированного изображения все варианты размера.
+
+    Варианты обрабатываются от крупного к мелкому. Очередной вариант
+    получается из предыдущего, если тот не меньше чем в
+    RENDITION_DERIVE_RATIO раз больше по обоим измерениям (повторная
+    передискретизация тогда незаметна), иначе - из исходного изображения.
+
+    Yields:
+        пары (индекс варианта, готовое RGB изображение)
+    """
+    def area(index):
+        width, height = sizes[index] or img.size
+        return width * height
+
+    previous = None
+    for index in sorted(range(len(sizes)), key=area, reverse=True):
+        size = sizes[index] or img.size
+        base = img
+        if (previous is not None
+                and previous.width >= size[0] * RENDITION_DERIVE_RATIO
+                and previous.height >= size[1] * RENDITION_DERIVE_RATIO):
+            base = previous
+        with stats.stage("resize"):
+            variant = resize_image(base, size, options.reducing_gap) if sizes[index] is not None else base
+        with stats.stage("flatten"):
+            variant = flatten_alpha(variant, options.background_color)
+        previous = variant
+        yield index, variant
+
+
+def read_source(file_path):
+    """Читает исходный файл целиком в память."""
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+
+def read_image_header(data):
+    """
+    Возвращает размер и режим изображения по заголовку (пиксели не декодируются).
+
+    Args:
+        data: байты исходного изображения
+    """
+    with open_image(io.BytesIO(data)) as img:
+        return img.size, img.mode
+
+
+def estimate_decode_memory(size, mode, options):
+    """
+    Оценивает пиковую память (в байтах) на преобразование изображения.
+
+    Pillow хранит пиксели режимов L и P в одном байте, остальных - в четырех.
+    К декодированному изображению добавляются копия в RGBA/RGB (развертка
+    палитры, наложение прозрачности) и результаты всех вариантов размера.
+    """
+    width, height = size
+    pixels = width * height
+    pixel_size = 1 if mode in ('1', 'L', 'P') else 4
+    estimate = pixels * (pixel_size + 4)
+    for rendition in options.output_targets():
+        if rendition.wants_resize():
+            out_width, out_height = calculate_target_size(size, rendition.width, rendition.height,
+                                                          options.preserve_aspect_ratio)
+        else:
+            out_width, out_height = width, height
+        # Уменьшенная копия и ее версия без прозрачности
+        estimate += out_width * out_height * 4 * 2
+    return estimate
+
+
+def read_image_size(file_path):
+    """Возвращает размер изображения по заголовку файла, не декодируя пиксели."""
+    with open_image(file_path) as img:
+        return img.size
+
+
+def _encode_variant(variant, quality, options, stats):
+    """
+    Кодирует готовый вариант в JPG и обновляет счетчики.
+
+    В режиме автоматического качества (target_ssim) quality - верхняя
+    граница поиска; ограничение размера файла применяется после него и
+    может понизить качество еще сильнее.
+    """
+    quality = max(quality, options.encoder().min_quality)
+    encoded, attempts = None, 0
+    with stats.stage("encode"):
+        if options.target_ssim > 0:
+            # NumPy загружается только в этом режиме
+            from .quality import encode_jpeg_to_ssim
+            encoded, quality, attempts = encode_jpeg_to_ssim(variant, options, options.target_ssim, quality,
+                                                             encode_jpeg)
+        if options.max_size_kb > 0 and (encoded is None or len(encoded) > options.max_size_kb * 1024):
+            encoded, quality, more = encode_jpeg_to_size(variant, options, options.max_size_kb * 1024, quality)
+            attempts += more
+        elif encoded is None:
+            encoded, attempts = encode_jpeg(variant, options, quality), 1
+    stats.quality = quality
+    stats.encode_attempts += attempts
+    stats.bytes_out += len(encoded)
+    stats.pixels_out += variant.width * variant.height
+    return encoded
+
+
+def _encode_all(img, sizes, options, stats):
+    """
+    Получает и кодирует все варианты размера одного изображения.
+
+    Returns:
+        список пар (индекс варианта, байты JPG)
+    """
+    targets = options.output_targets()
+    return [
+        (index, _encode_variant(variant, targets[index].quality or options.quality, options, stats))
+        for index, variant in render_variants(img, sizes, options, stats)
+    ]
+
+
+def render_outputs(data, output_path, options, stats=None):
+    """
+    Декодирует исходные байты и кодирует все JPG, не обращаясь к диску.
+
+    Этапы: декодирование, изменение размера, наложение прозрачности и
+    кодирование. Альфа-канал накладывается после уменьшения, на меньшем
+    числе пикселей. Исходное изображение декодируется один раз для всех
+    вариантов размера. Анимированные изображения в режимах "all" и
+    "sheet" обрабатываются покадрово (см. render_frames).
+
+    Args:
+        data: байты исходного изображения
+        output_path: путь к JPG (для вариантов - базовый путь, см. ConversionOptions.output_paths)
+        options: экземпляр ConversionOptions
+        stats: FileStats для учета времени этапов (создается, если не передан)
+
+    Returns:
+        пара (список пар (путь, байты JPG), FileStats)
+    """
+    if stats is None:
+        stats = FileStats()
+    stats.bytes_in = len(data)
+
+    if options.frame_mode != "first":
+        with open_image(io.BytesIO(data)) as img:
+            if getattr(img, "n_frames", 1) > 1:
+                check_pixel_limit(img.size, options.max_image_pixels)
+                return render_frames(img, output_path, options, stats), stats
+
+    with stats.stage("decode"):
+        img, sizes = decode_image(io.BytesIO(data), options)
+    stats.pixels_in = img.width * img.height
+
+    output_paths = options.output_paths(output_path)
+    outputs = [(output_paths[index], encoded) for index, encoded in _encode_all(img, sizes, options, stats)]
+    return outputs, stats
+
+
+def iter_frames(img, step=1):
+    """
+    Последовательно декодирует кадры анимации и выдает каждый step-й.
+
+    В памяти находится только текущий кадр: каждый выданный кадр - копия,
+    не зависящая от дальнейшего перехода к следующим кадрам.
+
+    Yields:
+        пары (номер кадра с нуля, изображение кадра в режиме RGB или RGBA)
+    """
+    for index in range(0, getattr(img, "n_frames", 1), max(step, 1)):
+        img.seek(index)
+        frame = expand_palette(img)
+        if frame is img:
+            frame = img.copy()
+        yield index, frame
+
+
+def _frame_count(img, step):
+    """Число кадров, выбираемых с шагом step."""
+    return len(range(0, getattr(img, "n_frames", 1), max(step, 1)))
+
+
+def _render_frame(frame, sizes, options):
+    """Обрабатывает один кадр в потоке кодирования; статистика собирается отдельно и объединяется позже."""
+    stats = FileStats()
+    return _encode_all(frame, sizes, options, stats), stats
+
+
+def _sheet_cell(frame, cell_size, options):
+    """Уменьшает кадр до размера ячейки листа и накладывает прозрачность."""
+    stats = FileStats()
+    with stats.stage("resize"):
+        if frame.size != cell_size:
+            frame = resize_image(frame, cell_size, options.reducing_gap)
+    with stats.stage("flatten"):
+        frame = flatten_alpha(frame, options.background_color)
+    return frame, stats
+
+
+def _map_frames(img, options, stats, work, *args):
+    """
+    Передает кадры в пул потоков по мере декодирования и выдает результаты по порядку.
+
+    Декодирование (переход к следующему кадру) идет в текущем потоке, а
+    изменение размера и кодирование JPG, которые в Pillow отпускают GIL, -
+    параллельно в FRAME_THREADS потоках. Одновременно в работе не больше
+    2 * FRAME_THREADS кадров.
+
+    Yields:
+        пары (номер кадра, результат work)
+    """
+    pending = collections.deque()
+    with ThreadPoolExecutor(FRAME_THREADS, thread_name_prefix="png2jpg-frame") as pool:
+        frames = iter_frames(img, options.frame_step)
+        while True:
+            with stats.stage("decode"):
+                item = next(frames, None)
+            if item is None:
+                break
+            index, frame = item
+            stats.pixels_in += frame.width * frame.height
+            pending.append((index, pool.submit(work, frame, *args)))
+            del frame
+            if len(pending) >= 2 * FRAME_THREADS:
+                index, future = pending.popleft()
+                yield index, future.result()
+        while pending:
+            index, future = pending.popleft()
+            yield index, future.result()
+
+
+def render_frames(img, output_path, options, stats):
+    """
+    Обрабатывает все кадры (или каждый frame_step-й) анимированного изображения.
+
+    В режиме "all" каждый кадр сохраняется отдельным пронумерованным JPG
+    (номер исходного кадра с единицы, см. options.frame_path); в режиме
+    "sheet" кадры уменьшаются и размещаются на одном листе, который затем
+    кодируется как обычное изображение со всеми вариантами размера.
+
+    Args:
+        img: открытое анимированное изображение
+        output_path: базовый путь к JPG
+        options: экземпляр ConversionOptions
+        stats: FileStats для учета времени этапов
+
+    Returns:
+        список пар (путь, байты JPG)
+    """
+    targets = options.output_targets()
+    output_paths = options.output_paths(output_path)
+
+    if options.frame_mode == "all":
+        sizes = [
+            calculate_target_size(img.size, target.width, target.height, options.preserve_aspect_ratio)
+            if target.wants_resize() else None
+            for target in targets
+        ]
+        outputs = []
+        for index, (encoded, frame_stats) in _map_frames(img, options, stats, _render_frame, sizes, options):
+            stats.merge(frame_stats)
+            outputs.extend((frame_path(output_paths[target], index + 1), data) for target, data in encoded)
+        return outputs
+
+    # Лист: размер ячейки выбирается так, чтобы лист сразу получился размером
+    # самого крупного варианта и кадры не хранились в полном разрешении
+    count = _frame_count(img, options.frame_step)
+    columns = min(options.sheet_columns or math.ceil(math.sqrt(count)), count)
+    rows = math.ceil(count / columns)
+    frame_width, frame_height = img.size
+    full_size = (frame_width * columns, frame_height * rows)
+    scale = 0.0
+    for target in targets:
+        if not target.wants_resize():
+            scale = 1.0
+            break
+        width, height = calculate_target_size(full_size, target.width, target.height,
+                                              options.preserve_aspect_ratio)
+        scale = max(scale, width / full_size[0], height / full_size[1])
+    scale = min(scale, 1.0)
+    cell_size = (max(1, round(frame_width * scale)), max(1, round(frame_height * scale)))
+
+    sheet = Image.new('RGB', (cell_size[0] * columns, cell_size[1] * rows), tuple(options.background_color))
+    for position, (_, (cell, cell_stats)) in enumerate(_map_frames(img, options, stats, _sheet_cell,
+                                                                   cell_size, options)):
+        stats.merge(cell_stats)
+        row, column = divmod(position, columns)
+        sheet.paste(cell, (column * cell_size[0], row * cell_size[1]))
+
+    sizes = []
+    for target in targets:
+        size = None
+        if target.wants_resize():
+            size = calculate_target_size(sheet.size, target.width, target.height, options.preserve_aspect_ratio)
+            if size == sheet.size:
+                size = None
+        sizes.append(size)
+    return [(output_paths[index], encoded) for index, encoded in _encode_all(sheet, sizes, options, stats)]
+
+
+def write_outputs(outputs, stats=None):
+    """Записывает готовые JPG на диск, создавая недостающие папки."""
+    if stats is None:
+        stats = FileStats()
+    with stats.stage("write"):
+        for output_path, data in outputs:
+            output_dir = os.path.dirname(output_path)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            write_output(data, output_path)
+    return stats
+
+
+def convert_image(file_path, output_path, options):
+    """
+    Последовательно читает, преобразует и записывает один файл.
+
+    Args:
+        file_path: путь к исходному изображению
+        output_path: путь к JPG (для вариантов - базовый путь, см. ConversionOptions.output_paths)
+        options: экземпляр ConversionOptions
+
+    Returns:
+        FileStats со временем этапов и счетчиками
+    """
+    stats = FileStats()
+    with stats.stage("read"):
+        data = read_source(file_path)
+    outputs, stats = render_outputs(data, output_path, options, stats)
+    return write_outputs(outputs, stats)
@@ -0,0 +1,210 @@
+"""
+Измерение времени этапов конвейера и счетчики обработанных данных.
+
+Статистика по каждому файлу собирается в рабочем процессе (FileStats),
+возвращается вместе с результатом и передается наблюдателям движка.
+Наблюдатели могут писать журнал в формате JSON Lines или выводить
+итоговую таблицу в конце запуска.
+"""
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict
+
+
+# Этапы конвейера в порядке выполнения
+STAGES = ("read", "decode", "resize", "flatten", "encode", "write")
+
+
+@dataclass
+class FileStats:
+    """Время этапов и счетчики для одного преобразованного файла."""
+
+    stages: Dict[str, float] = field(default_factory=dict)
+    bytes_in: int = 0
+    bytes_out: int = 0
+    pixels_in: int = 0
+    pixels_out: int = 0
+    # Фактическое качество JPG и число пробных кодирований
+    quality: int = 0
+    encode_attempts: int = 0
+    # Оценка пиковой памяти на файл по заголовку (байты)
+    memory_estimate: int = 0
+
+    @contextmanager
+    def stage(self, name):
+        """Добавляет время выполнения блока к этапу name (в секундах)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def merge(self, other):
+        """Добавляет время этапов и счетчики выходных данных другого FileStats (например, кадра)."""
+        for name, seconds in other.stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self.bytes_out += other.bytes_out
+        self.pixels_out += other.pixels_out
+        self.encode_attempts += other.encode_attempts
+        if other.quality:
+            self.quality = other.quality
+
+    @property
+    def total_seconds(self):
+        """Суммарное время всех этапов."""
+        return sum(self.stages.values())
+
+
+class RunSummary:
+    """
+    Агрегированная статистика одного запуска движка.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.converted = 0
+        self.skipped = 0
+        self.failed = 0
+        # Сколько файлов отклонено из-за предела числа пикселей (входят в failed)
+        self.too_large = 0
+        # Сколько файлов взято из кеша результатов (входят в converted)
+        self.cache_hits = 0
+        # Сколько файлов совпали с другим файлом пакета и не кодировались (входят в converted)
+        self.duplicates = 0
+        # Число групп одинаковых файлов (в каждой один файл преобразован, остальные - duplicates)
+        self.duplicate_groups = 0
+        # Сколько результатов не удалось сохранить в кеше (файлы при этом записаны)
+        self.cache_errors = 0
+        # Запуск отменен до завершения (оставшиеся файлы не обработаны)
+        self.cancelled = False
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.pixels_in = 0
+        self.pixels_out = 0
+
+    def add(self, result):
+        """Учитывает результат преобразования одного файла."""
+        if result.skipped:
+            self.skipped += 1
+            return
+        if not result.ok:
+            self.failed += 1
+            if result.too_large:
+                self.too_large += 1
+            return
+        self.converted += 1
+        if result.cached:
+            self.cache_hits += 1
+        if result.duplicate_of:
+            self.duplicates += 1
+        if result.cache_error:
+            self.cache_errors += 1
+        stats = result.stats
+        if stats is None:
+            return
+        for stage, seconds in stats.stages.items():
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.bytes_in += stats.bytes_in
+        self.bytes_out += stats.bytes_out
+        self.pixels_in += stats.pixels_in
+        self.pixels_out += stats.pixels_out
+
+    def finish(self):
+        """Фиксирует общее время запуска."""
+        self.elapsed = time.perf_counter() - self.started
+
+    def as_dict(self):
+        """Возвращает сводку в виде словаря для JSON."""
+        return {
+            "elapsed": round(self.elapsed, 4),
+            "converted": self.converted,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "too_large": self.too_large,
+            "cache_hits": self.cache_hits,
+            "duplicates": self.duplicates,
+            "duplicate_groups": self.duplicate_groups,
+            "cache_errors": self.cache_errors,
+            "cancelled": self.cancelled,
+            "files_per_sec": round(self.converted / self.elapsed, 2) if self.elapsed else None,
+            "stages": {stage: round(seconds, 4) for stage, seconds in self.stages.items()},
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "pixels_in": self.pixels_in,
+            "pixels_out": self.pixels_out,
+        }
+
+
+class ConversionObserver:
+    """
+    Базовый наблюдатель за ходом преобразования.
+
+    Методы вызываются в потоке, который читает результаты движка.
+    """
+
+    def on_file(self, result):
+        """Вызывается для каждого обработанного (или пропущенного) файла."""
+
+    def on_finish(self, summary):
+        """Вызывается один раз в конце запуска с RunSummary."""
+
+
+class JsonLinesObserver(ConversionObserver):
+    """
+    Записывает по строке JSON на каждый файл и итоговую строку со сводкой.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def on_file(self, result):
+        record = {
+            "event": "file",
+            "source": result.source_path,
+            "output": result.output_path,
+            "status": "skipped" if result.skipped else ("ok" if result.ok else "error"),
+        }
+        if result.error:
+            record["error"] = result.error
+        if result.cache_error:
+            record["cache_error"] = result.cache_error
+        if result.stats is not None:
+            record.update(asdict(result.stats))
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def on_finish(self, summary):
+        self._file.write(json.dumps({"event": "summary", **summary.as_dict()}, ensure_ascii=False) + "\n")
+        self._file.close()
+
+
+class SummaryTableObserver(ConversionObserver):
+    """
+    Выводит в конце запуска таблицу времени этапов и счетчиков.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+
+    def on_finish(self, summary):
+        stage_total = sum(summary.stages.values()) or 1.0
+        lines = [f"{'Этап':<10} {'Время, с':>10} {'Доля':>7}"]
+        for stage, seconds in summary.stages.items():
+            lines.append(f"{stage:<10} {seconds:>10.3f} {seconds / stage_total:>7.1%}")
+        lines.append(
+            f"Файлов: {summary.converted} преобразовано, {summary.skipped} пропущено, "
+            f"{summary.failed} с ошибками за {summary.elapsed:.2f} с"
+            + (f" (из кеша: {summary.cache_hits})" if summary.cache_hits else "")
+            + (f" (одинаковых файлов: {summary.duplicates})" if summary.duplicates else "")
+        )
+        lines.append(
+            f"Данные: {summary.bytes_in / 1e6:.1f} МБ -> {summary.bytes_out / 1e6:.1f} МБ, "
+            f"{summary.pixels_in / 1e6:.1f} Мпикс -> {summary.pixels_out / 1e6:.1f} Мпикс"
+        )
+        print("\n".join(lines), file=self.stream)
@@ -0,0 +1,135 @@
+"""
+Журнал контрольных точек пакетного преобразования.
+
+Манифест записывается целиком в конце запуска, поэтому после аварийного
+завершения (закрытие окна, сбой, выключение) он не знает, какие файлы
+уже готовы. Журнал - файл JSON Lines в выходной директории, в который
+после каждого записанного JPG дописывается одна строка. Повторный запуск
+с теми же параметрами пропускает файлы из журнала и продолжает с места
+остановки. После полного завершения пакета журнал удаляется.
+
+Запись только дописывается в конец, поэтому при обрыве может пострадать
+лишь последняя строка; она игнорируется при чтении.
+"""
+
+import json
+import os
+import threading
+
+from .manifest import options_fingerprint
+
+
+# Имя файла журнала в выходной директории
+JOURNAL_NAME = ".png2jpg-journal.jsonl"
+JOURNAL_VERSION = 1
+
+
+class CheckpointJournal:
+    """
+    Журнал файлов, преобразованных в прерванном пакете.
+
+    Первая строка - заголовок с параметрами преобразования; журнал с
+    другими параметрами считается устаревшим и начинается заново.
+    """
+
+    def __init__(self, output_dir, options):
+        """
+        Args:
+            output_dir: выходная директория, в которой хранится журнал
+            options: экземпляр ConversionOptions текущего пакета
+        """
+        self.path = os.path.join(output_dir, JOURNAL_NAME)
+        self.settings = options_fingerprint(options)
+        # Абсолютный путь исходного файла -> запись журнала
+        self.entries = {}
+        # Причина, по которой поврежденный журнал не прочитан и будет пересоздан (None - прочитан)
+        self.load_error = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, output_dir, options):
+        """Загружает журнал прерванного пакета (или создает пустой)."""
+        journal = cls(output_dir, options)
+        try:
+            with open(journal.path, 'r', encoding='utf-8') as f:
+                lines = iter(f)
+                header = json.loads(next(lines, "null"))
+                if (not isinstance(header, dict) or header.get("version") != JOURNAL_VERSION
+                        or header.get("settings") != journal.settings):
+                    return journal
+                for line in lines:
+                    try:
+                        entry = json.loads(line)
+                        journal.entries[entry["source"]] = entry
+                    except (ValueError, KeyError, TypeError):
+                        # Строка, оборванная при аварийном завершении
+                        continue
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            journal.load_error = str(e)
+        return journal
+
+    def __len__(self):
+        return len(self.entries)
+
+    def is_complete(self, source_path, output_path):
+        """Проверяет, был ли файл преобразован в прерванном пакете и с тех пор не изменился."""
+        entry = self.entries.get(os.path.abspath(source_path))
+        if entry is None or entry.get("output") != os.path.abspath(output_path):
+            return False
+        if not all(os.path.exists(path) for path in entry.get("outputs", ())):
+            return False
+        try:
+            stat = os.stat(source_path)
+        except OSError:
+            return False
+        return stat.st_size == entry.get("size") and stat.st_mtime_ns == entry.get("mtime_ns")
+
+    def record(self, source_path, output_path, written):
+        """Дописывает в журнал успешно преобразованный файл."""
+        try:
+            stat = os.stat(source_path)
+        except OSError:
+            return
+        entry = {
+            "source": os.path.abspath(source_path),
+            "output": os.path.abspath(output_path),
+            "outputs": [os.path.abspath(path) for path in written],
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        with self._lock:
+            if self._file is None:
+                self._open()
+            # Строка сбрасывается на диск сразу: журнал должен пережить аварийное завершение
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self.entries[entry["source"]] = entry
+
+    def _open(self):
+        """Открывает журнал для дописывания; новый журнал начинается с заголовка."""
+        if self.entries and os.path.exists(self.path):
+            self._file = open(self.path, 'a', encoding='utf-8')
+            return
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write(json.dumps({"version": JOURNAL_VERSION, "settings": self.settings},
+                                    ensure_ascii=False) + "\n")
+
+    def close(self):
+        """Закрывает файл журнала (журнал остается для продолжения пакета)."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def discard(self):
+        """Удаляет журнал: пакет завершен полностью."""
+        self.close()
+        with self._lock:
+            self.entries = {}
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,152 @@
+"""
+Манифест инкрементального преобразования.
+
+Манифест хранится в выходной директории и для каждого исходного файла
+запоминает размер, время изменения, (опционально) хеш содержимого и
+параметры, с которыми был получен JPG. Повторный запуск пропускает файлы,
+результат для которых уже актуален.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import asdict, fields
+
+from .atomic import create_temp_file
+
+
+# Имя файла манифеста в выходной директории
+MANIFEST_NAME = ".png2jpg-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def options_fingerprint(options):
+    """
+    Возвращает параметры преобразования в виде, пригодном для сравнения с JSON.
+
+    Поля, не влияющие на результат (metadata fingerprint=False), не учитываются.
+    """
+    values = asdict(options)
+    for option in fields(options):
+        if not option.metadata.get("fingerprint", True):
+            del values[option.name]
+    return json.loads(json.dumps(values, sort_keys=True))
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """Вычисляет хеш содержимого файла (BLAKE2b)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionManifest:
+    """
+    Сведения о ранее преобразованных файлах одной выходной директории.
+    """
+
+    def __init__(self, output_dir, use_content_hash=False):
+        """
+        Args:
+            output_dir: выходная директория, в которой хранится манифест
+            use_content_hash: сверять хеш содержимого, если изменилось только время файла
+        """
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.use_content_hash = use_content_hash
+        self.entries = {}
+        self.dirty = False
+        # Причина, по которой поврежденный манифест не прочитан и будет пересоздан (None - прочитан)
+        self.load_error = None
+
+    @classmethod
+    def load(cls, output_dir, use_content_hash=False):
+        """Загружает манифест из выходной директории (или создает пустой)."""
+        manifest = cls(output_dir, use_content_hash)
+        try:
+            with open(manifest.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                manifest.entries = data.get("files", {})
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, AttributeError) as e:
+            manifest.load_error = str(e)
+        return manifest
+
+    def save(self):
+        """Атомарно записывает манифест, если в нем есть изменения."""
+        if not self.dirty:
+            return
+        fd, temp_path = create_temp_file(self.path)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"version": MANIFEST_VERSION, "files": self.entries}, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.dirty = False
+
+    def is_up_to_date(self, source_path, output_path, options):
+        """
+        Проверяет, соответствует ли существующий JPG исходному файлу и параметрам.
+        """
+        entry = self.entries.get(os.path.abspath(source_path))
+        if entry is None:
+            return False
+        if entry.get("output") != os.path.abspath(output_path):
+            return False
+        written = entry.get("outputs")
+        if written:
+            if not all(os.path.exists(path) for path in written):
+                return False
+        elif not options.outputs_exist(output_path):
+            return False
+        if entry.get("settings") != options_fingerprint(options):
+            return False
+
+        try:
+            stat = os.stat(source_path)
+        except OSError:
+            return False
+        if stat.st_size != entry.get("size"):
+            return False
+        if stat.st_mtime_ns == entry.get("mtime_ns"):
+            return True
+
+        # Время изменилось, но содержимое могло остаться прежним (копирование, touch)
+        if self.use_content_hash and entry.get("hash") and file_digest(source_path) == entry["hash"]:
+            entry["mtime_ns"] = stat.st_mtime_ns
+            self.dirty = True
+            return True
+        return False
+
+    def record(self, source_path, output_path, options, written=()):
+        """
+        Запоминает успешно преобразованный файл.
+
+        Args:
+            written: фактически записанные JPG (их наличие проверяется при
+                следующем запуске); по умолчанию - пути из options.output_paths
+        """
+        try:
+            stat = os.stat(source_path)
+        except OSError:
+            # Исходный файл удален во время преобразования - запоминать нечего
+            return
+        entry = {
+            "output": os.path.abspath(output_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "settings": options_fingerprint(options),
+        }
+        if written and list(written) != options.output_paths(output_path):
+            # Пути сохраняются, только если они отличаются от ожидаемых (кадры анимации)
+            entry["outputs"] = [os.path.abspath(path) for path in written]
+        if self.use_content_hash:
+            entry["hash"] = file_digest(source_path)
+        self.entries[os.path.abspath(source_path)] = entry
+        self.dirty = True
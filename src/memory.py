@@ -0,0 +1,140 @@
+"""
+Учет оперативной памяти при параллельном преобразовании.
+
+Движок оценивает память, нужную на декодирование файла, по его заголовку и
+допускает файл в обработку только в пределах бюджета. Изображение, которое
+не помещается в бюджет, выполняется в одиночку. Если свободной памяти в
+системе становится меньше, одновременно обрабатывается меньше файлов.
+"""
+
+import collections
+import os
+import threading
+import time
+
+
+def total_memory():
+    """Возвращает объем физической памяти в байтах или None, если он неизвестен."""
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def available_memory():
+    """
+    Возвращает объем доступной памяти в байтах или None, если он неизвестен.
+
+    На Linux используется MemAvailable из /proc/meminfo (с учетом кеша,
+    который ядро может освободить).
+    """
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class MemoryBudget:
+    """
+    Ограничивает суммарную оценку памяти файлов, обрабатываемых одновременно.
+
+    Файл допускается, если его оценка помещается в остаток бюджета и в
+    доступную память системы. Первый файл допускается всегда, поэтому
+    изображение больше бюджета выполняется, когда остальные завершены,
+    и до его завершения новые файлы не допускаются.
+
+    Файлы допускаются в порядке очереди: пока ждет файл, не поместившийся
+    в остаток бюджета, следующие за ним тоже ждут, даже если поместились
+    бы. Иначе мелкие файлы занимали бы бюджет раньше крупного, и он ждал
+    бы до конца пакета.
+    """
+
+    # Как часто перепроверять доступную память во время ожидания (секунды)
+    POLL_INTERVAL = 0.5
+    # Какую долю доступной памяти системы можно занять
+    AVAILABLE_FRACTION = 0.9
+
+    def __init__(self, limit, probe=available_memory):
+        """
+        Args:
+            limit: бюджет в байтах (None или 0 - без ограничения)
+            probe: функция, возвращающая доступную память системы (или None)
+        """
+        self.limit = limit or None
+        self.used = 0
+        # Сколько раз файлу пришлось ждать освобождения памяти
+        self.waits = 0
+        self._probe = probe
+        self._probed_at = 0.0
+        self._available = None
+        # Очередь ожидающих acquire (по одной метке на вызов)
+        self._waiting = collections.deque()
+        self._condition = threading.Condition()
+
+    def acquire(self, amount, cancelled=lambda: False):
+        """
+        Дожидается места в бюджете и резервирует amount байт.
+
+        Args:
+            amount: оценка памяти файла
+            cancelled: функция, возвращающая True, если ожидание нужно прервать
+
+        Returns:
+            зарезервированный объем (передается в release)
+
+        Raises:
+            RuntimeError: если ожидание прервано
+        """
+        with self._condition:
+            ticket = object()
+            self._waiting.append(ticket)
+            try:
+                waited = False
+                while self._waiting[0] is not ticket or self.used and not self._fits(amount):
+                    if cancelled():
+                        raise RuntimeError("Преобразование остановлено")
+                    waited = True
+                    self._condition.wait(self.POLL_INTERVAL)
+                if waited:
+                    self.waits += 1
+                if cancelled():
+                    raise RuntimeError("Преобразование остановлено")
+                self.used += amount
+                return amount
+            finally:
+                # Следующий в очереди проверяет, помещается ли он теперь
+                self._waiting.remove(ticket)
+                self._condition.notify_all()
+
+    def release(self, amount):
+        """Освобождает зарезервированный объем."""
+        with self._condition:
+            self.used = max(self.used - amount, 0)
+            self._condition.notify_all()
+
+    def wake(self):
+        """Будит ожидающие потоки (например, при остановке преобразования)."""
+        with self._condition:
+            self._condition.notify_all()
+
+    def _fits(self, amount):
+        """Проверяет, помещается ли amount в бюджет и в доступную память."""
+        if self.limit is not None and self.used + amount > self.limit:
+            return False
+        available = self._available_memory()
+        return available is None or amount <= available * self.AVAILABLE_FRACTION
+
+    def _available_memory(self):
+        """Возвращает доступную память системы, опрашивая ее не чаще POLL_INTERVAL."""
+        now = time.monotonic()
+        if now - self._probed_at >= self.POLL_INTERVAL:
+            self._available = self._probe() if self._probe is not None else None
+            self._probed_at = now
+        return self._available
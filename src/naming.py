@@ -0,0 +1,188 @@
+"""
+Шаблоны имен выходных файлов.
+
+Шаблон (например, "{filename}_converted.jpg") разбирается один раз на пакет
+и затем применяется к каждому файлу без повторного разбора. Планировщик
+имен отслеживает уже выданные пути и разрешает совпадения заранее, в один
+проход, вместо того чтобы файлы перезаписывали друг друга.
+"""
+
+import datetime
+import os
+import string
+
+from .manifest import file_digest
+
+
+# Имя по умолчанию совпадает с прежним поведением: a.png -> a.jpg
+DEFAULT_NAMING_PATTERN = "{filename}.jpg"
+
+# Поля, доступные в шаблоне
+NAMING_FIELDS = ("filename", "ext", "width", "height", "quality", "date", "hash8")
+
+
+class NamingPattern:
+    """
+    Разобранный шаблон имени выходного файла.
+    """
+
+    def __init__(self, template):
+        """
+        Args:
+            template: шаблон с полями {filename}, {ext}, {width}, {height},
+                {quality}, {date}, {hash8}
+
+        Raises:
+            ValueError: если шаблон содержит неизвестные поля или ошибки синтаксиса
+        """
+        if not template or not template.strip():
+            raise ValueError("Шаблон имени не может быть пустым")
+        if not template.lower().endswith(('.jpg', '.jpeg')):
+            template += ".jpg"
+        self.template = template
+
+        self._pieces = []
+        fields = set()
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as e:
+            raise ValueError(f"Ошибка в шаблоне имени {template!r}: {e}")
+        for literal, field_name, format_spec, conversion in parsed:
+            if field_name is not None and field_name not in NAMING_FIELDS:
+                raise ValueError(
+                    f"Неизвестное поле {{{field_name}}} в шаблоне имени; допустимы: "
+                    + ", ".join(f"{{{name}}}" for name in NAMING_FIELDS)
+                )
+            if field_name is not None:
+                fields.add(field_name)
+            self._pieces.append((literal, field_name, format_spec or "", conversion))
+
+        if "filename" not in fields and "hash8" not in fields:
+            raise ValueError("Шаблон имени должен содержать {filename} или {hash8}, иначе все файлы получат одно имя")
+        if os.sep in template or (os.altsep and os.altsep in template):
+            raise ValueError("Шаблон имени не может содержать разделители папок")
+
+        # Какие данные нужно собрать для файла помимо имени
+        self.needs_size = bool(fields & {"width", "height"})
+        self.needs_hash = "hash8" in fields
+
+    def format(self, values):
+        """Подставляет значения полей и возвращает имя файла."""
+        parts = []
+        for literal, field_name, format_spec, conversion in self._pieces:
+            parts.append(literal)
+            if field_name is None:
+                continue
+            value = values[field_name]
+            if conversion == 'r':
+                value = repr(value)
+            elif conversion == 's':
+                value = str(value)
+            parts.append(format(value, format_spec))
+        return "".join(parts)
+
+
+class OutputPlanner:
+    """
+    Выдает пути выходных файлов для пакета и заранее разрешает совпадения имен.
+
+    Если два исходных файла получают одно имя (например, a.png и a.webp
+    с шаблоном "{filename}.jpg"), второй получает суффикс с исходным
+    расширением, а при необходимости - порядковый номер. Каждое такое
+    переименование запоминается в collisions. Повторный запрос для того же
+    исходного файла (например, при наблюдении за папкой) возвращает тот же путь.
+    """
+
+    def __init__(self, output_dir, options, pattern=DEFAULT_NAMING_PATTERN, date_subfolder=False, today=None):
+        """
+        Args:
+            output_dir: выходная директория
+            options: экземпляр ConversionOptions (для {width}, {height}, {quality})
+            pattern: шаблон имени (строка или NamingPattern)
+            date_subfolder: создавать ли подпапку с датой пакета (ГГГГ-ММ-ДД)
+            today: дата пакета (по умолчанию - сегодня)
+        """
+        self.pattern = pattern if isinstance(pattern, NamingPattern) else NamingPattern(pattern)
+        self.options = options
+        self.date = (today or datetime.date.today()).isoformat()
+        self.root = os.path.join(output_dir, self.date) if date_subfolder else output_dir
+        self.collisions = []
+        # Выданные пути (нормализованные) -> исходный файл, которому они выданы
+        self._claimed = {}
+
+    def output_path(self, source_path, relative_dir=""):
+        """
+        Возвращает путь JPG для исходного файла.
+
+        Args:
+            source_path: путь к исходному файлу
+            relative_dir: вложенная папка относительно входной (повторяется в выходной)
+        """
+        file_name = os.path.basename(source_path)
+        stem, ext = os.path.splitext(file_name)
+        values = {
+            "filename": stem,
+            "ext": ext.lstrip('.').lower(),
+            "quality": self.options.quality,
+            "date": self.date,
+            "width": 0,
+            "height": 0,
+            "hash8": "",
+        }
+        if self.pattern.needs_size:
+            values["width"], values["height"] = self._output_size(source_path)
+        if self.pattern.needs_hash:
+            try:
+                values["hash8"] = file_digest(source_path)[:8]
+            except OSError:
+                pass
+
+        directory = os.path.join(self.root, relative_dir)
+        path = os.path.join(directory, self.pattern.format(values))
+        if self._claim(path, source_path):
+            return path
+
+        # Совпадение имени: сначала пробуем суффикс с исходным расширением, затем номер
+        base, jpg_ext = os.path.splitext(path)
+        candidates = [f"{base}_{values['ext']}{jpg_ext}"] if values["ext"] else []
+        number = 2
+        while True:
+            for candidate in candidates:
+                claimed_before = self._is_claimed(candidate)
+                if self._claim(candidate, source_path):
+                    if not claimed_before:
+                        self.collisions.append((source_path, path, candidate))
+                    return candidate
+            candidates = [f"{base}_{number}{jpg_ext}"]
+            number += 1
+
+    def _claim(self, path, source_path):
+        """
+        Занимает путь для исходного файла, если он не выдан другому файлу.
+
+        Пути сравниваются без учета регистра там, где его не учитывает ФС.
+        """
+        owner = self._claimed.setdefault(os.path.normcase(os.path.abspath(path)), source_path)
+        return owner == source_path
+
+    def _is_claimed(self, path):
+        """Проверяет, выдан ли путь какому-либо файлу."""
+        return os.path.normcase(os.path.abspath(path)) in self._claimed
+
+    def _output_size(self, source_path):
+        """
+        Вычисляет размер результата по заголовку исходного файла (без декодирования).
+
+        Нечитаемый файл получает размер 0x0: ошибку сообщит сама конвертация.
+        """
+        # Pillow загружается только для шаблонов с {width} и {height}
+        from .imaging import calculate_target_size, read_image_size
+
+        try:
+            size = read_image_size(source_path)
+        except (OSError, ValueError):
+            return 0, 0
+        if not self.options.wants_resize():
+            return size
+        return calculate_target_size(size, self.options.target_width, self.options.target_height,
+                                     self.options.preserve_aspect_ratio)
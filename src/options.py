@@ -0,0 +1,288 @@
+"""
+Параметры преобразования, общие для графического интерфейса и движка конвертации.
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+
+def parse_color(value):
+    """
+    Разбирает цвет в формате "#rrggbb", "#rgb" или [r, g, b].
+
+    Raises:
+        ValueError: если значение не является цветом
+    """
+    if isinstance(value, str):
+        text = value.strip().lstrip('#')
+        if len(text) == 3:
+            text = ''.join(ch * 2 for ch in text)
+        if len(text) != 6:
+            raise ValueError(f"Недопустимый цвет: {value}")
+        return tuple(int(text[i:i + 2], 16) for i in (0, 2, 4))
+
+    color = tuple(int(channel) for channel in value)
+    if len(color) != 3 or not all(0 <= channel <= 255 for channel in color):
+        raise ValueError(f"Недопустимый цвет: {value}")
+    return color
+
+
+def parse_reducing_gap(value):
+    """
+    Проверяет запас быстрого уменьшения: 0 (точный LANCZOS) или не меньше 1.0.
+
+    Pillow отвергает reducing_gap меньше 1.0 при каждом изменении размера,
+    поэтому такое значение привело бы к ошибке на каждом файле.
+
+    Raises:
+        ValueError: если значение не число, отрицательное или между 0 и 1
+    """
+    if value is None:
+        return 0.0
+    try:
+        gap = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Недопустимый запас уменьшения: {value}")
+    if isinstance(value, bool) or gap != 0 and not 1.0 <= gap < float("inf"):
+        raise ValueError(f"Запас уменьшения должен быть 0 (точный LANCZOS) или не меньше 1.0, получено: {value}")
+    return gap
+
+
+# Расширения файлов, которые конвертер умеет преобразовывать
+SUPPORTED_EXTENSIONS = ('.png', '.webp', '.bmp', '.gif')
+
+# Обработка анимированных GIF, WebP и APNG: только первый кадр, каждый
+# кадр отдельным JPG или все кадры на одном листе (contact sheet)
+FRAME_MODES = ("first", "all", "sheet")
+
+# Порог Pillow для DecompressionBombError: 2 * Image.MAX_IMAGE_PIXELS
+DEFAULT_MAX_IMAGE_PIXELS = 2 * 89478485
+
+
+def frame_path(path, number):
+    """Возвращает путь JPG для кадра с номером number (с единицы): a.jpg -> a_0001.jpg."""
+    base, ext = os.path.splitext(path)
+    return f"{base}_{number:04d}{ext}"
+
+
+# Способы размещения вариантов размера: в подпапках или с суффиксом в имени
+RENDITION_LAYOUTS = ("subfolder", "suffix")
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """
+    Один вариант размера, получаемый из исходного изображения.
+
+    Нулевые ширина и высота означают исходный размер, нулевое качество -
+    общее качество из ConversionOptions.
+    """
+
+    name: str
+    width: int = 0
+    height: int = 0
+    quality: int = 0
+
+    def wants_resize(self):
+        """Возвращает True, если указано хотя бы одно целевое измерение."""
+        return self.width > 0 or self.height > 0
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Разбирает описание варианта в формате "имя:ШxВ" или "имя:ШxВ:качество".
+
+        Raises:
+            ValueError: если описание некорректно
+        """
+        parts = text.split(':')
+        if len(parts) not in (2, 3) or not parts[0]:
+            raise ValueError(f"Ожидается имя:ШxВ[:качество], получено: {text}")
+        width, _, height = parts[1].lower().partition('x')
+        rendition = cls(parts[0], int(width or 0), int(height or 0), int(parts[2]) if len(parts) == 3 else 0)
+        rendition.validate()
+        return rendition
+
+    @classmethod
+    def from_dict(cls, data):
+        """Создает вариант из словаря настроек."""
+        rendition = cls(str(data["name"]), int(data.get("width", 0)), int(data.get("height", 0)),
+                        int(data.get("quality", 0)))
+        rendition.validate()
+        return rendition
+
+    def validate(self):
+        """Проверяет значения варианта."""
+        if not self.name or os.sep in self.name or (os.altsep and os.altsep in self.name):
+            raise ValueError(f"Недопустимое имя варианта: {self.name!r}")
+        if self.width < 0 or self.height < 0:
+            raise ValueError(f"Размер варианта {self.name} не может быть отрицательным")
+        if not 0 <= self.quality <= 100:
+            raise ValueError(f"Качество варианта {self.name} должно быть между 1 и 100")
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """
+    Набор параметров кодировщика JPEG.
+
+    Профиль определяет компромисс между скоростью кодирования и размером
+    файла; качество по-прежнему задается в ConversionOptions.
+    """
+
+    name: str
+    # Дополнительный проход для оптимальных таблиц Хаффмана: файл на несколько
+    # процентов меньше, кодирование заметно дольше
+    optimize: bool = True
+    progressive: bool = False
+    # Прореживание цветности: 0 - 4:4:4, 1 - 4:2:2, 2 - 4:2:0
+    subsampling: int = 2
+    # Нижняя граница качества (0 - без ограничения); не действует, если
+    # качество подбирается под ограничение размера файла
+    min_quality: int = 0
+
+    def save_params(self):
+        """Возвращает параметры для Image.save(..., "JPEG")."""
+        return {"optimize": self.optimize, "progressive": self.progressive, "subsampling": self.subsampling}
+
+
+# Профили кодировщика: standard - прежнее поведение (optimize, 4:2:0),
+# fast - без оптимизации Хаффмана, web - прогрессивный JPEG для браузеров,
+# archival - без прореживания цветности и с качеством не ниже 95
+ENCODER_PROFILES = {
+    profile.name: profile for profile in (
+        EncoderProfile("standard"),
+        EncoderProfile("fast", optimize=False),
+        EncoderProfile("web", progressive=True),
+        EncoderProfile("archival", subsampling=0, min_quality=95),
+    )
+}
+DEFAULT_ENCODER_PROFILE = "standard"
+
+
+@dataclass(frozen=True)
+class ConversionOptions:
+    """
+    Неизменяемый набор параметров преобразования изображений в JPG.
+
+    Объект передается в рабочие процессы, поэтому должен оставаться
+    простым и сериализуемым через pickle.
+    """
+
+    quality: int = 95
+    target_width: int = 0
+    target_height: int = 0
+    preserve_aspect_ratio: bool = True
+    # Запас для быстрого уменьшения: изображение сначала дешево сокращается
+    # в целое число раз (не меньше чем до target * reducing_gap), затем
+    # доводится фильтром LANCZOS. None или 0 - точный LANCZOS по полному
+    # изображению; иначе не меньше 1.0 (см. parse_reducing_gap): значения
+    # ближе к 1.0 быстрее, но немного грубее.
+    reducing_gap: Optional[float] = 3.0
+    # Цвет фона (R, G, B), на который накладываются прозрачные области
+    background_color: Tuple[int, int, int] = (255, 255, 255)
+    # Ограничение размера JPG в килобайтах (0 - без ограничения). Качество
+    # подбирается двоичным поиском не выше quality.
+    max_size_kb: int = 0
+    # Набор вариантов размера: каждый исходный файл декодируется один раз,
+    # а все варианты получаются из декодированного изображения. Пустой
+    # набор - один JPG с размером target_width x target_height.
+    renditions: Tuple[Rendition, ...] = ()
+    rendition_layout: str = "subfolder"
+    # Предел числа пикселей исходного изображения (защита от "бомб
+    # декомпрессии"; 0 - без собственного предела). По умолчанию совпадает
+    # с порогом, на котором Pillow отказывается открывать файл; этот порог
+    # (Image.MAX_IMAGE_PIXELS) действует всегда, поэтому большее значение
+    # его не снимает. На результат не влияет, поэтому не входит в отпечаток
+    # параметров манифеста.
+    max_image_pixels: int = field(default=DEFAULT_MAX_IMAGE_PIXELS, metadata={"fingerprint": False})
+    # Кадры анимированных изображений (см. FRAME_MODES), шаг выборки кадров
+    # (каждый N-й) и число столбцов листа (0 - примерно квадратный лист)
+    frame_mode: str = "first"
+    frame_step: int = 1
+    sheet_columns: int = 0
+    # Профиль кодировщика JPEG (ключ ENCODER_PROFILES)
+    encoder_profile: str = DEFAULT_ENCODER_PROFILE
+    # Автоматическое качество: наименьшее качество (не выше quality), при
+    # котором SSIM JPG с подготовленным изображением не ниже порога
+    # (например, 0.95); 0 - качество quality для всех изображений
+    target_ssim: float = 0.0
+
+    def wants_resize(self):
+        """Возвращает True, если указано хотя бы одно целевое измерение."""
+        return self.target_width > 0 or self.target_height > 0
+
+    def encoder(self):
+        """Возвращает EncoderProfile выбранного профиля."""
+        return ENCODER_PROFILES[self.encoder_profile]
+
+    def output_targets(self):
+        """Возвращает варианты размера, которые создаются для каждого файла."""
+        if self.renditions:
+            return list(self.renditions)
+        return [Rendition("", self.target_width, self.target_height)]
+
+    def output_paths(self, output_path):
+        """
+        Возвращает пути всех JPG, создаваемых для задания с путем output_path.
+
+        Порядок совпадает с output_targets().
+        """
+        directory, file_name = os.path.split(output_path)
+        paths = []
+        for rendition in self.output_targets():
+            if not rendition.name:
+                paths.append(output_path)
+            elif self.rendition_layout == "suffix":
+                base_name, ext = os.path.splitext(file_name)
+                paths.append(os.path.join(directory, f"{base_name}_{rendition.name}{ext}"))
+            else:
+                paths.append(os.path.join(directory, rendition.name, file_name))
+        return paths
+
+    def output_slot(self, output_path, path):
+        """
+        Определяет, каким выходом задания output_path является записанный путь path.
+
+        Слот не зависит от имени и папки задания, поэтому по нему можно
+        получить соответствующий путь другого задания (см. slot_path).
+
+        Returns:
+            пара (индекс в output_paths, номер кадра или 0)
+
+        Raises:
+            ValueError: если путь не относится к заданию
+        """
+        output_paths = self.output_paths(output_path)
+        for index, expected in enumerate(output_paths):
+            if path == expected:
+                return index, 0
+        for index, expected in enumerate(output_paths):
+            base, ext = os.path.splitext(expected)
+            number = path[len(base) + 1:len(path) - len(ext)]
+            if path.startswith(base + "_") and path.endswith(ext) and number.isdigit() \
+                    and frame_path(expected, int(number)) == path:
+                return index, int(number)
+        raise ValueError(f"Путь {path} не соответствует выходам задания")
+
+    def slot_path(self, output_path, slot):
+        """Возвращает путь выхода slot (см. output_slot) для задания output_path."""
+        index, frame = slot
+        path = self.output_paths(output_path)[index]
+        return frame_path(path, frame) if frame else path
+
+    def outputs_exist(self, output_path):
+        """
+        Проверяет, созданы ли уже все JPG задания.
+
+        В покадровом режиме анимированное изображение вместо каждого пути
+        создает пронумерованные кадры; его наличие проверяется по первому кадру.
+        """
+        for path in self.output_paths(output_path):
+            if os.path.exists(path):
+                continue
+            if self.frame_mode == "all" and os.path.exists(frame_path(path, 1)):
+                continue
+            return False
+        return True
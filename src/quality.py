@@ -0,0 +1,143 @@
+"""
+Автоматический подбор качества JPG по структурному сходству (SSIM).
+
+Для каждого изображения ищется наименьшее качество, при котором JPG
+остается визуально близким к подготовленному (уменьшенному и
+наложенному на фон) изображению: SSIM не ниже заданного порога. Плоская
+графика получает низкое качество и маленький файл, фотографии с мелкими
+деталями - высокое.
+
+Сходство вычисляется векторно в NumPy по яркости, уменьшенной до
+SCORE_SIZE пикселей по большей стороне, поэтому одна оценка занимает
+миллисекунды; пробные кодирования выполняются в памяти. NumPy -
+необязательная зависимость, нужная только для этого режима.
+"""
+
+import io
+
+from PIL import Image
+
+from .imaging import open_image
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Размер большей стороны плоскости яркости, по которой считается SSIM
+SCORE_SIZE = 512
+# Нижняя граница поиска качества
+MIN_QUALITY = 20
+# Размер окна усреднения SSIM
+WINDOW = 7
+# Константы SSIM для 8-битных значений (Wang et al., 2004)
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+
+def numpy_available():
+    """Проверяет, установлен ли NumPy."""
+    return np is not None
+
+
+def _require_numpy():
+    """Сообщает о необходимости NumPy для автоматического качества."""
+    if np is None:
+        raise RuntimeError("Для автоматического подбора качества нужен NumPy: pip install numpy")
+
+
+def luma_plane(img, size=SCORE_SIZE):
+    """
+    Возвращает яркость изображения, уменьшенную до size пикселей по большей стороне.
+
+    Returns:
+        массив float64 формы (высота, ширина)
+    """
+    _require_numpy()
+    luma = img.convert('L')
+    scale = max(luma.width, luma.height) / size
+    if scale > 1:
+        luma = luma.resize((max(1, round(luma.width / scale)), max(1, round(luma.height / scale))),
+                           Image.Resampling.BOX)
+    return np.asarray(luma, dtype=np.float64)
+
+
+def _decoded_plane(data):
+    """
+    Декодирует пробный JPG в плоскость яркости того же размера, что и у эталона.
+
+    draft('L') заставляет libjpeg декодировать только яркость, без
+    преобразования цвета. Масштаб декодирования не уменьшается: DCT-
+    масштабирование усредняет иначе, чем уменьшение эталона, и занижало
+    бы оценку на изображениях с мелкими деталями.
+    """
+    with open_image(io.BytesIO(data)) as decoded:
+        decoded.draft('L', decoded.size)
+        return luma_plane(decoded)
+
+
+def _box_mean(values, window):
+    """Среднее по окну window x window для каждой позиции (через интегральное изображение)."""
+    integral = np.pad(values, ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    total = (integral[window:, window:] - integral[:-window, window:]
+             - integral[window:, :-window] + integral[:-window, :-window])
+    return total / (window * window)
+
+
+def ssim(reference, candidate, window=WINDOW):
+    """
+    Вычисляет средний SSIM двух плоскостей яркости одинакового размера.
+
+    Returns:
+        число от -1 до 1 (1 - изображения совпадают)
+    """
+    _require_numpy()
+    window = min(window, *reference.shape)
+    mean_x = _box_mean(reference, window)
+    mean_y = _box_mean(candidate, window)
+    var_x = _box_mean(reference * reference, window) - mean_x * mean_x
+    var_y = _box_mean(candidate * candidate, window) - mean_y * mean_y
+    covariance = _box_mean(reference * candidate, window) - mean_x * mean_y
+    numerator = (2 * mean_x * mean_y + _C1) * (2 * covariance + _C2)
+    denominator = (mean_x * mean_x + mean_y * mean_y + _C1) * (var_x + var_y + _C2)
+    return float((numerator / denominator).mean())
+
+
+def encode_jpeg_to_ssim(img, options, target, quality, encode):
+    """
+    Подбирает наименьшее качество, при котором SSIM JPG не ниже target.
+
+    Поиск двоичный в диапазоне MIN_QUALITY..quality; сходство с ростом
+    качества почти монотонно. Если даже quality не достигает порога,
+    возвращается JPG с качеством quality.
+
+    Args:
+        img: подготовленное RGB изображение
+        options: экземпляр ConversionOptions
+        target: порог SSIM (например, 0.95)
+        quality: верхняя граница качества
+        encode: функция encode(img, options, quality) -> байты JPG
+
+    Returns:
+        кортеж (байты JPG, выбранное качество, число кодирований)
+    """
+    reference = luma_plane(img)
+    attempts = 0
+    best_data, best_quality = None, None
+    # Нижняя граница профиля кодировщика (archival) соблюдается и здесь
+    low, high = min(max(MIN_QUALITY, options.encoder().min_quality), quality), quality
+    while low <= high:
+        middle = (low + high) // 2
+        candidate = encode(img, options, middle)
+        attempts += 1
+        score = ssim(reference, _decoded_plane(candidate))
+        if score >= target:
+            best_data, best_quality = candidate, middle
+            high = middle - 1
+        else:
+            low = middle + 1
+    if best_data is None:
+        best_data, best_quality = encode(img, options, quality), quality
+        attempts += 1
+    return best_data, best_quality, attempts
@@ -0,0 +1,74 @@
+"""
+Потоковый поиск изображений во входной папке.
+
+Поиск построен на os.scandir и выдает файлы по одному, поэтому
+преобразование начинается до окончания обхода, а память не зависит
+от количества файлов в дереве.
+"""
+
+import os
+
+from .options import SUPPORTED_EXTENSIONS
+
+
+def scan_images(input_dir, extensions=SUPPORTED_EXTENSIONS, recursive=False, exclude=(), errors=None):
+    """
+    Обходит папку и выдает пути к поддерживаемым изображениям.
+
+    Args:
+        input_dir: корневая папка поиска
+        extensions: допустимые расширения файлов (в нижнем регистре)
+        recursive: обходить ли вложенные папки
+        exclude: папки, которые не нужно обходить (например, выходная директория)
+        errors: список, в который добавляются пары (папка, текст ошибки) для
+            папок, которые не удалось прочитать (None - такие папки пропускаются)
+
+    Yields:
+        пути к файлам изображений
+    """
+    extensions = tuple(extensions)
+    excluded = {os.path.realpath(path) for path in exclude if path}
+    stack = [input_dir]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                subdirectories = []
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive and os.path.realpath(entry.path) not in excluded:
+                                subdirectories.append(entry.path)
+                        elif entry.name.lower().endswith(extensions) and entry.is_file():
+                            yield entry.path
+                    except OSError:
+                        continue
+        except OSError as e:
+            if errors is not None:
+                errors.append((directory, str(e)))
+            continue
+        # Обратный порядок сохраняет естественную последовательность обхода через стек
+        stack.extend(reversed(subdirectories))
+
+
+def iter_jobs(input_dir, output_dir, extensions=SUPPORTED_EXTENSIONS, recursive=False, planner=None, errors=None):
+    """
+    Выдает задания на преобразование по мере обхода входной папки.
+
+    Структура вложенных папок повторяется в выходной директории.
+
+    Args:
+        planner: OutputPlanner, выдающий имена выходных файлов; по умолчанию
+            исходное имя с расширением .jpg
+        errors: список для папок, которые не удалось прочитать (см. scan_images)
+
+    Yields:
+        пары (путь к исходному файлу, путь к JPG)
+    """
+    for source_path in scan_images(input_dir, extensions, recursive, exclude=(output_dir,), errors=errors):
+        relative_dir = os.path.dirname(os.path.relpath(source_path, input_dir))
+        if planner is not None:
+            yield source_path, planner.output_path(source_path, relative_dir)
+        else:
+            base_name = os.path.splitext(os.path.basename(source_path))[0]
+            yield source_path, os.path.join(output_dir, relative_dir, f"{base_name}.jpg")
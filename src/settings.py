@@ -0,0 +1,184 @@
+"""
+Хранилище настроек приложения.
+
+Настройки читаются с диска один раз и дальше живут в памяти. Изменения
+помечают хранилище как измененное, а запись на диск откладывается на
+DEBOUNCE_SECONDS: серия изменений подряд (например, ввод "1920" по одной
+цифре) дает одну запись. Файл записывается атомарно через временный файл.
+
+Файл настроек хранится в папке конфигурации пользователя, а не в текущей
+рабочей папке; config/settings.json из дистрибутива служит значениями по
+умолчанию при первом запуске.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+
+
+# Имя папки приложения в каталоге конфигурации пользователя
+APP_NAME = "png-to-jpg-converter"
+SETTINGS_FILE = "settings.json"
+# Переменная окружения для переопределения папки конфигурации
+CONFIG_DIR_ENV = "PNG_TO_JPG_CONFIG_DIR"
+# Настройки по умолчанию, поставляемые вместе с программой (не зависят от рабочей папки)
+BUNDLED_SETTINGS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     "config", SETTINGS_FILE)
+
+
+def user_config_dir():
+    """
+    Возвращает папку конфигурации пользователя.
+
+    Linux: $XDG_CONFIG_HOME/png-to-jpg-converter (по умолчанию ~/.config/...),
+    macOS: ~/Library/Application Support/png-to-jpg-converter,
+    Windows: %APPDATA%\\png-to-jpg-converter.
+    """
+    override = os.environ.get(CONFIG_DIR_ENV)
+    if override:
+        return override
+    if sys.platform.startswith("win"):
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return os.path.join(base, APP_NAME)
+
+
+def user_settings_path():
+    """Возвращает путь к файлу настроек пользователя."""
+    return os.path.join(user_config_dir(), SETTINGS_FILE)
+
+
+def _read_json(path, errors=None):
+    """
+    Читает словарь из JSON; отсутствующий или поврежденный файл дает пустой словарь.
+
+    Args:
+        errors: список, в который добавляется описание ошибки чтения поврежденного файла
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        if errors is not None:
+            errors.append(f"Ошибка при загрузке настроек {path}: {e}")
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+class SettingsStore:
+    """
+    Кеш настроек в памяти с отслеживанием изменений и отложенной атомарной записью.
+    """
+
+    # Задержка записи после последнего изменения (секунды)
+    DEBOUNCE_SECONDS = 0.5
+
+    def __init__(self, path=None, defaults_path=BUNDLED_SETTINGS_PATH):
+        """
+        Args:
+            path: файл настроек (по умолчанию - в папке конфигурации пользователя)
+            defaults_path: файл значений по умолчанию для ключей, которых нет в path
+        """
+        self.path = path or user_settings_path()
+        # Описания ошибок чтения поврежденных файлов настроек (их значения не используются)
+        self.load_errors = []
+        self._values = _read_json(defaults_path, self.load_errors) if defaults_path else {}
+        self._values.update(_read_json(self.path, self.load_errors))
+        self._dirty = False
+        # Сколько раз файл был записан (для диагностики и тестов)
+        self.writes = 0
+        # Причина последней неудачной записи (None - последняя запись удалась)
+        self.save_error = None
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def get(self, key, default=None):
+        """Возвращает значение настройки."""
+        with self._lock:
+            return self._values.get(key, default)
+
+    def as_dict(self):
+        """Возвращает копию всех настроек."""
+        with self._lock:
+            return dict(self._values)
+
+    @property
+    def dirty(self):
+        """Есть ли изменения, еще не записанные на диск."""
+        return self._dirty
+
+    def update(self, values):
+        """
+        Обновляет настройки и планирует запись, если что-то изменилось.
+
+        Returns:
+            True, если значения изменились
+        """
+        with self._lock:
+            changed = {key: value for key, value in values.items() if self._values.get(key, object()) != value}
+            if not changed:
+                return False
+            self._values.update(changed)
+            self._dirty = True
+            self._schedule()
+        return True
+
+    def set(self, key, value):
+        """Изменяет одну настройку (см. update)."""
+        return self.update({key: value})
+
+    def _schedule(self):
+        """Перезапускает таймер отложенной записи (вызывается под блокировкой)."""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.DEBOUNCE_SECONDS, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """Записывает настройки на диск, если есть изменения."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return False
+            data = json.dumps(self._values, indent=2, ensure_ascii=False)
+            self._dirty = False
+            try:
+                self._write(data)
+            except OSError as e:
+                # Изменения остаются в памяти и будут записаны при следующей попытке
+                self._dirty = True
+                self.save_error = f"Ошибка при сохранении настроек: {e}"
+                return False
+            self.save_error = None
+            self.writes += 1
+            return True
+
+    def _write(self, data):
+        """Атомарно заменяет файл настроек."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".settings.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def close(self):
+        """Записывает несохраненные изменения (вызывается при выходе из приложения)."""
+        self.flush()
@@ -0,0 +1,316 @@
+"""
+Наблюдение за входной папкой и преобразование новых файлов без участия пользователя.
+
+На Linux изменения отслеживаются через inotify (через ctypes, без
+дополнительных зависимостей), в остальных системах и при недоступности
+inotify - периодическим опросом папки. События объединяются: файл
+преобразуется, когда в течение интервала debounce по нему не было событий
+и его размер и время изменения перестали меняться (копирование завершено).
+Модуль не импортирует tkinter и работает без окна.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+from .options import SUPPORTED_EXTENSIONS
+from .scanner import scan_images
+
+
+def _file_signature(path):
+    """Возвращает (размер, время изменения) файла или None, если файла нет."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class PollingSource:
+    """
+    Источник изменений, периодически сравнивающий снимки папки.
+    """
+
+    def __init__(self, input_dir, extensions=SUPPORTED_EXTENSIONS, recursive=False, exclude=(), interval=0.5):
+        """
+        Args:
+            interval: период опроса в секундах
+        """
+        self.input_dir = input_dir
+        self.extensions = extensions
+        self.recursive = recursive
+        self.exclude = exclude
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        """Снимок папки: путь -> (размер, время изменения)."""
+        snapshot = {}
+        for path in scan_images(self.input_dir, self.extensions, self.recursive, self.exclude):
+            signature = _file_signature(path)
+            if signature is not None:
+                snapshot[path] = signature
+        return snapshot
+
+    def poll(self, timeout):
+        """Ждет не дольше timeout секунд и возвращает множество измененных путей."""
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        changed = {path for path, signature in snapshot.items() if self._snapshot.get(path) != signature}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        """Источник опроса не держит ресурсов."""
+
+
+class InotifySource:
+    """
+    Источник изменений на основе inotify (только Linux).
+
+    Для рекурсивного наблюдения каждая вложенная папка получает свой watch;
+    новые папки добавляются по мере появления.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+    _EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, input_dir, extensions=SUPPORTED_EXTENSIONS, recursive=False, exclude=()):
+        """
+        Raises:
+            OSError: если inotify недоступен
+        """
+        library = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify недоступен")
+        self._libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+
+        self.input_dir = input_dir
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.recursive = recursive
+        self.exclude = exclude
+        self._excluded = {os.path.realpath(path) for path in exclude if path}
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self._directories = {}
+        try:
+            self._add_tree(input_dir)
+        except OSError:
+            # Например, исчерпан лимит fs.inotify.max_user_watches
+            self.close()
+            raise
+
+    def _add_watch(self, directory):
+        """Добавляет наблюдение за одной папкой."""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), directory)
+        self._directories[wd] = directory
+
+    def _add_tree(self, directory):
+        """Добавляет наблюдение за папкой и (при рекурсивном режиме) ее подпапками."""
+        self._add_watch(directory)
+        if not self.recursive:
+            return
+        for root, subdirectories, _ in os.walk(directory):
+            subdirectories[:] = [
+                name for name in subdirectories
+                if os.path.realpath(os.path.join(root, name)) not in self._excluded
+            ]
+            for name in subdirectories:
+                self._add_watch(os.path.join(root, name))
+
+    def _wanted(self, path):
+        """Проверяет, относится ли путь к поддерживаемым изображениям."""
+        return path.lower().endswith(self.extensions)
+
+    def poll(self, timeout):
+        """Ждет не дольше timeout секунд и возвращает множество измененных путей."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset + self._EVENT_HEADER.size <= len(buffer):
+            wd, mask, _, length = self._EVENT_HEADER.unpack_from(buffer, offset)
+            offset += self._EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & self.IN_Q_OVERFLOW:
+                # Очередь ядра переполнена: события потеряны, сообщаем о всех файлах
+                changed.update(scan_images(self.input_dir, self.extensions, self.recursive, self.exclude))
+                continue
+            directory = self._directories.get(wd)
+            if directory is None:
+                continue
+            if mask & self.IN_DELETE_SELF:
+                del self._directories[wd]
+                continue
+            path = os.path.join(directory, name)
+            if mask & self.IN_ISDIR:
+                if self.recursive and mask & (self.IN_CREATE | self.IN_MOVED_TO) \
+                        and os.path.realpath(path) not in self._excluded:
+                    # Файлы могли появиться в новой папке до того, как за ней начато наблюдение
+                    self._add_tree(path)
+                    changed.update(scan_images(path, self.extensions, True, self.exclude))
+                continue
+            if self._wanted(path):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        """Закрывает дескриптор inotify."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_source(input_dir, extensions=SUPPORTED_EXTENSIONS, recursive=False, exclude=(), polling=False):
+    """
+    Создает источник изменений: inotify, если он доступен, иначе опрос.
+
+    Args:
+        polling: всегда использовать опрос (например, для сетевых папок,
+            изменения в которых inotify не видит)
+    """
+    if not polling:
+        try:
+            return InotifySource(input_dir, extensions, recursive, exclude)
+        except (OSError, AttributeError):
+            pass
+    return PollingSource(input_dir, extensions, recursive, exclude)
+
+
+class FolderWatcher:
+    """
+    Объединяет события файловой системы в пакеты готовых к преобразованию файлов.
+
+    Файл считается готовым, если с последнего события прошло не меньше
+    debounce секунд и за это время его размер и время изменения не менялись.
+    """
+
+    # Как долго ждать событий, если ожидающих файлов нет (секунды)
+    IDLE_TIMEOUT = 1.0
+
+    def __init__(self, source, debounce=0.3):
+        """
+        Args:
+            source: источник изменений (InotifySource или PollingSource)
+            debounce: интервал тишины в секундах, после которого файл проверяется
+        """
+        self.source = source
+        self.debounce = debounce
+        # Путь -> (подпись файла, время последнего изменения)
+        self._pending = {}
+
+    def add(self, paths):
+        """Добавляет пути в число ожидающих (например, файлы, найденные при запуске)."""
+        now = time.monotonic()
+        for path in paths:
+            signature = _file_signature(path)
+            if signature is None:
+                self._pending.pop(path, None)
+            else:
+                self._pending[path] = (signature, now)
+
+    def next_batch(self):
+        """
+        Дожидается событий и возвращает список файлов, копирование которых завершено.
+
+        Возвращает пустой список, если за время ожидания ни один файл не стал
+        готовым; вызывающий код может в этот момент проверить условие остановки.
+        """
+        timeout = self.IDLE_TIMEOUT
+        if self._pending:
+            oldest = min(changed_at for _, changed_at in self._pending.values())
+            timeout = max(oldest + self.debounce - time.monotonic(), 0.0)
+        self.add(self.source.poll(timeout))
+
+        ready = []
+        now = time.monotonic()
+        for path, (signature, changed_at) in list(self._pending.items()):
+            if now - changed_at < self.debounce:
+                continue
+            current = _file_signature(path)
+            if current is None:
+                del self._pending[path]
+            elif current != signature:
+                # Файл еще растет: ждем следующего интервала тишины
+                self._pending[path] = (current, now)
+            else:
+                del self._pending[path]
+                ready.append(path)
+        return sorted(ready)
+
+    def close(self):
+        """Останавливает наблюдение."""
+        self.source.close()
+
+
+def watch_folder(input_dir, output_dir, engine, options, planner, manifest, recursive=False, polling=False,
+                 debounce=0.3, stop_event=None, on_result=None, dedupe=None):
+    """
+    Наблюдает за папкой и преобразует новые и измененные файлы, пока не установлен stop_event.
+
+    При запуске проверяются все файлы папки; неизмененные пропускаются по
+    манифесту. Пулы движка запускаются заранее и работают все время
+    наблюдения, поэтому каждый новый файл сразу поступает в обработку.
+
+    Args:
+        input_dir: наблюдаемая папка
+        output_dir: выходная директория (не наблюдается, если находится внутри input_dir)
+        engine: ConversionEngine
+        options: экземпляр ConversionOptions
+        planner: OutputPlanner, выдающий пути выходных файлов
+        manifest: ConversionManifest для пропуска неизмененных файлов
+        recursive: наблюдать ли за вложенными папками
+        polling: использовать опрос вместо inotify
+        debounce: интервал тишины перед преобразованием файла (секунды)
+        stop_event: threading.Event, останавливающий наблюдение
+        on_result: функция, вызываемая для каждого ConversionResult
+        dedupe: режим преобразования одинаковых файлов одного пакета (см. ConversionEngine.run)
+    """
+    exclude = (output_dir,)
+    source = create_source(input_dir, recursive=recursive, exclude=exclude, polling=polling)
+    watcher = FolderWatcher(source, debounce)
+    # Файлы, уже лежащие в папке, проходят ту же проверку завершения копирования
+    watcher.add(scan_images(input_dir, SUPPORTED_EXTENSIONS, recursive, exclude))
+    try:
+        with engine:
+            batch = []
+            while stop_event is None or not stop_event.is_set():
+                if batch:
+                    jobs = [
+                        (path, planner.output_path(path, os.path.dirname(os.path.relpath(path, input_dir))))
+                        for path in batch
+                    ]
+                    for result in engine.run(jobs, options, manifest, dedupe=dedupe):
+                        if on_result is not None:
+                            on_result(result)
+                batch = watcher.next_batch()
+    finally:
+        watcher.close()
@@ -44,10 +44,13 @@ def test_settings_functionality():
     
     # Сохраняем настройки
     converter.save_settings()
-    print(f"\nНастройки сохранены в config/settings.json")
+    # Запись на диск отложена хранилищем настроек; записываем сразу
+    converter.settings_store.flush()
+    settings_path = converter.settings_store.path
+    print(f"\nНастройки сохранены в {settings_path}")
     
     # Проверяем содержимое файла настроек
-    with open("config/settings.json", 'r', encoding='utf-8') as f:
+    with open(settings_path, 'r', encoding='utf-8') as f:
         settings = json.load(f)
     
     print(f"\nСодержимое файла настроек:")
@@ -104,7 +107,7 @@ def test_settings_functionality():
     if "last_resolution_preset" in settings:
         original_settings["last_resolution_preset"] = "Без изменения"
     
-    with open("config/settings.json", 'w', encoding='utf-8') as f:
+    with open(settings_path, 'w', encoding='utf-8') as f:
         json.dump(original_settings, f, indent=2, ensure_ascii=False)
     
     print("Файл настроек восстановлен до первоначального состояния.")
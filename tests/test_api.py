@@ -0,0 +1,146 @@
+"""
+Модульные тесты для программного интерфейса без графического интерфейса.
+
+Тесты не создают окно Tk и выполняются без дисплея.
+"""
+
+import unittest
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from PIL import Image
+from src.api import ConversionOptions, ImageResult, Rendition, convert_image, convert_many
+
+
+def _png_bytes(size=(100, 100), color='red', mode='RGB'):
+    """Создает PNG в памяти."""
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class TestConvertImage(unittest.TestCase):
+    """
+    Тестовые случаи для convert_image.
+    """
+
+    def setUp(self):
+        """Создание временной папки с PNG файлом."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_png_path = os.path.join(self.temp_dir, "test.png")
+        Image.new('RGB', (100, 100), color='red').save(self.test_png_path, "PNG")
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_convert_png_to_jpg(self):
+        """Тест преобразования из PNG в JPG по пути, из байтов и из файлового объекта."""
+        with open(self.test_png_path, 'rb') as f:
+            sources = [self.test_png_path, f.read()]
+        with open(self.test_png_path, 'rb') as f:
+            sources.append(f)
+            for source in sources:
+                data = convert_image(source, ConversionOptions(quality=95))
+                with Image.open(io.BytesIO(data)) as jpg_img:
+                    self.assertEqual(jpg_img.format, "JPEG")
+                    self.assertEqual(jpg_img.size, (100, 100))
+        # Выходная папка не используется
+        self.assertEqual(os.listdir(self.temp_dir), ["test.png"])
+
+    def test_options_are_applied(self):
+        """Тест изменения размера и наложения прозрачности на фон."""
+        options = ConversionOptions(target_width=50, target_height=0, background_color=(0, 0, 255))
+        data = convert_image(_png_bytes((100, 80), (0, 0, 0, 0), 'RGBA'), options)
+        with Image.open(io.BytesIO(data)) as img:
+            self.assertEqual(img.size, (50, 40))
+            self.assertGreater(img.getpixel((25, 20))[2], 200)
+
+    def test_options_are_frozen(self):
+        """Тест неизменяемости параметров, общих с графическим интерфейсом."""
+        options = ConversionOptions()
+        with self.assertRaises(AttributeError):
+            options.quality = 10
+
+    def test_errors(self):
+        """Тест ошибок для неверного источника, параметров и нескольких выходов."""
+        with self.assertRaises(TypeError):
+            convert_image(123)
+        with self.assertRaises(TypeError):
+            convert_image(_png_bytes(), {"quality": 80})
+        with self.assertRaises(OSError):
+            convert_image(b"not an image")
+        renditions = ConversionOptions(renditions=(Rendition("thumb", 20, 0), Rendition("full")))
+        with self.assertRaises(ValueError):
+            convert_image(_png_bytes(), renditions)
+
+    def test_import_without_tkinter(self):
+        """Импорт программного интерфейса не загружает tkinter."""
+        code = "import sys; import src.api; print('tkinter' in sys.modules)"
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, "-c", code], cwd=project_root,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+class TestConvertMany(unittest.TestCase):
+    """
+    Тестовые случаи для convert_many.
+    """
+
+    def _check(self, results, count):
+        """Проверяет, что все результаты успешны и покрывают все индексы."""
+        self.assertEqual(sorted(result.index for result in results), list(range(count)))
+        for result in results:
+            self.assertIsInstance(result, ImageResult)
+            self.assertTrue(result.ok, result.error)
+            self.assertGreater(result.size_in, 0)
+            self.assertEqual(result.size_out, len(result.data))
+            self.assertIn("encode", result.stats.stages)
+            self.assertGreater(result.seconds, 0)
+
+    def test_in_process(self):
+        """Тест последовательного преобразования без пула процессов."""
+        sources = [_png_bytes(color=color) for color in ('red', 'green', 'blue')]
+        results = list(convert_many(sources, ConversionOptions(quality=80), workers=1))
+        self._check(results, 3)
+
+    def test_parallel_from_generator(self):
+        """Тест параллельного преобразования из генератора с ошибкой одного изображения."""
+        def sources():
+            for i in range(10):
+                yield _png_bytes((40 + i, 30))
+            yield b"broken"
+
+        results = list(convert_many(sources(), ConversionOptions(quality=80), workers=2))
+        failed = [result for result in results if not result.ok]
+        self.assertEqual([result.index for result in failed], [10])
+        self._check([result for result in results if result.ok], 10)
+        for result in results[:-1]:
+            if result.ok:
+                with Image.open(io.BytesIO(result.data)) as img:
+                    self.assertEqual(img.size, (40 + result.index, 30))
+
+    def test_renditions_and_names(self):
+        """Тест нескольких выходов и их имен для исходного файла."""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "photo.png")
+            Image.new('RGB', (100, 50)).save(path)
+            options = ConversionOptions(renditions=(Rendition("thumb", 20, 0), Rendition("full")),
+                                        rendition_layout="suffix")
+            result, = convert_many([path], options, workers=1)
+            self.assertEqual(result.source, path)
+            outputs = dict(result.outputs)
+            self.assertEqual(set(outputs), {"photo_thumb.jpg", "photo_full.jpg"})
+            with Image.open(io.BytesIO(outputs["photo_thumb.jpg"])) as img:
+                self.assertEqual(img.size, (20, 10))
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
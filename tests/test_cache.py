@@ -0,0 +1,129 @@
+"""
+Модульные тесты для кеша результатов преобразования.
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+from PIL import Image
+from src.cache import ResultCache
+from src.cli import main
+from src.engine import ConversionEngine
+from src.options import ConversionOptions, Rendition
+
+
+class TestResultCache(unittest.TestCase):
+    """
+    Тестовые случаи для кеша с адресацией по содержимому.
+    """
+
+    def setUp(self):
+        """Создание исходных изображений и папки кеша."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.temp_dir, "in")
+        os.makedirs(self.input_dir)
+        Image.new('RGB', (300, 200), 'red').save(os.path.join(self.input_dir, "a.png"))
+        Image.new('RGB', (300, 200), 'blue').save(os.path.join(self.input_dir, "b.png"))
+        self.cache_dir = os.path.join(self.temp_dir, "cache")
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def _run(self, output_dir, options, cache):
+        """Преобразует входную папку в output_dir и возвращает результаты."""
+        os.makedirs(output_dir, exist_ok=True)
+        jobs = [(os.path.join(self.input_dir, name), os.path.join(output_dir, name[:-4] + ".jpg"))
+                for name in sorted(os.listdir(self.input_dir))]
+        engine = ConversionEngine(max_workers=1, cache=cache)
+        results = list(engine.run(jobs, options))
+        self.assertTrue(all(result.ok for result in results))
+        return results, engine.summary
+
+    def test_hit_in_another_output_folder(self):
+        """Тест, что повторное преобразование в другую папку берется из кеша."""
+        cache = ResultCache(self.cache_dir)
+        options = ConversionOptions(quality=80, target_width=150)
+        first, summary = self._run(os.path.join(self.temp_dir, "campaign1"), options, cache)
+        self.assertFalse(any(result.cached for result in first))
+        self.assertEqual(summary.cache_hits, 0)
+
+        second, summary = self._run(os.path.join(self.temp_dir, "campaign2"), options, ResultCache(self.cache_dir))
+        self.assertTrue(all(result.cached for result in second))
+        self.assertEqual(summary.cache_hits, 2)
+        for name in ("a.jpg", "b.jpg"):
+            with open(os.path.join(self.temp_dir, "campaign1", name), 'rb') as f1, \
+                    open(os.path.join(self.temp_dir, "campaign2", name), 'rb') as f2:
+                self.assertEqual(f1.read(), f2.read())
+
+    def test_options_change_misses(self):
+        """Тест, что другие параметры преобразования дают другой ключ."""
+        cache = ResultCache(self.cache_dir)
+        self._run(os.path.join(self.temp_dir, "out1"), ConversionOptions(quality=80), cache)
+        results, _ = self._run(os.path.join(self.temp_dir, "out2"),
+                               ConversionOptions(quality=80, encoder_profile="fast"), cache)
+        self.assertFalse(any(result.cached for result in results))
+
+    def test_renditions_are_restored_under_new_names(self):
+        """Тест восстановления всех вариантов размера по путям нового задания."""
+        cache = ResultCache(self.cache_dir)
+        options = ConversionOptions(renditions=(Rendition("thumb", 30, 0), Rendition("full")),
+                                    rendition_layout="suffix")
+        source = os.path.join(self.input_dir, "a.png")
+        engine = ConversionEngine(max_workers=1, cache=cache)
+        list(engine.run([(source, os.path.join(self.temp_dir, "first.jpg"))], options))
+        result, = engine.run([(source, os.path.join(self.temp_dir, "second.jpg"))], options)
+
+        self.assertTrue(result.cached)
+        self.assertEqual(set(result.written), {os.path.join(self.temp_dir, "second_thumb.jpg"),
+                                               os.path.join(self.temp_dir, "second_full.jpg")})
+        with Image.open(os.path.join(self.temp_dir, "second_thumb.jpg")) as img:
+            self.assertEqual(img.size, (30, 20))
+
+    def test_lru_eviction(self):
+        """Тест вытеснения записи, которая дольше всего не использовалась."""
+        options = ConversionOptions()
+        cache = ResultCache(self.cache_dir)
+        output = os.path.join(self.temp_dir, "x.jpg")
+        cache.store("aa" + "0" * 38, [(output, b"x" * 1000)], output, options)
+        time.sleep(0.01)
+        cache.store("bb" + "0" * 38, [(output, b"y" * 1000)], output, options)
+        time.sleep(0.01)
+        self.assertIsNotNone(cache.restore("aa" + "0" * 38, output, options))
+
+        cache.max_bytes = cache.size + 500
+        cache.store("cc" + "0" * 38, [(output, b"z" * 1000)], output, options)
+
+        self.assertLessEqual(cache.size, cache.max_bytes)
+        self.assertIsNone(cache.restore("bb" + "0" * 38, output, options))
+        self.assertIsNotNone(cache.restore("aa" + "0" * 38, output, options))
+        self.assertIsNotNone(cache.restore("cc" + "0" * 38, output, options))
+        # Размер восстанавливается по папке кеша в новом экземпляре
+        self.assertEqual(ResultCache(self.cache_dir).size, cache.size)
+
+    def test_store_error_is_reported_in_result(self):
+        """Тест, что ошибка сохранения в кеше сообщается в результате, а JPG записываются."""
+        cache = ResultCache(self.cache_dir)
+        output_dir = os.path.join(self.temp_dir, "out")
+        with mock.patch.object(ResultCache, "store", side_effect=OSError("диск заполнен")):
+            results, summary = self._run(output_dir, ConversionOptions(), cache)
+        for result in results:
+            self.assertIn("диск заполнен", result.cache_error)
+            self.assertTrue(os.path.exists(result.output_path))
+        self.assertEqual(summary.cache_errors, 2)
+
+    def test_cli_cache(self):
+        """Тест параметров --cache-mb и --cache-dir."""
+        for output in ("out1", "out2"):
+            code = main(["convert", self.input_dir, os.path.join(self.temp_dir, output),
+                         "--cache-mb", "10", "--cache-dir", self.cache_dir, "-q"])
+            self.assertEqual(code, 0)
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, "out2", "b.jpg")))
+        self.assertGreater(ResultCache(self.cache_dir).size, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
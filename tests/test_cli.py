@@ -0,0 +1,92 @@
+"""
+Модульные тесты для консольного интерфейса конвертера.
+"""
+
+import unittest
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from PIL import Image
+from src.cli import main
+from src.options import parse_reducing_gap
+
+
+class TestCommandLine(unittest.TestCase):
+    """
+    Тестовые случаи для команды convert.
+    """
+
+    def setUp(self):
+        """Создание входной папки с тестовыми изображениями."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.temp_dir, "in")
+        self.output_dir = os.path.join(self.temp_dir, "out")
+        os.makedirs(self.input_dir)
+        Image.new('RGBA', (200, 100), color=(0, 0, 255, 128)).save(os.path.join(self.input_dir, "a.png"))
+        Image.new('RGB', (200, 100), color='green').save(os.path.join(self.input_dir, "b.bmp"))
+        with open(os.path.join(self.input_dir, "notes.txt"), "w") as f:
+            f.write("не изображение")
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_convert_command(self):
+        """Тест преобразования папки из командной строки."""
+        code = main(["convert", self.input_dir, self.output_dir,
+                     "--quality", "80", "--width", "100", "--workers", "2", "-q"])
+
+        self.assertEqual(code, 0)
+        output_files = sorted(f for f in os.listdir(self.output_dir) if f.endswith(".jpg"))
+        self.assertEqual(output_files, ["a.jpg", "b.jpg"])
+        with Image.open(os.path.join(self.output_dir, "a.jpg")) as img:
+            self.assertEqual(img.size, (100, 50))
+
+    def test_missing_input_directory(self):
+        """Тест кода ошибки при отсутствии входной папки."""
+        code = main(["convert", os.path.join(self.temp_dir, "missing"), self.output_dir])
+        self.assertEqual(code, 2)
+
+    def test_invalid_reducing_gap_is_rejected(self):
+        """Тест, что запас уменьшения между 0 и 1 и отрицательный отвергаются при разборе аргументов."""
+        for value in ("0.5", "-1", "abc"):
+            with self.subTest(value=value), contextlib.redirect_stderr(io.StringIO()):
+                with self.assertRaises(SystemExit) as raised:
+                    main(["convert", self.input_dir, self.output_dir, "--reducing-gap", value])
+                self.assertEqual(raised.exception.code, 2)
+        self.assertFalse(os.path.exists(self.output_dir))
+
+        self.assertEqual(parse_reducing_gap(0), 0.0)
+        self.assertEqual(parse_reducing_gap(None), 0.0)
+        self.assertEqual(parse_reducing_gap("1.0"), 1.0)
+        for value in (0.99, -2, float("nan"), float("inf"), True, "x"):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                parse_reducing_gap(value)
+
+        code = main(["convert", self.input_dir, self.output_dir, "--width", "100", "--reducing-gap", "1",
+                     "--workers", "1", "-q"])
+        self.assertEqual(code, 0)
+
+    def test_cli_does_not_import_tkinter(self):
+        """Тест, что консольный режим не загружает графические модули."""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = "import sys, src.cli; print('tkinter' in sys.modules or 'ttkthemes' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+
+    def test_cli_does_not_import_numpy(self):
+        """Тест, что NumPy не загружается при запуске: он нужен только режиму --target-ssim."""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = "import sys, src.cli; print('numpy' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,15 +1,31 @@
 """
-Модульные тесты для функциональности конвертера PNG в JPG.
+Модульные тесты для окна конвертера PNG в JPG.
+
+Тестам окна нужен дисплей; без него они пропускаются. Разбор событий
+потока преобразования проверяется без окна, само преобразование - в test_api.
 """
 
 import unittest
 import os
+import queue
 import tempfile
+from unittest import mock
 from PIL import Image
 import tkinter as tk
 from src.converter import PNGtoJPGConverter
 
 
+def _display_available():
+    """Проверяет, можно ли создать окно Tk."""
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return False
+    root.destroy()
+    return True
+
+
+@unittest.skipUnless(_display_available(), "нет дисплея для Tk")
 class TestPNGtoJPGConverter(unittest.TestCase):
     """
     Тестовые случаи для конвертера PNG в JPG.
@@ -64,46 +80,66 @@ class TestPNGtoJPGConverter(unittest.TestCase):
         """Тест правильной установки выходной директории."""
         self.assertEqual(self.converter.output_dir, self.temp_dir)
         self.assertTrue(os.path.isdir(self.converter.output_dir))
-    
-    def test_convert_png_to_jpg(self):
-        """Тест фактического преобразования из PNG в JPG."""
-        # Выполнение преобразования
-        success_count = 0
-        for file_path in self.converter.input_files:
-            try:
-                with Image.open(file_path) as img:
-                    # Преобразование RGBA в RGB при необходимости
-                    if img.mode in ('RGBA', 'LA', 'P'):
-                        background = Image.new('RGB', img.size, (255, 25, 255))
-                        if img.mode == 'P':
-                            img = img.convert('RGBA')
-                        if img.mode in ('RGBA', 'LA'):
-                            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                        img = background
-                    
-                    # Генерация имени выходного файла
-                    base_name = os.path.splitext(os.path.basename(file_path))[0]
-                    output_path = os.path.join(self.converter.output_dir, f"{base_name}.jpg")
-                    
-                    # Сохранение в формате JPG
-                    img.save(output_path, "JPEG", quality=self.converter.quality, optimize=True)
-                
-                success_count += 1
-                
-                # Проверка существования выходного файла и его корректности в формате JPG
-                jpg_path = os.path.join(self.converter.output_dir, "test.jpg")
-                self.assertTrue(os.path.exists(jpg_path))
-                
-                # Проверка, что выходной файл является корректным изображением
-                with Image.open(jpg_path) as jpg_img:
-                    self.assertEqual(jpg_img.format, "JPEG")
-                    self.assertEqual(jpg_img.size, (100, 100))
-                
-            except Exception as e:
-                self.fail(f"Преобразование не удалось с ошибкой: {str(e)}")
-        
-        self.assertEqual(success_count, 1)
 
 
+
+class TestProgressEvents(unittest.TestCase):
+    """
+    Тестовые случаи для разбора событий потока преобразования в главном цикле.
+    """
+
+    def setUp(self):
+        """Создание окна без Tk: виджеты заменены заглушками."""
+        self.converter = PNGtoJPGConverter.__new__(PNGtoJPGConverter)
+        self.converter.root = mock.Mock()
+        self.converter.progress = {}
+        self.converter.status_var = mock.Mock()
+        for name in ("convert_button", "pause_button", "cancel_button"):
+            setattr(self.converter, name, mock.Mock())
+        self.converter.events = queue.Queue()
+        self.converter.conversion_errors = []
+        self.converter.oversized_files = []
+        self.converter.engine = None
+        self.converter.cancel_requested = False
+        self.converter.close_requested = False
+        self.converter.conversion_running = True
+        self.converter.max_image_pixels = 1000
+
+    def test_progress_events_are_coalesced(self):
+        """Тест, что за один кадр отображается только последнее состояние прогресса."""
+        for i in range(1, 101):
+            self.converter.events.put(("progress", (i / 200, f"Преобразовано: {i}.png")))
+
+        self.converter._poll_events()
+
+        self.assertEqual(self.converter.progress['value'], 50)
+        self.converter.status_var.set.assert_called_once_with("Преобразовано: 100.png")
+        self.assertTrue(self.converter.events.empty())
+        # Пока преобразование не завершено, разбор запланирован на следующий кадр
+        self.converter.root.after.assert_called_once_with(self.converter.PROGRESS_INTERVAL_MS,
+                                                          self.converter._poll_events)
+
+    def test_errors_are_reported_once_at_the_end(self):
+        """Тест, что ошибки файлов собираются и показываются одним отчетом в конце."""
+        with mock.patch("src.converter.messagebox") as messagebox:
+            for i in range(3):
+                self.converter.events.put(("error", (f"/in/bad_{i}.png", "cannot identify image file")))
+                self.converter.events.put(("progress", ((i + 1) / 4, f"Ошибка: bad_{i}.png")))
+            self.converter._poll_events()
+            messagebox.showerror.assert_not_called()
+
+            self.converter.events.put(("progress", (1.0, "Преобразовано: good.png")))
+            self.converter.events.put(("done", (1, 0, 4)))
+            self.converter._poll_events()
+
+        messagebox.showerror.assert_called_once()
+        report = messagebox.showerror.call_args[0][1]
+        self.assertIn("1/4", report)
+        self.assertEqual([line for line in report.splitlines() if line.startswith("bad_")],
+                         [f"bad_{i}.png: cannot identify image file" for i in range(3)])
+        self.assertFalse(self.converter.conversion_running)
+        # После завершения разбор больше не планируется
+        self.assertEqual(self.converter.root.after.call_count, 1)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Модульные тесты для поиска одинаковых исходных файлов.
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+from PIL import Image
+from src.cli import main
+from src.dedup import find_duplicates, link_or_copy
+from src.engine import ConversionEngine
+from src.manifest import ConversionManifest
+from src.options import ConversionOptions
+
+
+class TestDeduplication(unittest.TestCase):
+    """
+    Тестовые случаи для группировки одинаковых файлов и создания их JPG.
+    """
+
+    def setUp(self):
+        """Создание папки с копиями одного изображения и отдельным изображением."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.temp_dir, "in")
+        self.output_dir = os.path.join(self.temp_dir, "out")
+        os.makedirs(self.input_dir)
+        os.makedirs(self.output_dir)
+        original = os.path.join(self.input_dir, "a.png")
+        Image.effect_noise((200, 150), 50).save(original)
+        for name in ("a_copy.png", "export (1).png"):
+            shutil.copyfile(original, os.path.join(self.input_dir, name))
+        Image.new('RGB', (200, 150), 'green').save(os.path.join(self.input_dir, "b.png"))
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def _path(self, name):
+        """Путь к файлу во входной папке."""
+        return os.path.join(self.input_dir, name)
+
+    def test_find_duplicates(self):
+        """Тест группировки: представитель - первый файл в порядке списка."""
+        paths = [self._path(name) for name in ("b.png", "export (1).png", "a.png", "a_copy.png")]
+        self.assertEqual(find_duplicates(paths),
+                         {self._path("export (1).png"): [self._path("a.png"), self._path("a_copy.png")]})
+
+    def test_same_size_different_content(self):
+        """Тест, что файлы одного размера с разным содержимым не объединяются."""
+        first, second = self._path("x.bin"), self._path("y.bin")
+        with open(first, 'wb') as f:
+            f.write(b"\0" * 200000)
+        with open(second, 'wb') as f:
+            f.write(b"\0" * 100000 + b"\1" + b"\0" * 99999)
+        self.assertEqual(find_duplicates([first, second]), {})
+
+    def test_link_or_copy(self):
+        """Тест создания жесткой ссылки и копии."""
+        source = self._path("a.png")
+        self.assertTrue(link_or_copy(source, os.path.join(self.temp_dir, "link.png")))
+        self.assertEqual(os.stat(source).st_ino, os.stat(os.path.join(self.temp_dir, "link.png")).st_ino)
+        self.assertFalse(link_or_copy(source, os.path.join(self.temp_dir, "copy.png"), "copy"))
+        self.assertNotEqual(os.stat(source).st_ino, os.stat(os.path.join(self.temp_dir, "copy.png")).st_ino)
+
+    def test_engine_converts_group_once(self):
+        """Тест, что группа одинаковых файлов кодируется один раз и записывается в манифест."""
+        names = sorted(os.listdir(self.input_dir))
+        jobs = [(self._path(name), os.path.join(self.output_dir, name[:-4] + ".jpg")) for name in names]
+        manifest = ConversionManifest.load(self.output_dir)
+        engine = ConversionEngine(max_workers=1)
+        results = list(engine.run(jobs, ConversionOptions(quality=80), manifest, dedupe="link"))
+
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(engine.summary.converted, 4)
+        self.assertEqual(engine.summary.duplicates, 2)
+        self.assertEqual(engine.summary.duplicate_groups, 1)
+        duplicates = {os.path.basename(r.source_path): r.duplicate_of for r in results if r.duplicate_of}
+        self.assertEqual(duplicates, {"a_copy.png": self._path("a.png"), "export (1).png": self._path("a.png")})
+
+        inodes = {os.stat(os.path.join(self.output_dir, name)).st_ino
+                  for name in ("a.jpg", "a_copy.jpg", "export (1).jpg")}
+        self.assertEqual(len(inodes), 1)
+        manifest = ConversionManifest.load(self.output_dir)
+        for source, output in jobs:
+            self.assertTrue(manifest.is_up_to_date(source, output, ConversionOptions(quality=80)))
+
+    def test_cli_dedupe(self):
+        """Тест параметра --dedupe copy и итогового сообщения."""
+        code = main(["convert", self.input_dir, self.output_dir, "--dedupe", "copy", "-q"])
+        self.assertEqual(code, 0)
+        names = sorted(name for name in os.listdir(self.output_dir) if name.endswith(".jpg"))
+        self.assertEqual(names, ["a.jpg", "a_copy.jpg", "b.jpg", "export (1).jpg"])
+        with open(os.path.join(self.output_dir, "a.jpg"), 'rb') as f1, \
+                open(os.path.join(self.output_dir, "a_copy.jpg"), 'rb') as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
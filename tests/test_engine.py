@@ -0,0 +1,211 @@
+"""
+Модульные тесты для параллельного движка конвертации.
+"""
+
+import unittest
+import os
+import shutil
+import signal
+import stat
+import subprocess
+import sys
+import tempfile
+from PIL import Image
+from src.engine import ConversionEngine, resolve_worker_count
+from src.imaging import calculate_target_size, write_output
+from src.options import ConversionOptions
+
+
+class TestConversionEngine(unittest.TestCase):
+    """
+    Тестовые случаи для ConversionEngine.
+    """
+
+    def setUp(self):
+        """Создание набора тестовых изображений."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.temp_dir, "out")
+        os.makedirs(self.output_dir)
+        self.jobs = []
+        for i, mode in enumerate(['RGB', 'RGBA', 'P', 'LA']):
+            path = os.path.join(self.temp_dir, f"image_{i}.png")
+            Image.new(mode, (120, 80)).save(path, "PNG")
+            self.jobs.append((path, os.path.join(self.output_dir, f"image_{i}.jpg")))
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_resolve_worker_count(self):
+        """Тест выбора числа процессов из настроек или по числу процессоров."""
+        self.assertEqual(resolve_worker_count(4), 4)
+        self.assertEqual(resolve_worker_count(0), os.cpu_count() or 1)
+        self.assertEqual(resolve_worker_count(None), os.cpu_count() or 1)
+        self.assertEqual(resolve_worker_count("abc"), os.cpu_count() or 1)
+
+    def test_run_converts_all_files(self):
+        """Тест параллельного преобразования нескольких файлов."""
+        options = ConversionOptions(quality=80, target_width=60, target_height=0)
+        results = list(ConversionEngine(2).run(self.jobs, options))
+
+        self.assertEqual(len(results), len(self.jobs))
+        self.assertTrue(all(result.ok for result in results))
+        for _, output_path in self.jobs:
+            with Image.open(output_path) as img:
+                self.assertEqual(img.format, "JPEG")
+                self.assertEqual(img.size, (60, 40))
+
+    def test_run_reports_errors(self):
+        """Тест передачи ошибки конкретного файла без остановки остальных."""
+        broken_path = os.path.join(self.temp_dir, "broken.png")
+        with open(broken_path, "wb") as f:
+            f.write(b"not an image")
+        jobs = self.jobs + [(broken_path, os.path.join(self.output_dir, "broken.jpg"))]
+
+        results = list(ConversionEngine(2).run(jobs, ConversionOptions()))
+
+        failed = [result for result in results if not result.ok]
+        self.assertEqual(len(results), len(jobs))
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(failed[0].source_path, broken_path)
+
+    def test_pipeline_depth_bounds_jobs_in_flight(self):
+        """Тест, что конвейер не забирает из итератора больше заданий, чем позволяет глубина."""
+        engine = ConversionEngine(1, read_threads=2, write_threads=1, pipeline_depth=2)
+        results = engine.run(iter(self.jobs), ConversionOptions())
+
+        first = next(results)
+        self.assertTrue(first.ok)
+        self.assertLessEqual(engine.discovered, 3)
+        self.assertEqual(len(list(results)) + 1, len(self.jobs))
+        self.assertEqual(set(first.stats.stages), {"read", "decode", "resize", "flatten", "encode", "write"})
+
+    def test_missing_source_is_reported(self):
+        """Тест ошибки на этапе чтения."""
+        jobs = [(os.path.join(self.temp_dir, "missing.png"), os.path.join(self.output_dir, "missing.jpg"))]
+        results = list(ConversionEngine(1).run(jobs, ConversionOptions()))
+        self.assertEqual(len(results), 1)
+        self.assertFalse(results[0].ok)
+
+    def test_skip_existing_outputs(self):
+        """Тест пропуска существующих JPG без чтения исходников, если перезапись выключена."""
+        existing_path = self.jobs[0][1]
+        with open(existing_path, "wb") as f:
+            f.write(b"old")
+
+        results = list(ConversionEngine(1).run(self.jobs, ConversionOptions(), overwrite=False))
+
+        skipped = [result for result in results if result.skipped]
+        self.assertEqual([(r.output_path, r.skip_reason) for r in skipped], [(existing_path, "exists")])
+        with open(existing_path, "rb") as f:
+            self.assertEqual(f.read(), b"old")
+
+    def test_writes_are_atomic(self):
+        """Тест, что после записи в выходной папке нет временных файлов и JPG заменен целиком."""
+        existing_path = self.jobs[0][1]
+        with open(existing_path, "wb") as f:
+            f.write(b"old")
+
+        list(ConversionEngine(1).run(self.jobs, ConversionOptions()))
+
+        self.assertEqual(sorted(os.listdir(self.output_dir)), sorted(os.path.basename(o) for _, o in self.jobs))
+        with Image.open(existing_path) as img:
+            self.assertEqual(img.format, "JPEG")
+
+    @unittest.skipIf(os.name == "nt", "права файлов POSIX")
+    def test_output_permissions(self):
+        """Тест, что новый JPG получает права по маске процесса, а перезаписанный сохраняет свои."""
+        new_path = os.path.join(self.output_dir, "new.jpg")
+        kept_path = os.path.join(self.output_dir, "kept.jpg")
+        with open(kept_path, "wb") as f:
+            f.write(b"old")
+        os.chmod(kept_path, 0o600)
+
+        old_umask = os.umask(0o027)
+        try:
+            write_output(b"data", new_path)
+            write_output(b"data", kept_path)
+            # Запись не меняет маску процесса
+            self.assertEqual(os.umask(0o027), 0o027)
+        finally:
+            os.umask(old_umask)
+
+        self.assertEqual(stat.S_IMODE(os.stat(new_path).st_mode), 0o640)
+        self.assertEqual(stat.S_IMODE(os.stat(kept_path).st_mode), 0o600)
+        with open(kept_path, "rb") as f:
+            self.assertEqual(f.read(), b"data")
+
+    def test_mixed_png_and_webp(self):
+        """
+        Тест пакета из PNG с прозрачностью и WebP в новом процессе.
+
+        Модули форматов Pillow загружаются при первом открытии файла, поэтому
+        проверка выполняется в отдельном интерпретаторе, где они еще не загружены.
+        """
+        Image.new('RGBA', (50, 50), (1, 2, 3, 100)).save(os.path.join(self.temp_dir, "a.png"))
+        Image.new('RGB', (50, 50)).save(os.path.join(self.temp_dir, "a.webp"))
+        Image.new('RGB', (50, 50)).save(os.path.join(self.temp_dir, "b.bmp"))
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for workers in ("1", "2", "4"):
+            output_dir = os.path.join(self.temp_dir, f"mixed_{workers}")
+            code = (
+                "import os, sys; from src.engine import ConversionEngine; from src.options import ConversionOptions; "
+                "src, out, workers = sys.argv[1:]; "
+                "jobs = [(os.path.join(src, n), os.path.join(out, n.replace('.', '_') + '.jpg')) "
+                "for n in ('a.png', 'a.webp', 'b.bmp')]; "
+                "os.makedirs(out); "
+                "print(sum(r.ok for r in ConversionEngine(int(workers)).run(jobs, ConversionOptions())))"
+            )
+            result = subprocess.run([sys.executable, "-c", code, self.temp_dir, output_dir, workers],
+                                    cwd=project_root, capture_output=True, text=True, timeout=60)
+            self.assertEqual(result.stdout.strip(), "3", result.stderr)
+
+    @unittest.skipIf(os.name == "nt", "группы процессов POSIX")
+    def test_interrupt_stops_pipeline(self):
+        """
+        Тест, что Ctrl+C во время преобразования не приводит к зависанию.
+
+        Терминал отправляет SIGINT всей группе процессов, поэтому конвейер
+        запускается в отдельном интерпретаторе со своей группой; после
+        прерывания пулы должны остановиться и процесс - завершиться.
+        """
+        for i in range(60):
+            Image.new('RGB', (1200, 1200), (i, 0, 0)).save(os.path.join(self.temp_dir, f"big_{i:02d}.png"))
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = (
+            "import os, sys; from src.engine import ConversionEngine; from src.options import ConversionOptions; "
+            "src, out = sys.argv[1:]; "
+            "jobs = [(os.path.join(src, n), os.path.join(out, n[:-4] + '.jpg')) "
+            "for n in sorted(os.listdir(src)) if n.startswith('big_')]; "
+            "done = 0\n"
+            "try:\n"
+            "    for result in ConversionEngine(2, pipeline_depth=8).run(jobs, ConversionOptions(quality=90)):\n"
+            "        done += 1\n"
+            "        print('converted', flush=True)\n"
+            "except KeyboardInterrupt:\n"
+            "    print('interrupted', done, flush=True)\n"
+        )
+        process = subprocess.Popen([sys.executable, "-c", code, self.temp_dir, self.output_dir],
+                                   cwd=project_root, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   text=True, start_new_session=True)
+        try:
+            self.assertEqual(process.stdout.readline().strip(), "converted")
+            os.killpg(process.pid, signal.SIGINT)
+            stdout, stderr = process.communicate(timeout=60)
+        finally:
+            if process.poll() is None:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+        self.assertEqual(process.returncode, 0, stderr)
+        self.assertIn("interrupted", stdout)
+        self.assertNotIn("Traceback", stderr)
+
+    def test_calculate_target_size(self):
+        """Тест расчета размеров с сохранением и без сохранения пропорций."""
+        self.assertEqual(calculate_target_size((200, 100), 100, 100, True), (100, 50))
+        self.assertEqual(calculate_target_size((200, 100), 0, 50, True), (100, 50))
+        self.assertEqual(calculate_target_size((200, 100), 100, 0, False), (100, 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Модульные тесты для преобразования кадров анимированных изображений.
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+from PIL import Image
+from src.cli import main
+from src.engine import ConversionEngine
+from src.imaging import convert_image
+from src.manifest import MANIFEST_NAME, ConversionManifest
+from src.options import ConversionOptions, Rendition, frame_path
+
+
+def _save_animation(path, count, size=(40, 30), **params):
+    """Сохраняет анимацию из count кадров разного цвета."""
+    frames = [Image.new('RGB', size, (index * 20 % 256, 0, 255 - index * 20 % 256)) for index in range(count)]
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=50, **params)
+
+
+class TestFrames(unittest.TestCase):
+    """
+    Тестовые случаи для режимов all и sheet.
+    """
+
+    def setUp(self):
+        """Создание анимированных GIF, WebP и APNG."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.gif = os.path.join(self.temp_dir, "anim.gif")
+        _save_animation(self.gif, 7, loop=0)
+        self.output = os.path.join(self.temp_dir, "anim.jpg")
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_first_frame_by_default(self):
+        """Тест, что без режима кадров создается один JPG."""
+        convert_image(self.gif, self.output, ConversionOptions())
+        self.assertTrue(os.path.exists(self.output))
+        self.assertFalse(os.path.exists(frame_path(self.output, 1)))
+
+    def test_all_frames(self):
+        """Тест сохранения каждого кадра отдельным пронумерованным JPG."""
+        stats = convert_image(self.gif, self.output, ConversionOptions(frame_mode="all"))
+
+        names = sorted(name for name in os.listdir(self.temp_dir) if name.endswith(".jpg"))
+        self.assertEqual(names, [f"anim_{number:04d}.jpg" for number in range(1, 8)])
+        with Image.open(frame_path(self.output, 7)) as img:
+            self.assertEqual(img.size, (40, 30))
+            self.assertGreater(img.getpixel((5, 5))[0], 100)
+        self.assertEqual(stats.encode_attempts, 7)
+        self.assertEqual(stats.pixels_in, 7 * 40 * 30)
+
+    def test_frame_step_keeps_source_numbers(self):
+        """Тест выборки каждого N-го кадра с номерами исходных кадров."""
+        convert_image(self.gif, self.output, ConversionOptions(frame_mode="all", frame_step=3))
+        names = sorted(name for name in os.listdir(self.temp_dir) if name.endswith(".jpg"))
+        self.assertEqual(names, ["anim_0001.jpg", "anim_0004.jpg", "anim_0007.jpg"])
+
+    def test_all_frames_with_renditions(self):
+        """Тест вариантов размера для каждого кадра."""
+        options = ConversionOptions(frame_mode="all", frame_step=2, rendition_layout="suffix",
+                                    renditions=(Rendition("small", 20, 0), Rendition("full", 0, 0)))
+        convert_image(self.gif, self.output, options)
+        with Image.open(os.path.join(self.temp_dir, "anim_small_0003.jpg")) as img:
+            self.assertEqual(img.size, (20, 15))
+        with Image.open(os.path.join(self.temp_dir, "anim_full_0003.jpg")) as img:
+            self.assertEqual(img.size, (40, 30))
+
+    def test_contact_sheet(self):
+        """Тест листа кадров с заданным числом столбцов."""
+        convert_image(self.gif, self.output, ConversionOptions(frame_mode="sheet", sheet_columns=3))
+        with Image.open(self.output) as img:
+            self.assertEqual(img.size, (120, 90))
+
+    def test_contact_sheet_downscaled_cells(self):
+        """Тест, что лист сразу собирается из уменьшенных кадров нужного размера."""
+        options = ConversionOptions(frame_mode="sheet", target_width=60, target_height=0)
+        stats = convert_image(self.gif, self.output, options)
+        with Image.open(self.output) as img:
+            # 7 кадров - лист 3x3, ячейки 20x15
+            self.assertEqual(img.size, (60, 45))
+        self.assertEqual(stats.encode_attempts, 1)
+
+    def test_animated_webp_and_apng(self):
+        """Тест покадрового режима для WebP и APNG."""
+        for name in ("anim.webp", "apng.png"):
+            source = os.path.join(self.temp_dir, name)
+            _save_animation(source, 3)
+            output = os.path.join(self.temp_dir, os.path.splitext(name)[0] + ".jpg")
+            convert_image(source, output, ConversionOptions(frame_mode="all"))
+            self.assertTrue(os.path.exists(frame_path(output, 3)), name)
+
+    def test_still_image_ignores_frame_mode(self):
+        """Тест, что обычное изображение в покадровом режиме дает один JPG."""
+        source = os.path.join(self.temp_dir, "still.png")
+        Image.new('RGB', (10, 10), 'red').save(source)
+        output = os.path.join(self.temp_dir, "still.jpg")
+        convert_image(source, output, ConversionOptions(frame_mode="all"))
+        self.assertTrue(os.path.exists(output))
+
+    def test_manifest_skips_converted_frames(self):
+        """Тест пропуска по манифесту и по существующему первому кадру."""
+        options = ConversionOptions(frame_mode="all", frame_step=2)
+        output_dir = os.path.join(self.temp_dir, "out")
+        os.makedirs(output_dir)
+        output = os.path.join(output_dir, "anim.jpg")
+
+        with ConversionEngine(max_workers=1) as engine:
+            manifest = ConversionManifest.load(output_dir)
+            results = list(engine.run([(self.gif, output)], options, manifest))
+            self.assertEqual(len(results[0].written), 4)
+            manifest.save()
+
+            manifest = ConversionManifest.load(output_dir)
+            self.assertTrue(manifest.is_up_to_date(self.gif, output, options))
+            os.remove(frame_path(output, 7))
+            self.assertFalse(manifest.is_up_to_date(self.gif, output, options))
+
+            os.remove(os.path.join(output_dir, MANIFEST_NAME))
+            results = list(engine.run([(self.gif, output)], options, overwrite=False))
+            self.assertTrue(results[0].skipped)
+
+    def test_cli_frames(self):
+        """Тест параметров --frames и --frame-step."""
+        input_dir = os.path.join(self.temp_dir, "in")
+        os.makedirs(input_dir)
+        shutil.move(self.gif, input_dir)
+        output_dir = os.path.join(self.temp_dir, "cli")
+        code = main(["convert", input_dir, output_dir, "--frames", "all", "--frame-step", "5", "-q"])
+        self.assertEqual(code, 0)
+        names = sorted(name for name in os.listdir(output_dir) if name.endswith(".jpg"))
+        self.assertEqual(names, ["anim_0001.jpg", "anim_0006.jpg"])
+
+
+if __name__ == '__main__':
+    unittest.main()
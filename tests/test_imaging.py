@@ -0,0 +1,195 @@
+"""
+Модульные тесты для функций обработки изображений.
+"""
+
+import unittest
+import io
+import os
+import shutil
+import tempfile
+from PIL import Image, JpegImagePlugin
+from src.imaging import (convert_image, encode_jpeg, encode_jpeg_to_size, flatten_alpha,
+                         prepare_downscale, resize_image)
+from src.options import ConversionOptions, parse_color
+
+
+class TestDownscale(unittest.TestCase):
+    """
+    Тестовые случаи для быстрого уменьшения больших изображений.
+    """
+
+    def setUp(self):
+        """Создание временной папки."""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_reduced_resize_matches_target_size(self):
+        """Тест, что двухшаговое уменьшение дает точный целевой размер."""
+        img = Image.linear_gradient('L').resize((2000, 1000)).convert('RGB')
+        exact = resize_image(img, (137, 68), reducing_gap=None)
+        reduced = resize_image(img, (137, 68), reducing_gap=2.0)
+        self.assertEqual(reduced.size, (137, 68))
+        self.assertEqual(exact.size, reduced.size)
+
+    def test_palette_image_is_resized_with_lanczos(self):
+        """Тест, что палитровое изображение раскрывается перед масштабированием."""
+        img = Image.new('P', (100, 100))
+        self.assertEqual(resize_image(img, (10, 10)).mode, 'RGB')
+        img.info['transparency'] = 0
+        self.assertEqual(resize_image(img, (10, 10)).mode, 'RGBA')
+
+    def test_jpeg_draft_decodes_at_reduced_scale(self):
+        """Тест сокращенного декодирования JPEG при сильном уменьшении."""
+        path = os.path.join(self.temp_dir, "big.jpg")
+        Image.new('RGB', (1600, 1600), color='red').save(path, "JPEG")
+        with Image.open(path) as img:
+            prepare_downscale(img, (100, 100), reducing_gap=2.0)
+            self.assertEqual(img.size, (200, 200))
+        with Image.open(path) as img:
+            prepare_downscale(img, (100, 100), reducing_gap=None)
+            self.assertEqual(img.size, (1600, 1600))
+
+    def test_convert_with_fast_downscale(self):
+        """Тест преобразования большого RGBA изображения с быстрым уменьшением."""
+        source = os.path.join(self.temp_dir, "big.png")
+        output = os.path.join(self.temp_dir, "big.jpg")
+        Image.new('RGBA', (3000, 1500), color=(255, 0, 0, 255)).save(source)
+
+        convert_image(source, output, ConversionOptions(target_width=300, reducing_gap=2.0))
+
+        with Image.open(output) as img:
+            self.assertEqual(img.size, (300, 150))
+            r, g, b = img.getpixel((150, 75))
+            self.assertGreater(r, 240)
+            self.assertLess(g, 15)
+
+
+class TestTargetSize(unittest.TestCase):
+    """
+    Тестовые случаи для подбора качества под ограничение размера.
+    """
+
+    def setUp(self):
+        """Создание изображения с шумом, размер которого зависит от качества."""
+        self.img = Image.effect_noise((300, 300), 60).convert('RGB')
+        self.options = ConversionOptions(quality=95)
+
+    def test_picks_highest_quality_within_budget(self):
+        """Тест выбора наибольшего качества, укладывающегося в ограничение."""
+        budget = len(encode_jpeg(self.img, self.options, 50))
+        data, quality, attempts = encode_jpeg_to_size(self.img, self.options, budget)
+
+        self.assertLessEqual(len(data), budget)
+        self.assertGreaterEqual(quality, 50)
+        self.assertGreater(len(encode_jpeg(self.img, self.options, quality + 1)), budget)
+        self.assertLessEqual(attempts, 8)
+
+    def test_fitting_image_is_encoded_once(self):
+        """Тест, что изображение в пределах ограничения кодируется один раз."""
+        data, quality, attempts = encode_jpeg_to_size(self.img, self.options, 10 ** 9)
+        self.assertEqual((quality, attempts), (95, 1))
+
+    def test_unreachable_budget_returns_smallest(self):
+        """Тест возврата минимального варианта, если ограничение недостижимо."""
+        data, quality, _ = encode_jpeg_to_size(self.img, self.options, 100)
+        self.assertEqual(quality, 1)
+        self.assertEqual(data, encode_jpeg(self.img, self.options, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class TestFlattenAlpha(unittest.TestCase):
+    """
+    Тестовые случаи для наложения прозрачности на фон.
+    """
+
+    def test_opaque_alpha_is_dropped_without_compositing(self):
+        """Тест, что полностью непрозрачное изображение просто теряет альфа-канал."""
+        img = Image.new('RGBA', (10, 10), (10, 20, 30, 255))
+        flattened = flatten_alpha(img, (0, 0, 0))
+        self.assertEqual(flattened.mode, 'RGB')
+        self.assertEqual(flattened.getpixel((5, 5)), (10, 20, 30))
+
+    def test_rgba_uses_background_color(self):
+        """Тест наложения полупрозрачного пикселя на заданный цвет фона."""
+        img = Image.new('RGBA', (10, 10), (255, 0, 0, 0))
+        img.putpixel((0, 0), (255, 0, 0, 255))
+        flattened = flatten_alpha(img, (0, 0, 255))
+        self.assertEqual(flattened.getpixel((0, 0)), (255, 0, 0))
+        self.assertEqual(flattened.getpixel((5, 5)), (0, 0, 255))
+
+    def test_la_respects_alpha(self):
+        """Тест, что изображение LA накладывается с учетом прозрачности."""
+        img = Image.new('LA', (10, 10), (0, 0))
+        self.assertEqual(flatten_alpha(img).getpixel((5, 5)), (255, 255, 255))
+
+    def test_palette_transparency(self):
+        """Тест палитрового изображения с прозрачным цветом и без него."""
+        img = Image.new('P', (10, 10), 1)
+        img.putpalette([0, 0, 0, 0, 255, 0])
+        self.assertEqual(flatten_alpha(img).getpixel((5, 5)), (0, 255, 0))
+
+        img.info['transparency'] = 1
+        self.assertEqual(flatten_alpha(img, (9, 9, 9)).getpixel((5, 5)), (9, 9, 9))
+
+    def test_parse_color(self):
+        """Тест разбора цвета фона из настроек."""
+        self.assertEqual(parse_color("#fff"), (255, 255, 255))
+        self.assertEqual(parse_color("#102030"), (16, 32, 48))
+        self.assertEqual(parse_color([1, 2, 3]), (1, 2, 3))
+        with self.assertRaises(ValueError):
+            parse_color("#12")
+
+
+class TestEncoderProfiles(unittest.TestCase):
+    """
+    Тестовые случаи для профилей кодировщика JPEG.
+    """
+
+    def setUp(self):
+        """Создание цветного изображения с шумом."""
+        noise = Image.effect_noise((256, 256), 40).convert('L')
+        self.img = Image.merge('RGB', (noise, Image.linear_gradient('L'), noise.transpose(Image.Transpose.ROTATE_90)))
+
+    def _encode(self, profile, quality=80):
+        """Кодирует изображение с профилем и возвращает открытый JPG."""
+        data = encode_jpeg(self.img, ConversionOptions(encoder_profile=profile), quality)
+        return data, Image.open(io.BytesIO(data))
+
+    def test_standard_matches_previous_encoder(self):
+        """Тест, что профиль по умолчанию дает прежний результат (optimize, 4:2:0)."""
+        buffer = io.BytesIO()
+        self.img.save(buffer, "JPEG", quality=80, optimize=True)
+        self.assertEqual(self._encode("standard")[0], buffer.getvalue())
+
+    def test_fast_skips_huffman_optimization(self):
+        """Тест, что быстрый профиль не оптимизирует таблицы и дает файл чуть больше."""
+        fast, _ = self._encode("fast")
+        standard, _ = self._encode("standard")
+        self.assertGreater(len(fast), len(standard))
+
+    def test_web_is_progressive(self):
+        """Тест прогрессивного JPEG в профиле web."""
+        _, img = self._encode("web")
+        self.assertTrue(img.info.get("progressive"))
+        self.assertEqual(JpegImagePlugin.get_sampling(img), 2)
+
+    def test_archival_keeps_chroma_and_quality(self):
+        """Тест профиля archival: 4:4:4 и качество не ниже 95."""
+        _, img = self._encode("archival")
+        self.assertEqual(JpegImagePlugin.get_sampling(img), 0)
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            source = os.path.join(temp_dir, "a.png")
+            self.img.save(source)
+            stats = convert_image(source, os.path.join(temp_dir, "a.jpg"),
+                                  ConversionOptions(quality=60, encoder_profile="archival"))
+            self.assertEqual(stats.quality, 95)
+        finally:
+            shutil.rmtree(temp_dir)
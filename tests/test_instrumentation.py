@@ -0,0 +1,88 @@
+"""
+Модульные тесты для измерения этапов конвейера и наблюдателей движка.
+"""
+
+import unittest
+import io
+import json
+import os
+import shutil
+import tempfile
+from PIL import Image
+from src.engine import ConversionEngine
+from src.instrumentation import (ConversionObserver, JsonLinesObserver, STAGES,
+                                 SummaryTableObserver)
+from src.options import ConversionOptions
+
+
+class RecordingObserver(ConversionObserver):
+    """Наблюдатель, запоминающий все вызовы."""
+
+    def __init__(self):
+        self.files = []
+        self.summaries = []
+
+    def on_file(self, result):
+        self.files.append(result)
+
+    def on_finish(self, summary):
+        self.summaries.append(summary)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """
+    Тестовые случаи для статистики этапов и наблюдателей.
+    """
+
+    def setUp(self):
+        """Создание тестовых изображений."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.jobs = []
+        for i in range(3):
+            path = os.path.join(self.temp_dir, f"{i}.png")
+            Image.new('RGBA', (200, 100), (0, 0, 0, 100)).save(path)
+            self.jobs.append((path, os.path.join(self.temp_dir, f"{i}.jpg")))
+        self.options = ConversionOptions(target_width=100)
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_results_carry_stage_stats(self):
+        """Тест, что каждый результат содержит время этапов и счетчики."""
+        results = list(ConversionEngine(2).run(self.jobs, self.options))
+        for result in results:
+            self.assertEqual(set(result.stats.stages), set(STAGES))
+            self.assertEqual(result.stats.pixels_in, 200 * 100)
+            self.assertEqual(result.stats.pixels_out, 100 * 50)
+            self.assertEqual(result.stats.bytes_in, os.path.getsize(result.source_path))
+            self.assertEqual(result.stats.bytes_out, os.path.getsize(result.output_path))
+
+    def test_observers_receive_files_and_summary(self):
+        """Тест вызова наблюдателя для каждого файла и один раз в конце."""
+        observer = RecordingObserver()
+        engine = ConversionEngine(2)
+        list(engine.run(self.jobs, self.options, observers=[observer]))
+
+        self.assertEqual(len(observer.files), 3)
+        self.assertEqual(observer.summaries, [engine.summary])
+        self.assertEqual(engine.summary.converted, 3)
+        self.assertEqual(engine.summary.pixels_out, 3 * 100 * 50)
+
+    def test_json_lines_and_table_output(self):
+        """Тест журнала JSON Lines и итоговой таблицы."""
+        log_path = os.path.join(self.temp_dir, "stats.jsonl")
+        stream = io.StringIO()
+        observers = [JsonLinesObserver(log_path), SummaryTableObserver(stream)]
+        list(ConversionEngine(1).run(self.jobs, self.options, observers=observers))
+
+        with open(log_path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r["event"] for r in records], ["file"] * 3 + ["summary"])
+        self.assertIn("encode", records[0]["stages"])
+        self.assertEqual(records[-1]["converted"], 3)
+        self.assertIn("decode", stream.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+"""
+Модульные тесты для журнала контрольных точек, паузы и отмены преобразования.
+"""
+
+import unittest
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from PIL import Image
+from src.cli import main
+from src.engine import ConversionEngine, _Pipeline
+from src.instrumentation import ConversionObserver
+from src.journal import JOURNAL_NAME, CheckpointJournal
+from src.options import ConversionOptions
+
+
+class TestCheckpointJournal(unittest.TestCase):
+    """
+    Тестовые случаи для продолжения прерванного пакета.
+    """
+
+    def setUp(self):
+        """Создание набора исходных изображений."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.temp_dir, "in")
+        self.output_dir = os.path.join(self.temp_dir, "out")
+        os.makedirs(self.input_dir)
+        os.makedirs(self.output_dir)
+        self.jobs = []
+        for i in range(12):
+            path = os.path.join(self.input_dir, f"image_{i:02d}.png")
+            Image.new('RGB', (200, 150), (i * 20, 0, 0)).save(path)
+            self.jobs.append((path, os.path.join(self.output_dir, f"image_{i:02d}.jpg")))
+        self.options = ConversionOptions(quality=80)
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_cancel_and_resume(self):
+        """Тест отмены пакета и продолжения с места остановки по журналу."""
+        engine = ConversionEngine(max_workers=2, pipeline_depth=2)
+        journal = CheckpointJournal.load(self.output_dir, self.options)
+        first = []
+        for result in engine.run(self.jobs, self.options, journal=journal):
+            first.append(result)
+            if len(first) == 3:
+                engine.cancel()
+
+        self.assertTrue(engine.summary.cancelled)
+        self.assertTrue(all(result.ok for result in first))
+        # Отмена срабатывает в пределах файлов, уже находящихся в конвейере
+        self.assertLess(len(first), len(self.jobs))
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, JOURNAL_NAME)))
+
+        journal = CheckpointJournal.load(self.output_dir, self.options)
+        self.assertEqual(len(journal), len(first))
+        second = list(ConversionEngine(max_workers=2).run(self.jobs, self.options, journal=journal))
+        resumed = [result for result in second if result.skip_reason == "resumed"]
+        self.assertEqual(len(resumed), len(first))
+        self.assertEqual(len(second), len(self.jobs))
+        self.assertTrue(all(os.path.exists(output_path) for _, output_path in self.jobs))
+        # Пакет завершен полностью - журнал удален
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, JOURNAL_NAME)))
+
+    def test_encoded_files_are_written_after_cancel(self):
+        """Тест, что файл, закодированный к моменту отмены, записывается, возвращается и попадает в журнал."""
+        engine = ConversionEngine(max_workers=1, pipeline_depth=2)
+        journal = CheckpointJournal.load(self.output_dir, self.options)
+        on_rendered = _Pipeline._on_rendered
+        encoded = []
+
+        def cancel_after_first_encode(pipeline, source_path, *args, **kwargs):
+            # Отмена приходит, когда первый файл уже закодирован, но еще не записан
+            if not encoded:
+                encoded.append(source_path)
+                engine.cancel()
+            return on_rendered(pipeline, source_path, *args, **kwargs)
+
+        with mock.patch.object(_Pipeline, "_on_rendered", cancel_after_first_encode):
+            results = list(engine.run(self.jobs, self.options, journal=journal))
+
+        self.assertTrue(engine.summary.cancelled)
+        self.assertLess(len(results), len(self.jobs))
+        self.assertIn(encoded[0], [result.source_path for result in results])
+        for result in results:
+            self.assertTrue(result.ok, result.error)
+            self.assertTrue(os.path.exists(result.output_path))
+        self.assertEqual(len(CheckpointJournal.load(self.output_dir, self.options)), len(results))
+
+    def test_changed_source_and_settings_are_reconverted(self):
+        """Тест, что измененный файл и другие параметры не берутся из журнала."""
+        journal = CheckpointJournal.load(self.output_dir, self.options)
+        source_path, output_path = self.jobs[0]
+        Image.new('RGB', (10, 10)).save(output_path, "JPEG")
+        journal.record(source_path, output_path, [output_path])
+        journal.close()
+
+        journal = CheckpointJournal.load(self.output_dir, self.options)
+        self.assertTrue(journal.is_complete(source_path, output_path))
+        self.assertFalse(journal.is_complete(self.jobs[1][0], self.jobs[1][1]))
+        self.assertEqual(len(CheckpointJournal.load(self.output_dir, ConversionOptions(quality=70))), 0)
+
+        Image.new('RGB', (201, 150)).save(source_path)
+        self.assertFalse(CheckpointJournal.load(self.output_dir, self.options).is_complete(source_path, output_path))
+
+    def test_truncated_last_line_is_ignored(self):
+        """Тест чтения журнала, последняя строка которого оборвана при сбое."""
+        journal = CheckpointJournal.load(self.output_dir, self.options)
+        for source_path, output_path in self.jobs[:2]:
+            Image.new('RGB', (10, 10)).save(output_path, "JPEG")
+            journal.record(source_path, output_path, [output_path])
+        journal.close()
+        with open(journal.path, 'a', encoding='utf-8') as f:
+            f.write('{"source": "/x", "outp')
+
+        self.assertEqual(len(CheckpointJournal.load(self.output_dir, self.options)), 2)
+
+    def test_corrupted_journal_is_reported(self):
+        """Тест, что нечитаемый журнал сообщает причину через load_error, а не в stdout."""
+        with open(os.path.join(self.output_dir, JOURNAL_NAME), "w", encoding="utf-8") as f:
+            f.write("{not json\n")
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            journal = CheckpointJournal.load(self.output_dir, self.options)
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertTrue(journal.load_error)
+        self.assertEqual(len(journal), 0)
+
+    def test_pause_holds_new_files(self):
+        """Тест, что на паузе новые файлы не поступают в обработку."""
+        engine = ConversionEngine(max_workers=1, pipeline_depth=1)
+        engine.pause()
+        self.assertTrue(engine.paused)
+        results = []
+        worker = threading.Thread(target=lambda: results.extend(engine.run(self.jobs[:3], self.options)))
+        worker.start()
+        worker.join(0.5)
+        self.assertTrue(worker.is_alive())
+        self.assertEqual(results, [])
+
+        engine.resume()
+        worker.join(30)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(len(results), 3)
+
+    def test_cancel_while_paused(self):
+        """Тест отмены приостановленного преобразования."""
+        engine = ConversionEngine(max_workers=1, pipeline_depth=1)
+        engine.pause()
+        results = []
+        worker = threading.Thread(target=lambda: results.extend(engine.run(self.jobs, self.options)))
+        worker.start()
+        worker.join(0.3)
+        engine.cancel()
+        worker.join(30)
+
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(results, [])
+        self.assertTrue(engine.summary.cancelled)
+        self.assertFalse(engine.cancelled)
+
+    def _record_first(self):
+        """Записывает в журнал первый файл так, будто его преобразовал прерванный пакет."""
+        journal = CheckpointJournal.load(self.output_dir, self.options)
+        source_path, output_path = self.jobs[0]
+        Image.new('RGB', (10, 10)).save(output_path, "JPEG")
+        journal.record(source_path, output_path, [output_path])
+        journal.close()
+        return output_path
+
+    def test_cli_resume_and_no_resume(self):
+        """Тест продолжения пакета из командной строки и параметра --no-resume."""
+        output_path = self._record_first()
+        self.assertEqual(main(["convert", self.input_dir, self.output_dir, "--quality", "80", "-q"]), 0)
+        with Image.open(output_path) as img:
+            self.assertEqual(img.size, (10, 10))
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, JOURNAL_NAME)))
+
+        output_path = self._record_first()
+        code = main(["convert", self.input_dir, self.output_dir, "--quality", "80", "--no-resume", "-q"])
+        self.assertEqual(code, 0)
+        with Image.open(output_path) as img:
+            self.assertEqual(img.size, (200, 150))
+
+    def test_cli_interrupt_returns_130_and_resumes(self):
+        """Тест, что команда convert, прерванная Ctrl+C, возвращает 130 и продолжается повторным запуском."""
+        class InterruptAfterThree(ConversionObserver):
+            """Имитирует Ctrl+C в основном потоке после третьего файла."""
+
+            def __init__(self):
+                self.count = 0
+
+            def on_file(self, result):
+                self.count += 1
+                if self.count == 3:
+                    raise KeyboardInterrupt
+
+        args = ["convert", self.input_dir, self.output_dir, "--quality", "80", "--workers", "2",
+                "--pipeline-depth", "2", "-q"]
+        with mock.patch("src.cli.SummaryTableObserver", InterruptAfterThree):
+            self.assertEqual(main(args + ["--stats"]), 130)
+
+        journal = CheckpointJournal.load(self.output_dir, self.options)
+        self.assertGreaterEqual(len(journal), 3)
+        self.assertLess(len(journal), len(self.jobs))
+        converted = {source_path: os.path.getmtime(journal.entries[os.path.abspath(source_path)]["output"])
+                     for source_path, _ in self.jobs if os.path.abspath(source_path) in journal.entries}
+
+        self.assertEqual(main(args), 0)
+        self.assertTrue(all(os.path.exists(output_path) for _, output_path in self.jobs))
+        # Файлы из журнала не преобразуются повторно
+        for source_path, mtime in converted.items():
+            output_path = journal.entries[os.path.abspath(source_path)]["output"]
+            self.assertEqual(os.path.getmtime(output_path), mtime)
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, JOURNAL_NAME)))
+
+
+if __name__ == '__main__':
+    unittest.main()
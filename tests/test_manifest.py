@@ -0,0 +1,113 @@
+"""
+Модульные тесты для манифеста инкрементального преобразования.
+"""
+
+import unittest
+import contextlib
+import io
+import os
+import shutil
+import stat
+import tempfile
+from PIL import Image
+from src.engine import ConversionEngine
+from src.manifest import ConversionManifest, MANIFEST_NAME
+from src.options import ConversionOptions
+from src.scanner import iter_jobs
+
+
+class TestConversionManifest(unittest.TestCase):
+    """
+    Тестовые случаи для ConversionManifest.
+    """
+
+    def setUp(self):
+        """Создание входной и выходной папок."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.temp_dir, "in")
+        self.output_dir = os.path.join(self.temp_dir, "out")
+        os.makedirs(self.input_dir)
+        os.makedirs(self.output_dir)
+        for name in ("a.png", "b.png", "c.png"):
+            Image.new('RGB', (40, 40), color='red').save(os.path.join(self.input_dir, name))
+        self.options = ConversionOptions(quality=80)
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def _run(self, options=None, use_content_hash=False):
+        """Выполняет преобразование с манифестом и возвращает результаты."""
+        manifest = ConversionManifest.load(self.output_dir, use_content_hash)
+        jobs = iter_jobs(self.input_dir, self.output_dir)
+        return list(ConversionEngine(2).run(jobs, options or self.options, manifest))
+
+    def test_second_run_skips_unchanged_files(self):
+        """Тест пропуска файлов, которые не изменились с прошлого запуска."""
+        first = self._run()
+        self.assertFalse(any(result.skipped for result in first))
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, MANIFEST_NAME)))
+
+        second = self._run()
+        self.assertTrue(all(result.skipped for result in second))
+
+    def test_changed_and_new_files_are_converted(self):
+        """Тест повторного преобразования измененных и новых файлов."""
+        self._run()
+        Image.new('RGB', (50, 40), color='blue').save(os.path.join(self.input_dir, "a.png"))
+        Image.new('RGB', (40, 40), color='blue').save(os.path.join(self.input_dir, "d.png"))
+
+        converted = {os.path.basename(r.source_path) for r in self._run() if not r.skipped}
+        self.assertEqual(converted, {"a.png", "d.png"})
+
+    def test_changed_settings_invalidate_outputs(self):
+        """Тест повторного преобразования при изменении параметров."""
+        self._run()
+        results = self._run(ConversionOptions(quality=60))
+        self.assertFalse(any(result.skipped for result in results))
+
+    def test_deleted_output_is_recreated(self):
+        """Тест повторного преобразования, если JPG был удален."""
+        self._run()
+        os.remove(os.path.join(self.output_dir, "b.jpg"))
+
+        converted = [os.path.basename(r.source_path) for r in self._run() if not r.skipped]
+        self.assertEqual(converted, ["b.png"])
+
+    def test_content_hash_ignores_touched_files(self):
+        """Тест пропуска файла с новым временем изменения, но тем же содержимым."""
+        self._run(use_content_hash=True)
+        path = os.path.join(self.input_dir, "c.png")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        results = self._run(use_content_hash=True)
+        self.assertTrue(all(result.skipped for result in results))
+
+
+    def test_corrupted_manifest_is_reported(self):
+        """Тест, что поврежденный манифест сообщает причину через load_error, а не в stdout."""
+        with open(os.path.join(self.output_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            f.write("{not json")
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            manifest = ConversionManifest.load(self.output_dir)
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertTrue(manifest.load_error)
+        self.assertEqual(manifest.entries, {})
+        self.assertIsNone(ConversionManifest.load(self.input_dir).load_error)
+
+    @unittest.skipIf(os.name == "nt", "права файлов POSIX")
+    def test_saved_manifest_permissions(self):
+        """Тест, что манифест получает права по маске процесса, а не 0600 временного файла."""
+        old_umask = os.umask(0o022)
+        try:
+            self._run()
+        finally:
+            os.umask(old_umask)
+        path = os.path.join(self.output_dir, MANIFEST_NAME)
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o644)
+        self.assertEqual(sorted(os.listdir(self.output_dir)), sorted([MANIFEST_NAME, "a.jpg", "b.jpg", "c.jpg"]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+"""
+Модульные тесты для бюджета памяти и предела числа пикселей.
+"""
+
+import unittest
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from PIL import Image
+from src.engine import ConversionEngine
+from src.imaging import ImageTooLargeError, convert_image, estimate_decode_memory
+from src.memory import MemoryBudget
+from src.options import ConversionOptions
+
+
+class TestMemoryBudget(unittest.TestCase):
+    """
+    Тестовые случаи для MemoryBudget.
+    """
+
+    def test_waits_for_release(self):
+        """Файл, не помещающийся в остаток бюджета, ждет освобождения памяти."""
+        budget = MemoryBudget(100, probe=None)
+        budget.acquire(60)
+        admitted = threading.Event()
+
+        def second():
+            budget.acquire(60)
+            admitted.set()
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        time.sleep(0.1)
+        self.assertFalse(admitted.is_set())
+        budget.release(60)
+        thread.join(2)
+        self.assertTrue(admitted.is_set())
+        self.assertEqual(budget.waits, 1)
+
+    def test_oversized_runs_alone(self):
+        """Изображение больше бюджета допускается, только когда бюджет пуст."""
+        budget = MemoryBudget(100, probe=None)
+        self.assertEqual(budget.acquire(500), 500)
+        with self.assertRaises(RuntimeError):
+            budget.acquire(1, cancelled=lambda: True)
+        budget.release(500)
+        self.assertEqual(budget.acquire(1), 1)
+
+    def test_oversized_is_not_starved(self):
+        """Пока ждет изображение больше бюджета, следующие за ним файлы не допускаются."""
+        budget = MemoryBudget(100, probe=None)
+        budget.acquire(60)
+        admitted = []
+
+        def acquire(amount):
+            budget.acquire(amount)
+            admitted.append(amount)
+
+        large = threading.Thread(target=acquire, args=(500,), daemon=True)
+        large.start()
+        time.sleep(0.1)
+        # Мелкий файл поместился бы в остаток бюджета, но в очереди он после крупного
+        small = threading.Thread(target=acquire, args=(10,), daemon=True)
+        small.start()
+        time.sleep(0.1)
+        self.assertEqual(admitted, [])
+
+        budget.release(60)
+        large.join(2)
+        self.assertEqual(admitted, [500])
+        time.sleep(0.1)
+        self.assertEqual(admitted, [500])
+
+        budget.release(500)
+        small.join(2)
+        self.assertEqual(admitted, [500, 10])
+
+    def test_system_pressure_limits_admission(self):
+        """При нехватке памяти в системе файлы обрабатываются по одному."""
+        budget = MemoryBudget(None, probe=lambda: 100)
+        budget.acquire(80)
+        with self.assertRaises(RuntimeError):
+            budget.acquire(80, cancelled=lambda: True)
+
+    def test_estimate_grows_with_size(self):
+        """Оценка памяти учитывает режим и размер результата."""
+        options = ConversionOptions()
+        self.assertGreater(estimate_decode_memory((1000, 1000), 'RGBA', options),
+                           estimate_decode_memory((1000, 1000), 'P', options))
+        resized = ConversionOptions(target_width=100)
+        self.assertLess(estimate_decode_memory((1000, 1000), 'RGBA', resized),
+                        estimate_decode_memory((1000, 1000), 'RGBA', options))
+
+
+class TestPixelLimit(unittest.TestCase):
+    """
+    Тестовые случаи для явной проверки предела пикселей.
+    """
+
+    def setUp(self):
+        """Создание изображения 200x100."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.temp_dir, "big.png")
+        self.output = os.path.join(self.temp_dir, "big.jpg")
+        Image.new('RGB', (200, 100)).save(self.source)
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_limit_raises_specific_error(self):
+        """Превышение предела сообщается отдельным исключением."""
+        with self.assertRaises(ImageTooLargeError):
+            convert_image(self.source, self.output, ConversionOptions(max_image_pixels=10000))
+        convert_image(self.source, self.output, ConversionOptions(max_image_pixels=0))
+        self.assertTrue(os.path.exists(self.output))
+
+    def test_engine_marks_too_large(self):
+        """Движок отклоняет файл по заголовку и помечает результат."""
+        engine = ConversionEngine(max_workers=1, memory_budget_mb=64)
+        options = ConversionOptions(max_image_pixels=10000)
+        results = list(engine.run([(self.source, self.output)], options))
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0].too_large)
+        self.assertIn("200x100", results[0].error)
+        self.assertEqual(engine.summary.too_large, 1)
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_pillow_limit_is_not_changed(self):
+        """Предел Pillow программы не меняется; его превышение сообщается как ImageTooLargeError."""
+        code = "import PIL.Image, src.api, src.engine; print(PIL.Image.MAX_IMAGE_PIXELS)"
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, "-c", code], cwd=project_root,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), str(Image.MAX_IMAGE_PIXELS))
+
+        saved = Image.MAX_IMAGE_PIXELS
+        filters = list(warnings.filters)
+        try:
+            # 20000 пикселей - между пределом Pillow и его удвоением: только предупреждение
+            Image.MAX_IMAGE_PIXELS = 15000
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                convert_image(self.source, self.output, ConversionOptions(max_image_pixels=0))
+            self.assertEqual([w for w in caught if issubclass(w.category, Image.DecompressionBombWarning)], [])
+            self.assertTrue(os.path.exists(self.output))
+
+            # Больше удвоенного предела Pillow: файл не открывается при любом max_image_pixels
+            Image.MAX_IMAGE_PIXELS = 1000
+            with self.assertRaises(ImageTooLargeError) as raised:
+                convert_image(self.source, self.output, ConversionOptions(max_image_pixels=0))
+            self.assertIn("MAX_IMAGE_PIXELS", str(raised.exception))
+            self.assertEqual(Image.MAX_IMAGE_PIXELS, 1000)
+            engine = ConversionEngine(max_workers=1)
+            results = list(engine.run([(self.source, self.output)], ConversionOptions(max_image_pixels=0)))
+            self.assertTrue(results[0].too_large)
+        finally:
+            Image.MAX_IMAGE_PIXELS = saved
+        self.assertEqual(warnings.filters, filters)
+
+    def test_limit_does_not_change_fingerprint(self):
+        """Предел пикселей не влияет на отпечаток параметров манифеста."""
+        from src.manifest import options_fingerprint
+        self.assertEqual(options_fingerprint(ConversionOptions()),
+                         options_fingerprint(ConversionOptions(max_image_pixels=0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
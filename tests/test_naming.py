@@ -0,0 +1,117 @@
+"""
+Модульные тесты для шаблонов имен выходных файлов.
+"""
+
+import unittest
+import datetime
+import os
+import shutil
+import tempfile
+from PIL import Image
+from src.engine import ConversionEngine
+from src.naming import NamingPattern, OutputPlanner
+from src.options import ConversionOptions
+from src.scanner import iter_jobs
+
+
+class TestNamingPattern(unittest.TestCase):
+    """
+    Тестовые случаи для разбора шаблона.
+    """
+
+    def test_invalid_templates(self):
+        """Неизвестные поля и шаблоны без уникальной части отклоняются."""
+        for template in ("", "{name}.jpg", "{filename", "photo.jpg", "{date}/{filename}.jpg"):
+            with self.assertRaises(ValueError):
+                NamingPattern(template)
+
+    def test_jpg_extension_added(self):
+        """Расширение .jpg добавляется, если шаблон его не содержит."""
+        self.assertEqual(NamingPattern("{filename}_small").template, "{filename}_small.jpg")
+        self.assertEqual(NamingPattern("{filename}.JPEG").template, "{filename}.JPEG")
+
+    def test_requirements(self):
+        """Заголовок и хеш читаются только для шаблонов, которым они нужны."""
+        pattern = NamingPattern("{filename}_{quality}.jpg")
+        self.assertFalse(pattern.needs_size)
+        self.assertFalse(pattern.needs_hash)
+        pattern = NamingPattern("{hash8}_{width}x{height}.jpg")
+        self.assertTrue(pattern.needs_size)
+        self.assertTrue(pattern.needs_hash)
+
+
+class TestOutputPlanner(unittest.TestCase):
+    """
+    Тестовые случаи для выдачи имен и разрешения совпадений.
+    """
+
+    def setUp(self):
+        """Создание папки с совпадающими по имени изображениями."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.temp_dir, "in")
+        self.output_dir = os.path.join(self.temp_dir, "out")
+        os.makedirs(self.input_dir)
+        Image.new('RGB', (200, 100), (255, 0, 0)).save(os.path.join(self.input_dir, "a.png"))
+        Image.new('RGB', (200, 100), (0, 0, 255)).save(os.path.join(self.input_dir, "a.webp"))
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_fields(self):
+        """Поля шаблона заполняются из имени, параметров и заголовка файла."""
+        options = ConversionOptions(quality=80, target_width=100)
+        planner = OutputPlanner(self.output_dir, options, "{filename}_{ext}_{width}x{height}_q{quality}_{date}",
+                                today=datetime.date(2024, 5, 1))
+        path = planner.output_path(os.path.join(self.input_dir, "a.png"))
+        self.assertEqual(os.path.basename(path), "a_png_100x50_q80_2024-05-01.jpg")
+
+    def test_date_subfolder(self):
+        """Подпапка с датой пакета добавляется к выходной директории."""
+        planner = OutputPlanner(self.output_dir, ConversionOptions(), date_subfolder=True,
+                                today=datetime.date(2024, 5, 1))
+        path = planner.output_path(os.path.join(self.input_dir, "a.png"), "sub")
+        self.assertEqual(path, os.path.join(self.output_dir, "2024-05-01", "sub", "a.jpg"))
+
+    def test_hash8(self):
+        """Разное содержимое дает разные имена с {hash8}."""
+        planner = OutputPlanner(self.output_dir, ConversionOptions(), "{hash8}")
+        first = planner.output_path(os.path.join(self.input_dir, "a.png"))
+        second = planner.output_path(os.path.join(self.input_dir, "a.webp"))
+        self.assertEqual(len(os.path.basename(first)), len("12345678.jpg"))
+        self.assertNotEqual(first, second)
+        self.assertFalse(planner.collisions)
+
+    def test_collisions_resolved_before_writing(self):
+        """Файлы с одинаковым именем не перезаписывают друг друга."""
+        options = ConversionOptions()
+        planner = OutputPlanner(self.output_dir, options)
+        jobs = list(iter_jobs(self.input_dir, self.output_dir, planner=planner))
+        outputs = sorted(os.path.basename(output_path) for _, output_path in jobs)
+        self.assertEqual(outputs, ["a.jpg", "a_webp.jpg"])
+        self.assertEqual(len(planner.collisions), 1)
+
+        results = list(ConversionEngine(max_workers=1).run(jobs, options))
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ["a.jpg", "a_webp.jpg"])
+
+    def test_numbered_collisions(self):
+        """При повторном совпадении добавляется порядковый номер."""
+        planner = OutputPlanner(self.output_dir, ConversionOptions(), "{filename}")
+        sources = [os.path.join(self.input_dir, name) for name in ("a.png", "a.webp", os.path.join("sub", "a.webp"))]
+        paths = [os.path.basename(planner.output_path(source)) for source in sources]
+        self.assertEqual(paths, ["a.jpg", "a_webp.jpg", "a_2.jpg"])
+        self.assertEqual(len(planner.collisions), 2)
+
+    def test_same_source_keeps_path(self):
+        """Повторный запрос для того же файла не считается совпадением."""
+        planner = OutputPlanner(self.output_dir, ConversionOptions())
+        first = os.path.join(self.input_dir, "a.png")
+        second = os.path.join(self.input_dir, "a.webp")
+        paths = [planner.output_path(source) for source in (first, second, first, second)]
+        self.assertEqual(paths[:2], paths[2:])
+        self.assertEqual(len(planner.collisions), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Модульные тесты для автоматического подбора качества по SSIM.
+"""
+
+import unittest
+import io
+import os
+import shutil
+import tempfile
+from PIL import Image
+from src.cli import main
+from src.imaging import convert_image, encode_jpeg
+from src.options import ConversionOptions
+from src.quality import encode_jpeg_to_ssim, luma_plane, numpy_available, ssim
+
+
+def _photo(size=(640, 480)):
+    """Изображение с шумом, похожее на фотографию с мелкими деталями."""
+    noise = Image.effect_noise(size, 50).convert('L')
+    gradient = Image.linear_gradient('L').resize(size)
+    return Image.merge('RGB', (noise, gradient, Image.blend(noise, gradient, 0.5)))
+
+
+@unittest.skipUnless(numpy_available(), "нужен NumPy")
+class TestAutoQuality(unittest.TestCase):
+    """
+    Тестовые случаи для оценки SSIM и поиска качества.
+    """
+
+    def test_ssim_identical_and_degraded(self):
+        """Тест, что SSIM равен 1 для одинаковых изображений и падает с качеством."""
+        img = _photo()
+        reference = luma_plane(img)
+        self.assertAlmostEqual(ssim(reference, reference), 1.0)
+        scores = []
+        for quality in (10, 50, 95):
+            with Image.open(io.BytesIO(encode_jpeg(img, ConversionOptions(), quality))) as decoded:
+                scores.append(ssim(reference, luma_plane(decoded)))
+        self.assertLess(scores[0], scores[1])
+        self.assertLess(scores[1], scores[2])
+
+    def test_luma_plane_is_downsampled(self):
+        """Тест уменьшения плоскости яркости до SCORE_SIZE по большей стороне."""
+        self.assertEqual(luma_plane(Image.new('RGB', (2048, 1024))).shape, (256, 512))
+        self.assertEqual(luma_plane(Image.new('RGB', (100, 50))).shape, (50, 100))
+
+    def test_flat_graphics_get_lower_quality_than_photos(self):
+        """Тест, что плоская графика получает меньшее качество, чем фотография."""
+        options = ConversionOptions(quality=95, target_ssim=0.95)
+        flat = Image.new('RGB', (640, 480), (30, 120, 200))
+        _, flat_quality, _ = encode_jpeg_to_ssim(flat, options, 0.95, 95, encode_jpeg)
+        photo = _photo()
+        data, photo_quality, attempts = encode_jpeg_to_ssim(photo, options, 0.95, 95, encode_jpeg)
+        self.assertLess(flat_quality, photo_quality)
+        self.assertLessEqual(attempts, 8)
+
+        with Image.open(io.BytesIO(data)) as decoded:
+            self.assertGreaterEqual(ssim(luma_plane(photo), luma_plane(decoded)), 0.94)
+
+    def test_quality_is_upper_bound(self):
+        """Тест, что недостижимый порог дает качество, равное верхней границе."""
+        options = ConversionOptions(quality=60, target_ssim=0.999)
+        _, quality, _ = encode_jpeg_to_ssim(_photo(), options, 0.999, 60, encode_jpeg)
+        self.assertEqual(quality, 60)
+
+    def test_convert_and_cli(self):
+        """Тест режима в convert_image и параметра --target-ssim."""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_dir = os.path.join(temp_dir, "in")
+            os.makedirs(input_dir)
+            Image.new('RGB', (300, 200), 'white').save(os.path.join(input_dir, "flat.png"))
+            stats = convert_image(os.path.join(input_dir, "flat.png"), os.path.join(temp_dir, "flat.jpg"),
+                                  ConversionOptions(quality=90, target_ssim=0.95))
+            self.assertLess(stats.quality, 90)
+            self.assertGreater(stats.encode_attempts, 1)
+
+            code = main(["convert", input_dir, os.path.join(temp_dir, "out"), "--target-ssim", "0.95", "-q"])
+            self.assertEqual(code, 0)
+            self.assertTrue(os.path.exists(os.path.join(temp_dir, "out", "flat.jpg")))
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
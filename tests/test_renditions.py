@@ -0,0 +1,81 @@
+"""
+Модульные тесты для набора вариантов размера.
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+from PIL import Image
+from src.cli import main
+from src.imaging import convert_image
+from src.options import ConversionOptions, Rendition
+
+
+class TestRenditions(unittest.TestCase):
+    """
+    Тестовые случаи для создания нескольких вариантов из одного декодирования.
+    """
+
+    def setUp(self):
+        """Создание исходного изображения."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.temp_dir, "photo.png")
+        Image.new('RGBA', (4000, 2000), (200, 10, 10, 128)).save(self.source)
+        self.renditions = (
+            Rendition("thumb", 320, 0, 60),
+            Rendition("full", 1920, 1080),
+            Rendition("hd", 1366, 768),
+        )
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_all_renditions_from_one_decode(self):
+        """Тест создания всех вариантов в подпапках за одно декодирование."""
+        output = os.path.join(self.temp_dir, "out", "photo.jpg")
+        options = ConversionOptions(renditions=self.renditions)
+        for path in options.output_paths(output):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        stats = convert_image(self.source, output, options)
+
+        expected = {"full": (1920, 960), "hd": (1366, 683), "thumb": (320, 160)}
+        for name, size in expected.items():
+            with Image.open(os.path.join(self.temp_dir, "out", name, "photo.jpg")) as img:
+                self.assertEqual(img.size, size)
+        self.assertFalse(os.path.exists(output))
+        self.assertEqual(stats.pixels_in, 4000 * 2000)
+        self.assertEqual(stats.encode_attempts, 3)
+
+    def test_suffix_layout(self):
+        """Тест размещения вариантов с суффиксом в имени файла."""
+        options = ConversionOptions(renditions=self.renditions[:2], rendition_layout="suffix")
+        output = os.path.join(self.temp_dir, "photo.jpg")
+        self.assertEqual(options.output_paths(output), [
+            os.path.join(self.temp_dir, "photo_thumb.jpg"),
+            os.path.join(self.temp_dir, "photo_full.jpg"),
+        ])
+
+    def test_parse_rendition(self):
+        """Тест разбора описания варианта из командной строки."""
+        self.assertEqual(Rendition.parse("thumb:320x0:70"), Rendition("thumb", 320, 0, 70))
+        self.assertEqual(Rendition.parse("full:1920x1080"), Rendition("full", 1920, 1080))
+        with self.assertRaises(ValueError):
+            Rendition.parse("1920x1080")
+
+    def test_cli_renditions(self):
+        """Тест создания вариантов из командной строки."""
+        input_dir = os.path.dirname(self.source)
+        output_dir = os.path.join(self.temp_dir, "cli")
+        code = main(["convert", input_dir, output_dir, "--rendition", "full:1920x1080",
+                     "--rendition", "thumb:320x0", "--workers", "1", "-q"])
+
+        self.assertEqual(code, 0)
+        self.assertTrue(os.path.exists(os.path.join(output_dir, "full", "photo.jpg")))
+        self.assertTrue(os.path.exists(os.path.join(output_dir, "thumb", "photo.jpg")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Модульные тесты для потокового поиска изображений.
+"""
+
+import unittest
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+from PIL import Image
+from src.engine import ConversionEngine
+from src.options import ConversionOptions
+from src.scanner import iter_jobs, scan_images
+
+
+class TestScanner(unittest.TestCase):
+    """
+    Тестовые случаи для scan_images и iter_jobs.
+    """
+
+    def setUp(self):
+        """Создание дерева папок с изображениями."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.temp_dir, "in")
+        self.output_dir = os.path.join(self.input_dir, "out")
+        for relative_path in ("a.png", "sub/b.GIF", "sub/deep/c.webp", "sub/notes.txt"):
+            path = os.path.join(self.input_dir, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if relative_path.endswith(".txt"):
+                with open(path, "w") as f:
+                    f.write("текст")
+            else:
+                Image.new('RGB', (20, 20)).save(path, os.path.splitext(path)[1][1:].upper())
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def _relative(self, paths):
+        """Переводит пути в относительные к входной папке."""
+        return sorted(os.path.relpath(path, self.input_dir) for path in paths)
+
+    def test_non_recursive_scan(self):
+        """Тест поиска только в корне входной папки."""
+        self.assertEqual(self._relative(scan_images(self.input_dir)), ["a.png"])
+
+    def test_recursive_scan(self):
+        """Тест рекурсивного поиска с фильтром расширений без учета регистра."""
+        found = self._relative(scan_images(self.input_dir, recursive=True))
+        self.assertEqual(found, ["a.png", os.path.join("sub", "b.GIF"), os.path.join("sub", "deep", "c.webp")])
+
+    def test_jobs_mirror_subdirectories_and_skip_output(self):
+        """Тест повторения структуры папок и исключения выходной директории из обхода."""
+        os.makedirs(self.output_dir)
+        Image.new('RGB', (20, 20)).save(os.path.join(self.output_dir, "old.png"))
+
+        outputs = sorted(os.path.relpath(output, self.output_dir)
+                         for _, output in iter_jobs(self.input_dir, self.output_dir, recursive=True))
+        self.assertEqual(outputs, ["a.jpg", os.path.join("sub", "b.jpg"), os.path.join("sub", "deep", "c.jpg")])
+
+    def test_unreadable_directory_is_reported(self):
+        """Тест, что папка, которую не удалось прочитать, попадает в список ошибок, а не в stdout."""
+        missing = os.path.join(self.temp_dir, "missing")
+        errors = []
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(list(iter_jobs(missing, self.output_dir, errors=errors)), [])
+            self.assertEqual(list(scan_images(missing)), [])
+        self.assertEqual([directory for directory, _ in errors], [missing])
+        self.assertEqual(stdout.getvalue(), "")
+
+    def test_engine_starts_before_scan_finishes(self):
+        """Тест выдачи результатов до исчерпания потока заданий."""
+        jobs = list(iter_jobs(self.input_dir, self.output_dir, recursive=True)) * 4
+        jobs = [(source, f"{output[:-4]}_{i}.jpg") for i, (source, output) in enumerate(jobs)]
+        engine = ConversionEngine(1)
+
+        results = engine.run(iter(jobs), ConversionOptions())
+        first = next(results)
+        self.assertTrue(first.ok)
+        self.assertFalse(engine.scan_complete)
+        self.assertLess(engine.discovered, len(jobs))
+
+        remaining = list(results)
+        self.assertEqual(len(remaining) + 1, len(jobs))
+        self.assertTrue(engine.scan_complete)
+        self.assertEqual(engine.progress_fraction(len(jobs)), 1.0)
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, "sub", "deep", "c_2.jpg")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Модульные тесты для хранилища настроек.
+"""
+
+import unittest
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+from src.settings import CONFIG_DIR_ENV, SettingsStore, user_settings_path
+
+
+class TestSettingsStore(unittest.TestCase):
+    """
+    Тестовые случаи для SettingsStore.
+    """
+
+    def setUp(self):
+        """Создание файла значений по умолчанию."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.defaults_path = os.path.join(self.temp_dir, "defaults.json")
+        self.path = os.path.join(self.temp_dir, "user", "settings.json")
+        with open(self.defaults_path, "w", encoding="utf-8") as f:
+            json.dump({"default_quality": 95, "max_threads": 4}, f)
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def _read(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_defaults_and_user_values(self):
+        """Значения пользователя перекрывают значения по умолчанию."""
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"default_quality": 70}, f)
+        store = SettingsStore(self.path, self.defaults_path)
+        self.assertEqual(store.get("default_quality"), 70)
+        self.assertEqual(store.get("max_threads"), 4)
+        self.assertFalse(store.dirty)
+
+    def test_typing_coalesces_into_one_write(self):
+        """Серия изменений подряд записывается на диск один раз."""
+        store = SettingsStore(self.path, self.defaults_path)
+        store.DEBOUNCE_SECONDS = 0.1
+        for text in ("1", "19", "192", "1920"):
+            store.update({"last_target_width": int(text)})
+        self.assertEqual(store.writes, 0)
+        deadline = time.monotonic() + 5
+        while store.writes == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(store.writes, 1)
+        self.assertEqual(self._read()["last_target_width"], 1920)
+        self.assertEqual(self._read()["max_threads"], 4)
+
+    def test_unchanged_values_are_not_written(self):
+        """Неизмененные значения не помечают хранилище измененным."""
+        store = SettingsStore(self.path, self.defaults_path)
+        self.assertFalse(store.update({"default_quality": 95}))
+        self.assertFalse(store.flush())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_close_flushes_atomically(self):
+        """При закрытии изменения записываются без временных файлов."""
+        store = SettingsStore(self.path, self.defaults_path)
+        store.set("theme_preference", "dark")
+        store.close()
+        self.assertEqual(store.writes, 1)
+        self.assertEqual(self._read()["theme_preference"], "dark")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["settings.json"])
+
+    def test_errors_are_reported_without_printing(self):
+        """Ошибки чтения и записи настроек сохраняются в хранилище, а не выводятся в stdout."""
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{not json")
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            store = SettingsStore(self.path, self.defaults_path)
+            self.assertEqual(store.get("max_threads"), 4)
+            store.set("default_quality", 80)
+            with mock.patch.object(store, "_write", side_effect=OSError("диск заполнен")):
+                self.assertFalse(store.flush())
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertEqual(len(store.load_errors), 1)
+        self.assertIn(self.path, store.load_errors[0])
+        self.assertIn("диск заполнен", store.save_error)
+        self.assertTrue(store.dirty)
+
+        self.assertTrue(store.flush())
+        self.assertIsNone(store.save_error)
+
+    def test_user_settings_path(self):
+        """Папку конфигурации можно переопределить переменной окружения."""
+        with mock.patch.dict(os.environ, {CONFIG_DIR_ENV: self.temp_dir}):
+            self.assertEqual(user_settings_path(), os.path.join(self.temp_dir, "settings.json"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+"""
+Модульные тесты для быстрого запуска графического интерфейса.
+"""
+
+import unittest
+import json
+import os
+import subprocess
+import sys
+
+
+class TestStartupImports(unittest.TestCase):
+    """
+    Тестовые случаи для отложенного импорта тяжелых модулей.
+    """
+
+    def test_gui_import_is_light(self):
+        """Импорт интерфейса не загружает Pillow, ttkthemes и движок."""
+        code = (
+            "import json, sys; import src.converter; "
+            "print(json.dumps([name for name in ('PIL', 'ttkthemes', 'src.engine', 'src.imaging') "
+            "if name in sys.modules]))"
+        )
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, "-c", code], cwd=project_root,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(json.loads(result.stdout), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
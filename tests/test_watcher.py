@@ -0,0 +1,148 @@
+"""
+Модульные тесты для наблюдения за папкой.
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from PIL import Image
+from src.engine import ConversionEngine
+from src.manifest import ConversionManifest
+from src.naming import OutputPlanner
+from src.options import ConversionOptions
+from src.watcher import FolderWatcher, InotifySource, PollingSource, watch_folder
+
+
+class _ManualSource:
+    """Источник событий, которым управляет тест."""
+
+    def __init__(self):
+        self.events = set()
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, 0.05))
+        events, self.events = self.events, set()
+        return events
+
+    def close(self):
+        pass
+
+
+class TestFolderWatcher(unittest.TestCase):
+    """
+    Тестовые случаи для объединения событий.
+    """
+
+    def setUp(self):
+        """Создание временной папки."""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def _next_batch(self, watcher, timeout=3):
+        """Ждет непустой пакет."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            batch = watcher.next_batch()
+            if batch:
+                return batch
+        return []
+
+    def test_growing_file_waits(self):
+        """Файл, который еще дописывается, не выдается до окончания записи."""
+        path = os.path.join(self.temp_dir, "a.png")
+        source = _ManualSource()
+        watcher = FolderWatcher(source, debounce=0.1)
+        with open(path, "wb") as f:
+            f.write(b"x")
+            f.flush()
+            source.events.add(path)
+            started = time.monotonic()
+            while time.monotonic() - started < 0.4:
+                self.assertEqual(watcher.next_batch(), [])
+                f.write(b"x")
+                f.flush()
+        self.assertEqual(self._next_batch(watcher), [path])
+
+    def test_polling_source(self):
+        """Опрос находит новые файлы."""
+        source = PollingSource(self.temp_dir, interval=0.05)
+        watcher = FolderWatcher(source, debounce=0.05)
+        path = os.path.join(self.temp_dir, "a.png")
+        Image.new('RGB', (10, 10)).save(path)
+        self.assertEqual(self._next_batch(watcher), [path])
+
+    def test_inotify_source(self):
+        """inotify сообщает о новых файлах, в том числе во вложенных папках."""
+        try:
+            source = InotifySource(self.temp_dir, recursive=True)
+        except OSError:
+            self.skipTest("inotify недоступен")
+        watcher = FolderWatcher(source, debounce=0.05)
+        try:
+            subdirectory = os.path.join(self.temp_dir, "sub")
+            os.makedirs(subdirectory)
+            path = os.path.join(subdirectory, "a.png")
+            Image.new('RGB', (10, 10)).save(path)
+            self.assertEqual(self._next_batch(watcher), [path])
+        finally:
+            watcher.close()
+
+
+class TestWatchFolder(unittest.TestCase):
+    """
+    Тестовые случаи для непрерывного преобразования.
+    """
+
+    def setUp(self):
+        """Создание входной папки с одним изображением."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.temp_dir, "in")
+        self.output_dir = os.path.join(self.temp_dir, "out")
+        os.makedirs(self.input_dir)
+        os.makedirs(self.output_dir)
+        Image.new('RGB', (40, 20), 'red').save(os.path.join(self.input_dir, "existing.png"))
+
+    def tearDown(self):
+        """Удаление временных файлов."""
+        shutil.rmtree(self.temp_dir)
+
+    def _wait_for(self, path, timeout=10):
+        """Ждет появления файла."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if os.path.exists(path):
+                return True
+            time.sleep(0.05)
+        return False
+
+    def test_converts_existing_and_new_files(self):
+        """Существующие и новые файлы преобразуются без повторного запуска."""
+        options = ConversionOptions()
+        results = []
+        stop = threading.Event()
+        thread = threading.Thread(target=watch_folder, kwargs=dict(
+            input_dir=self.input_dir, output_dir=self.output_dir,
+            engine=ConversionEngine(max_workers=1), options=options,
+            planner=OutputPlanner(self.output_dir, options),
+            manifest=ConversionManifest.load(self.output_dir),
+            polling=True, debounce=0.05, stop_event=stop, on_result=results.append))
+        thread.start()
+        try:
+            self.assertTrue(self._wait_for(os.path.join(self.output_dir, "existing.jpg")))
+            Image.new('RGB', (40, 20), 'blue').save(os.path.join(self.input_dir, "new.png"))
+            self.assertTrue(self._wait_for(os.path.join(self.output_dir, "new.jpg")))
+        finally:
+            stop.set()
+            thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(all(result.ok for result in results))
+
+
+if __name__ == '__main__':
+    unittest.main()